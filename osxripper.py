@@ -4,9 +4,19 @@ import importlib
 import logging
 import os
 import sys
+import time
 from datetime import datetime
 from plugins.osx_version import OSXVersion
-from plugins.summary import Summary
+from riplib import plugin
+from riplib import osxripper_logs
+from riplib import osxripper_manifest
+from riplib import osxripper_output
+from riplib import osxripper_profile
+from riplib import osxripper_records
+from riplib import osxripper_runcache
+from riplib import osxripper_scheduler
+from riplib import osxripper_sqlite
+from riplib import osxripper_timeline
 
 __author__ = 'osxripper'
 __version__ = '0.3'
@@ -33,12 +43,14 @@ def __run_summary():
     """
     Run the Summary plugin
     """
+    from plugins.summary import Summary  # imports the plugins it summarises, only needed for --summary
     logging.info("Running Summary Plugin")
     osx_summary = Summary()
     osx_summary.set_os_version(__get_osx_version())
     osx_summary.set_input_directory(args.input)
     osx_summary.set_output_directory(args.output)
     osx_summary.parse()
+    osxripper_output.close_all()
 
 
 def __get_osx_version():
@@ -85,25 +97,46 @@ def __load_from_file(osx_class_name):
     return class_inst
 
 
-def __load_plugins():
+def __select_plugins(osx_plugins_path, osx_version=None):
+    """
+    Return the manifest entries of the plugins chosen with --plugins, --exclude and --type that
+    support osx_version, no plugin is imported
+    """
+    manifest = osxripper_manifest.load_manifest(osx_plugins_path)
+    plugin_patterns = osxripper_manifest.split_names(args.plugins)
+    for pattern in plugin_patterns:
+        if not any(osxripper_manifest.matches(manifest_entry, [pattern]) for manifest_entry in manifest):
+            print("[WARNING] No plugin matches {0}.".format(pattern))
+            logging.warning("No plugin matches %s.", pattern)
+    if args.all_versions:
+        osx_version = None
+    selected, unsupported = osxripper_manifest.select(manifest, plugin_patterns,
+                                                      osxripper_manifest.split_names(args.exclude),
+                                                      osxripper_manifest.split_names(args.type), osx_version)
+    if unsupported:
+        print("[INFO] Skipped {0} plugins not supporting {1}.".format(len(unsupported), osx_version))
+        logging.info("Skipped %d plugins not supporting %s: %s", len(unsupported), osx_version,
+                     ", ".join(manifest_entry.get_class_name for manifest_entry in unsupported))
+    return selected
+
+
+def __load_plugins(osx_version):
     """
     Load the plugins for a the OSX version specified
     Adapted from http://stackoverflow.com/questions/301134/dynamic-mod-import-in-python
     """
     osx_plugins_path = os.path.join('.', 'plugins', "osx")
-    osx_plugins_list = os.listdir(osx_plugins_path)
-    osx_plugins_list.sort()
-    for osx_plugin_source in osx_plugins_list:
-        if osx_plugin_source.endswith(".py") and "__init__" not in osx_plugin_source:
-            plugin_class = __load_from_file(os.path.splitext(osx_plugin_source)[0])
-            if plugin_class is None:
-                print("[ERROR] Unable to instantiate {0} from {1}"
-                      .format(osx_plugin_source, osx_plugins_path))
-                logging.error("[ERROR] Unable to instantiate %s from %s",
-                              osx_plugin_source, osx_plugins_path)
-            else:
-                active_plugin = plugin_class()
-                active_plugin_list.append(active_plugin)
+    for manifest_entry in __select_plugins(osx_plugins_path, osx_version):
+        osx_plugin_source = manifest_entry.get_class_name + ".py"
+        plugin_class = __load_from_file(manifest_entry.get_class_name)
+        if plugin_class is None:
+            print("[ERROR] Unable to instantiate {0} from {1}"
+                  .format(osx_plugin_source, osx_plugins_path))
+            logging.error("[ERROR] Unable to instantiate %s from %s",
+                          osx_plugin_source, osx_plugins_path)
+        else:
+            active_plugin = plugin_class()
+            active_plugin_list.append(active_plugin)
 
     plugin_count = len(active_plugin_list)
     # if plugin_count == 0 or plugin_count > 1:
@@ -119,22 +152,59 @@ def __run_plugins():
     Run the plugins from the active plugin list
     """
     osx_version = __get_osx_version()
+    run_cache = None
+    if args.incremental:
+        run_cache = osxripper_runcache.open_run_cache(args.output, args.input, osx_version, args.format, args.timeline,
+                                                      args.since, args.until)
+    timeline_dir = osxripper_timeline.start_timeline(args.output) if args.timeline else None
+    profiles = []
+    run_start = time.perf_counter()
     for active_plugin in active_plugin_list:
-        print("[INFO] Running: {0}".format(active_plugin.get_name))
-        logging.info("Running: %s", active_plugin.get_name)
         active_plugin.set_os_version(osx_version)
         active_plugin.set_input_directory(args.input)
         active_plugin.set_output_directory(args.output)
-        active_plugin.parse()
+        active_plugin.set_output_format(args.format)
+        active_plugin.set_timeline_directory(timeline_dir)
+        active_plugin.set_user_workers(args.user_workers)
+        active_plugin.set_since(args.since)
+        active_plugin.set_until(args.until)
+        if run_cache is not None:
+            # Prints Running or Reused once the run cache has decided
+            plugin_profile = osxripper_scheduler.run_cached_plugin(run_cache, active_plugin, args.profile)[3]
+            if plugin_profile is not None:
+                profiles.append(plugin_profile)
+            continue
+        print("[INFO] Running: {0}".format(active_plugin.get_name))
+        logging.info("Running: %s", active_plugin.get_name)
+        if args.profile:
+            with osxripper_profile.profile_plugin(active_plugin) as plugin_profile:
+                active_plugin.parse()
+            profiles.append(plugin_profile)
+        else:
+            active_plugin.parse()
+    run_wall_time = time.perf_counter() - run_start
+    osxripper_sqlite.close_all()
+    osxripper_output.close_all()
+    osxripper_records.close_database(args.output)
+    if args.timeline:
+        osxripper_timeline.write_timeline(args.output)
+    if args.profile:
+        osxripper_profile.write_report(args.output, profiles, run_wall_time)
 
 
 def __list_plugins():
     """
     List the available plugins
     """
-    __load_plugins()
-    for active_plugin in active_plugin_list:
-        print("{0} - {1}".format(active_plugin.get_name, active_plugin.get_description))
+    logging.basicConfig(handlers=[logging.NullHandler()])  # no log file is written for --list
+    osx_plugins_path = os.path.join('.', 'plugins', "osx")
+    for manifest_entry in __select_plugins(osx_plugins_path):
+        if manifest_entry.is_complete:
+            print("{0} - {1}".format(manifest_entry.get_name, manifest_entry.get_description))
+        else:
+            # The name or description is not a literal in the plugin source, import it to read them
+            active_plugin = __load_from_file(manifest_entry.get_class_name)
+            print("{0} - {1}".format(active_plugin.get_name, active_plugin.get_description))
 
 
 def main():
@@ -164,7 +234,7 @@ def main():
     else:
         print("[INFO] Loading plugins for {0}.".format(osx_version))
         logging.info("Loading plugins for %s.", osx_version)
-        __load_plugins()
+        __load_plugins(osx_version)
         __run_plugins()
     print("[INFO] Output files written to {0}.".format(args.output))
     logging.info("Output files written to %s.", args.output)
@@ -192,6 +262,26 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", help="output or directory")
     parser.add_argument("-l", "--list", action="store_true", help="list the available plugins")
     parser.add_argument("-s", "--summary", action="store_true", help="only run the summary plugin")
+    parser.add_argument("-f", "--format", choices=osxripper_records.get_formats(), default=osxripper_records.FORMAT_TEXT,
+                        help="output format of plugins that write records")
+    parser.add_argument("-t", "--timeline", action="store_true",
+                        help="merge the timestamped events of all plugins into Timeline.csv")
+    parser.add_argument("--since", type=osxripper_logs.parse_time,
+                        help="only keep log entries and Chrome visits at or after this time, e.g. 2020-01-31 or \"2020-01-31 13:45\"")
+    parser.add_argument("--until", type=osxripper_logs.parse_time,
+                        help="only keep log entries and Chrome visits before this time, as for --since")
+    parser.add_argument("-p", "--plugins",
+                        help="comma separated plugins to run, class names or names, * and ? wildcards allowed")
+    parser.add_argument("-x", "--exclude", help="comma separated plugins not to run, as for --plugins")
+    parser.add_argument("--type", help="comma separated plugin types to run, e.g. sqlite,plist")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="also run plugins that do not support the OSX version of the input")
+    parser.add_argument("--profile", action="store_true",
+                        help="measure the time and resources used by each plugin, written to _osxripper_profile.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the output of plugins whose source files did not change since the last incremental run")
+    parser.add_argument("-u", "--user-workers", type=int, default=plugin.USER_WORKERS,
+                        help="number of user accounts a Users plugin parses at the same time")
     args = parser.parse_args()
 
     if args.list:
@@ -1,13 +1,26 @@
 """ ThreadPoolExecutor implementation of driver script """
 import argparse
+import functools
 import importlib
 import logging
 import os
 import sys
-from concurrent.futures import ThreadPoolExecutor
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from plugins.osx_version import OSXVersion
-from plugins.Summary import Summary
+from riplib import plugin
+from riplib import osxripper_batch
+from riplib import osxripper_inventory
+from riplib import osxripper_logs
+from riplib import osxripper_manifest
+from riplib import osxripper_output
+from riplib import osxripper_profile
+from riplib import osxripper_records
+from riplib import osxripper_runcache
+from riplib import osxripper_sqlite
+from riplib import osxripper_scheduler
+from riplib import osxripper_timeline
 
 __author__ = 'osxripper'
 __version__ = '0.3'
@@ -31,21 +44,23 @@ def __run_summary():
     """
     Run the Summary plugin
     """
+    from plugins.summary import Summary  # imports the plugins it summarises, only needed for --summary
     logging.info("Running Summary Plugin")
     osx_summary = Summary()
     osx_summary.set_os_version(__get_osx_version())
     osx_summary.set_input_directory(args.input)
     osx_summary.set_output_directory(args.output)
     osx_summary.parse()
+    osxripper_output.close_all()
 
 
-def __get_osx_version():
+def __get_osx_version(input_dir=None):
     """
-    Get the version of OSX
+    Get the version of OSX of the input directory, args.input by default
     """
     use_version = "big_sur"  # Default
     osx_version = OSXVersion()
-    osx_version.set_input_directory(args.input)
+    osx_version.set_input_directory(input_dir or args.input)
     use_version = osx_version.parse()
     # if "11.1" in use_version:
     #     use_version = "big_sur"
@@ -89,23 +104,44 @@ def __load_from_file(osx_class_name):
     return class_inst
 
 
-def __load_plugins():
+def __select_plugins(osx_plugins_path, osx_version=None):
+    """
+    Return the manifest entries of the plugins chosen with --plugins, --exclude and --type that
+    support osx_version, no plugin is imported
+    """
+    manifest = osxripper_manifest.load_manifest(osx_plugins_path)
+    plugin_patterns = osxripper_manifest.split_names(args.plugins)
+    for pattern in plugin_patterns:
+        if not any(osxripper_manifest.matches(manifest_entry, [pattern]) for manifest_entry in manifest):
+            print("[WARNING] No plugin matches {0}.".format(pattern))
+            logging.warning("No plugin matches %s.", pattern)
+    if args.all_versions:
+        osx_version = None
+    selected, unsupported = osxripper_manifest.select(manifest, plugin_patterns,
+                                                      osxripper_manifest.split_names(args.exclude),
+                                                      osxripper_manifest.split_names(args.type), osx_version)
+    if unsupported:
+        print("[INFO] Skipped {0} plugins not supporting {1}.".format(len(unsupported), osx_version))
+        logging.info("Skipped %d plugins not supporting %s: %s", len(unsupported), osx_version,
+                     ", ".join(manifest_entry.get_class_name for manifest_entry in unsupported))
+    return selected
+
+
+def __load_plugins(osx_version):
     """
     Load the plugins for a the OSX version specified
     Adapted from http://stackoverflow.com/questions/301134/dynamic-mod-import-in-python
     """
     osx_plugins_path = os.path.join('.', 'plugins', "osx")
-    osx_plugins_list = os.listdir(osx_plugins_path)
-    osx_plugins_list.sort()
-    for osx_plugin_source in osx_plugins_list:
-        if osx_plugin_source.endswith(".py") and "__init__" not in osx_plugin_source:
-            plugin_class = __load_from_file(os.path.splitext(osx_plugin_source)[0])
-            if plugin_class is None:
-                print("[ERROR] Unable to instantiate {0} from {1}".format(osx_plugin_source, osx_plugins_path))
-                logging.error("[ERROR] Unable to instantiate %s from %s", osx_plugin_source, osx_plugins_path)
-            else:
-                active_plugin = plugin_class()
-                active_plugin_list.append(active_plugin)
+    for manifest_entry in __select_plugins(osx_plugins_path, osx_version):
+        osx_plugin_source = manifest_entry.get_class_name + ".py"
+        plugin_class = __load_from_file(manifest_entry.get_class_name)
+        if plugin_class is None:
+            print("[ERROR] Unable to instantiate {0} from {1}".format(osx_plugin_source, osx_plugins_path))
+            logging.error("[ERROR] Unable to instantiate %s from %s", osx_plugin_source, osx_plugins_path)
+        else:
+            active_plugin = plugin_class()
+            active_plugin_list.append(active_plugin)
 
     plugin_count = len(active_plugin_list)
     if plugin_count == 0 or plugin_count > 1:
@@ -121,23 +157,198 @@ def __run_plugins():
     Run the plugins from the active plugin list
     """
     osx_version = __get_osx_version()
-    with ThreadPoolExecutor(max_workers=os.cpu_count()-1) as executor:
-        for active_plugin in active_plugin_list:
-            print("[INFO] Running: {0}".format(active_plugin.get_name))
-            logging.info("Running: %s", active_plugin.get_name)
-            active_plugin.set_os_version(osx_version)
-            active_plugin.set_input_directory(args.input)
-            active_plugin.set_output_directory(args.output)
-            executor.submit(active_plugin.parse)
+    run_cache = None
+    if args.incremental:
+        run_cache = osxripper_runcache.open_run_cache(args.output, args.input, osx_version, args.format, args.timeline,
+                                                      args.since, args.until)
+    timeline_dir = osxripper_timeline.start_timeline(args.output) if args.timeline else None
+    for active_plugin in active_plugin_list:
+        active_plugin.set_os_version(osx_version)
+        active_plugin.set_input_directory(args.input)
+        active_plugin.set_output_directory(args.output)
+        active_plugin.set_output_format(args.format)
+        active_plugin.set_timeline_directory(timeline_dir)
+        active_plugin.set_user_workers(args.user_workers)
+        active_plugin.set_since(args.since)
+        active_plugin.set_until(args.until)
+    run_start = time.perf_counter()
+    task = functools.partial(osxripper_scheduler.run_cached_plugin, run_cache) if run_cache is not None else None
+    with osxripper_scheduler.PluginScheduler(max_workers=args.workers, mode=args.mode,
+                                             profile=args.profile, task=task) as scheduler:
+        print("[INFO] Scheduling {0} plugins over {1} {2} workers."
+              .format(len(active_plugin_list), scheduler.get_max_workers, scheduler.get_mode))
+        logging.info("Scheduling %d plugins over %d %s workers.",
+                     len(active_plugin_list), scheduler.get_max_workers, scheduler.get_mode)
+        results = scheduler.run(active_plugin_list)
+    run_wall_time = time.perf_counter() - run_start
+    osxripper_sqlite.close_all()
+    osxripper_output.close_all()
+    osxripper_records.close_database(args.output)
+    if args.timeline:
+        osxripper_timeline.write_timeline(args.output)
+    osxripper_scheduler.report(results)
+    if args.profile:
+        osxripper_profile.write_report(args.output, [result.profile for result in results if result.profile],
+                                       run_wall_time)
+
+
+def __run_image(image, image_count, manifest_entries, pool):
+    """
+    Run the selected plugins over one image of a batch on the shared worker pool
+    """
+    osxripper_batch.set_current_image(image.index)
+    date_timestamp = datetime.now()
+    log_handler = logging.FileHandler(
+        os.path.join(image.output_dir, "_osxripper.{0}.txt".format(date_timestamp.strftime("%Y%m%d.%H%M%S"))))
+    log_handler.addFilter(osxripper_batch.ImageLogFilter(image.index))
+    logging.getLogger().addHandler(log_handler)
+    run_start = time.perf_counter()
+    try:
+        print("[INFO] Image {0}/{1} started: {2} -> {3}".format(image.index, image_count, image.input_dir, image.output_dir))
+        logging.info("Image %d/%d started: %s -> %s", image.index, image_count, image.input_dir, image.output_dir)
+        image.os_version = __get_osx_version(image.input_dir)
+        run_cache = None
+        if args.incremental:
+            run_cache = osxripper_runcache.open_run_cache(image.output_dir, image.input_dir, image.os_version,
+                                                          args.format, args.timeline, args.since, args.until)
+        selected, unsupported = osxripper_manifest.select(manifest_entries,
+                                                          os_version=None if args.all_versions else image.os_version)
+        if unsupported:
+            logging.info("Skipped %d plugins not supporting %s: %s", len(unsupported), image.os_version,
+                         ", ".join(manifest_entry.get_class_name for manifest_entry in unsupported))
+        timeline_dir = osxripper_timeline.start_timeline(image.output_dir) if args.timeline else None
+        image_plugins = []
+        for manifest_entry in selected:
+            active_plugin = __load_from_file(manifest_entry.get_class_name)
+            active_plugin.set_os_version(image.os_version)
+            active_plugin.set_input_directory(image.input_dir)
+            active_plugin.set_output_directory(image.output_dir)
+            active_plugin.set_output_format(args.format)
+            active_plugin.set_timeline_directory(timeline_dir)
+            active_plugin.set_user_workers(args.user_workers)
+            active_plugin.set_since(args.since)
+            active_plugin.set_until(args.until)
+            image_plugins.append(active_plugin)
+        with osxripper_scheduler.PluginScheduler(max_workers=pool.get_max_workers, profile=args.profile,
+                                                 executor=pool.get_executor,
+                                                 task=functools.partial(osxripper_batch.run_image_plugin,
+                                                                        image.index, run_cache=run_cache)) as scheduler:
+            image.results = scheduler.run(image_plugins)
+        image.wall_time = time.perf_counter() - run_start
+        osxripper_records.close_database(image.output_dir)
+        if args.timeline:
+            osxripper_timeline.write_timeline(image.output_dir)
+        osxripper_scheduler.report(image.results)
+        if args.profile:
+            osxripper_profile.write_report(image.output_dir,
+                                           [result.profile for result in image.results if result.profile],
+                                           image.wall_time)
+        image.status = osxripper_batch.STATUS_OK
+    except Exception as error:
+        image.wall_time = time.perf_counter() - run_start
+        image.status = osxripper_batch.STATUS_ERROR
+        image.error = "{0}: {1}".format(error.__class__.__name__, error)
+        logging.exception("Image %d failed", image.index)
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+        osxripper_inventory.discard(image.input_dir)
+        osxripper_batch.set_current_image(None)
+    return image
+
+
+def __run_batch():
+    """
+    Run the plugins over each image listed in the batch manifest, the plugins are imported once by the
+    parent and once by each worker process for the whole batch
+    """
+    date_timestamp = datetime.now()
+    batch_dir = os.path.dirname(os.path.abspath(args.batch))
+    log_file = os.path.join(batch_dir, "_osxripper_batch.{0}.txt".format(date_timestamp.strftime("%Y%m%d.%H%M%S")))
+    logging.basicConfig(filename=log_file, level=logging.INFO)
+    logging.getLogger().addFilter(osxripper_batch.ImageFilter())
+
+    print("="*60)
+    logging.info("="*60)
+    print("[INFO] Starting osxripper batch...")
+    logging.info("Starting osxripper batch...")
+    print("[INFO] Start: {0}".format(date_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")))
+    logging.info("Start: %s", date_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
+    __set_sys_path()
+    images = osxripper_batch.read_batch_manifest(args.batch)
+    runnable = []
+    output_dirs = {}
+    for image in images:
+        output_key = os.path.normcase(os.path.abspath(image.output_dir))
+        if not os.path.isdir(image.input_dir):
+            image.error = "input directory does not exist"
+        elif not os.path.isdir(image.output_dir):
+            image.error = "output directory does not exist"
+        elif output_key in output_dirs:
+            image.error = "output directory is also used by image {0}".format(output_dirs[output_key])
+        else:
+            output_dirs[output_key] = image.index
+            runnable.append(image)
+            continue
+        image.status = osxripper_batch.STATUS_ERROR
+        print("[ERROR] Image {0}/{1} skipped: {2}, {3}.".format(image.index, len(images), image.input_dir, image.error))
+        logging.error("Image %d/%d skipped: %s, %s.", image.index, len(images), image.input_dir, image.error)
+
+    manifest_entries = __select_plugins(os.path.join('.', 'plugins', "osx"))
+    workers = args.workers or osxripper_scheduler.default_workers()
+    print("[INFO] Running {0} images over {1} worker processes, {2} images at a time."
+          .format(len(runnable), workers, args.images))
+    logging.info("Running %d images over %d worker processes, %d images at a time.", len(runnable), workers, args.images)
+    finished = 0
+    with osxripper_batch.WarmPool(workers, [manifest_entry.get_class_name for manifest_entry in manifest_entries]) as pool:
+        with ThreadPoolExecutor(max_workers=max(1, args.images)) as image_executor:
+            futures = [image_executor.submit(__run_image, image, len(images), manifest_entries, pool)
+                       for image in runnable]
+            for future in as_completed(futures):
+                image = future.result()
+                finished += 1
+                if image.status == osxripper_batch.STATUS_OK:
+                    print("[INFO] Image {0}/{1} finished in {2:.1f}s: {3}, {4} plugins, {5} failed or skipped ({6}/{7} done)."
+                          .format(image.index, len(images), image.wall_time, image.os_version, len(image.results),
+                                  image.get_failed_count, finished, len(runnable)))
+                    logging.info("Image %d/%d finished in %.1fs: %s, %d plugins, %d failed or skipped (%d/%d done).",
+                                 image.index, len(images), image.wall_time, image.os_version, len(image.results),
+                                 image.get_failed_count, finished, len(runnable))
+                else:
+                    print("[ERROR] Image {0}/{1} failed: {2} ({3}/{4} done)."
+                          .format(image.index, len(images), image.error, finished, len(runnable)))
+                    logging.error("Image %d/%d failed: %s (%d/%d done).",
+                                  image.index, len(images), image.error, finished, len(runnable))
+    osxripper_sqlite.close_all()
+    osxripper_output.close_all()
+
+    failed = [image for image in images if image.status != osxripper_batch.STATUS_OK]
+    print("[INFO] Completed {0} images, {1} failed or skipped.".format(len(images) - len(failed), len(failed)))
+    logging.info("Completed %d images, %d failed or skipped.", len(images) - len(failed), len(failed))
+    for image in failed:
+        print("[ERROR] Image {0}: {1} ({2})".format(image.index, image.input_dir, image.error))
+        logging.error("Image %d: %s (%s)", image.index, image.input_dir, image.error)
+    print("[INFO] Batch log written to {0}.".format(log_file))
+    print("[INFO] Finish: {0}".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")))
+    logging.info("Finish: %s", datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"))
+    print("="*60)
+    logging.info("="*60)
+    return failed
 
 
 def __list_plugins():
     """
     List the available plugins
     """
-    __load_plugins()
-    for active_plugin in active_plugin_list:
-        print("{0} - {1}".format(active_plugin.get_name, active_plugin.get_description))
+    logging.basicConfig(handlers=[logging.NullHandler()])  # no log file is written for --list
+    osx_plugins_path = os.path.join('.', 'plugins', "osx")
+    for manifest_entry in __select_plugins(osx_plugins_path):
+        if manifest_entry.is_complete:
+            print("{0} - {1}".format(manifest_entry.get_name, manifest_entry.get_description))
+        else:
+            # The name or description is not a literal in the plugin source, import it to read them
+            active_plugin = __load_from_file(manifest_entry.get_class_name)
+            print("{0} - {1}".format(active_plugin.get_name, active_plugin.get_description))
 
 
 def main():
@@ -164,7 +375,7 @@ def main():
     else:
         print("[INFO] Loading plugins for {0}.".format(osx_version))
         logging.info("Loading plugins for %s.", osx_version)
-        __load_plugins()
+        __load_plugins(osx_version)
         __run_plugins()
     print("[INFO] Output files written to {0}.".format(args.output))
     logging.info("Output files written to %s.", args.output)
@@ -192,12 +403,46 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", help="output or directory")
     parser.add_argument("-l", "--list", action="store_true", help="list the available plugins")
     parser.add_argument("-s", "--summary", action="store_true", help="only run the summary plugin")
+    parser.add_argument("-f", "--format", choices=osxripper_records.get_formats(), default=osxripper_records.FORMAT_TEXT,
+                        help="output format of plugins that write records")
+    parser.add_argument("-t", "--timeline", action="store_true",
+                        help="merge the timestamped events of all plugins into Timeline.csv")
+    parser.add_argument("--since", type=osxripper_logs.parse_time,
+                        help="only keep log entries and Chrome visits at or after this time, e.g. 2020-01-31 or \"2020-01-31 13:45\"")
+    parser.add_argument("--until", type=osxripper_logs.parse_time,
+                        help="only keep log entries and Chrome visits before this time, as for --since")
+    parser.add_argument("-p", "--plugins",
+                        help="comma separated plugins to run, class names or names, * and ? wildcards allowed")
+    parser.add_argument("-x", "--exclude", help="comma separated plugins not to run, as for --plugins")
+    parser.add_argument("--type", help="comma separated plugin types to run, e.g. sqlite,plist")
+    parser.add_argument("--all-versions", action="store_true",
+                        help="also run plugins that do not support the OSX version of the input")
+    parser.add_argument("--profile", action="store_true",
+                        help="measure the time and resources used by each plugin, written to _osxripper_profile.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse the output of plugins whose source files did not change since the last incremental run")
+    parser.add_argument("-u", "--user-workers", type=int, default=plugin.USER_WORKERS,
+                        help="number of user accounts a Users plugin parses at the same time")
+    parser.add_argument("-b", "--batch",
+                        help="manifest of input and output directory pairs, one image per line, run over worker processes")
+    parser.add_argument("--images", type=int, default=osxripper_batch.IMAGE_WORKERS,
+                        help="number of batch images scheduled at the same time")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of plugin workers, defaults to one less than the CPU count")
+    parser.add_argument("-m", "--mode", choices=osxripper_scheduler.MODES, default=osxripper_scheduler.MODE_THREAD,
+                        help="run plugins in worker threads or worker processes")
     args = parser.parse_args()
 
     if args.list:
         __list_plugins()
         sys.exit(0)
 
+    if args.batch:
+        if not os.path.isfile(args.batch):
+            print("[ERROR] Batch manifest does not exist.")
+            sys.exit(1)
+        sys.exit(1 if __run_batch() else 0)
+
     if not os.path.isdir(args.input):
         print("[ERROR] Input directory does not exist. \
          Ensure the input directory/mountpoint exists and is accessible.")
@@ -1,8 +1,8 @@
 """ Module to parse Airport data """
-import codecs
 import logging
 import os
 import plistlib
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -30,11 +30,11 @@ class AirportPreferences(Plugin):
         """
         Parse /Library/Preferences/SystemConfiguration/com.apple.airport.preferences.plist
         """
-        with codecs.open(os.path.join(self.get_output_dir, self.get_output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self.get_output_file) as output_file:
             output_file.write("="*10 + " " + self.get_name + " " + "="*10 + "\r\n")
             plist_file = os.path.join(self.get_input_dir, "Library", "Preferences", "SystemConfiguration", self.get_data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(plist_file))
-            if os.path.isfile(plist_file):
+            if riplib.osxripper_inventory.isfile(plist_file):
                 with open(plist_file, "rb") as plist_to_load:
                     plist = plistlib.load(plist_to_load)
                 plist_to_load.close()
@@ -1,8 +1,8 @@
 """ Module for parsing firewall plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -27,12 +27,12 @@ class AlfPlist(Plugin):
         self.set_type("bplist")
 
     def parse(self):
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, "Library", "Preferences", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
 
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 bplist = open(file, "rb")
                 plist = riplib.ccl_bplist.load(bplist)
                 bplist.close()
@@ -1,7 +1,7 @@
 """ Module for listing applications """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -28,18 +28,18 @@ class Applications(Plugin):
         """
         List contents of /Applications directory
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             # N.B. Not testing OS version as /Applications is common to recent OSX versions
             applications_dir = os.path.join(self._input_dir, "Applications")
-            if os.path.isdir(applications_dir):
+            if riplib.osxripper_inventory.isdir(applications_dir):
                 output_file.write("="*10 + " " + self.get_name + " " + "="*10 + "\r\n")
                 output_file.write("Source Directory: {0}\r\n\r\n".format(applications_dir))
-                file_listing = os.listdir(applications_dir)
+                file_listing = riplib.osxripper_inventory.listdir(applications_dir)
                 for file_name in file_listing:
-                    if not file_name.endswith(".app") and os.path.isdir(os.path.join(applications_dir, file_name)):
+                    if not file_name.endswith(".app") and riplib.osxripper_inventory.isdir(os.path.join(applications_dir, file_name)):
                         output_file.write("\t{0}\r\n".format(file_name))
                         sub_dir = os.path.join(applications_dir, file_name)
-                        sub_dir_list = os.listdir(sub_dir)
+                        sub_dir_list = riplib.osxripper_inventory.listdir(sub_dir)
                         for file_name1 in sub_dir_list:
                             output_file.write("\t\t{0}\r\n".format(file_name1))
                     else:
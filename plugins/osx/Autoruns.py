@@ -1,7 +1,7 @@
 """ Module for parsing autorun information """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -28,7 +28,7 @@ class Autoruns(Plugin):
         """
         List contents of known Launch* directories
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion", "snow_leopard"]:
                 sys_lib_launch_agents = os.path.join(self._input_dir, "System", "Library", "LaunchAgents")
@@ -40,10 +40,10 @@ class Autoruns(Plugin):
                 collected_directories = [sys_lib_launch_agents, sys_lib_launch_daemons, sys_lib_startup_items,
                                          lib_launch_agents, lib_launch_daemons, lib_startup_items]
                 for doi in collected_directories:
-                    if os.path.isdir(doi):
+                    if riplib.osxripper_inventory.isdir(doi):
                         output_file.write("="*10 + " Autoruns: " + doi.replace(self._input_dir, "") + "="*10 + "\r\n")
                         output_file.write("Source Directory: {0}\r\n\r\n".format(doi))
-                        file_listing = os.listdir(doi)
+                        file_listing = riplib.osxripper_inventory.listdir(doi)
                         for file_name in file_listing:
                             output_file.write("\t{0}\r\n".format(file_name))
                     else:
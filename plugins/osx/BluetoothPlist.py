@@ -1,9 +1,9 @@
 """ Module for parsing bluetooth data """
 import binascii
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -30,12 +30,12 @@ class BluetoothPlist(Plugin):
         """
         /Library/Preferences/com.apple.Bluetooth.plist
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, "Library", "Preferences", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
 
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 bplist = open(file, "rb")
                 plist = riplib.ccl_bplist.load(bplist)
                 bplist.close()
@@ -1,9 +1,10 @@
 """ Module to parse cache_encryptedA.db """
-import codecs
 import logging
-import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
+import riplib.osxripper_varfolders
 from riplib.plugin import Plugin
 
 
@@ -32,50 +33,45 @@ class CacheEncryptedDatabase(Plugin):
         """
         Read the /private/var/folders/.../cache_encryptedA.db
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            start_folder = os.path.join(self._input_dir, "private", "var", "folders")
-            file_list = []
-            for root, _, files in os.walk(start_folder):
-                if self._data_file in files:
-                    file_list.append(os.path.join(root, self._data_file))
+        with self.open_record_writer(self._output_file) as writer:
+            writer.write_header()
+            file_list = riplib.osxripper_varfolders.find(self._input_dir, riplib.osxripper_varfolders.CACHE_ENCRYPTED)
 
             if len(file_list) == 0:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", self._data_file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(self._data_file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(self._data_file))
                 print("[WARNING] File: {0} does not exist or cannot be found.".format(self._data_file))
                 return
 
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite", "mavericks"]:
             # if self._os_version in ["catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite", "mavericks"]:
                 for database_file in file_list:
-                    if os.path.isfile(database_file):
-                        output_file.write("Source Database: {0}\r\n\r\n".format(database_file))
-                        parse_os = ParseVers110109(output_file, database_file)
+                    if riplib.osxripper_inventory.isfile(database_file):
+                        writer.write_source(database_file, "Source Database")
+                        parse_os = ParseVers110109(writer, database_file)
                         parse_os.parse()
 
             elif self._os_version == "mountain_lion":
                 for database_file in file_list:
-                    if os.path.isfile(database_file):
-                        output_file.write("Source Database: {0}\r\n\r\n".format(database_file))
-                        parse_os = ParseVers108(output_file, database_file)
+                    if riplib.osxripper_inventory.isfile(database_file):
+                        writer.write_source(database_file, "Source Database")
+                        parse_os = ParseVers108(writer, database_file)
                         parse_os.parse()
 
             elif self._os_version in ["lion", "snow_leopard"]:
                 logging.info("This version of OSX is not supported this plugin.")
                 print("[INFO] This version of OSX is not supported this plugin.")
-                output_file.write("[INFO] This version of OSX is not supported this plugin.\r\n")
+                writer.write_text("[INFO] This version of OSX is not supported this plugin.\r\n")
             else:
                 logging.warning("Not a known OSX version.")
                 print("[WARNING] Not a known OSX version.")
-        output_file.close()
 
 class ParseVers110109():
     """
     Convenience class for parsing macOS data
     """
-    def __init__(self, output_file, data_file):
-        self._output_file = output_file
+    def __init__(self, writer, data_file):
+        self._writer = writer
         self._data_file = data_file
 
     def parse(self):
@@ -88,46 +84,47 @@ class ParseVers110109():
 
         conn = None
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
-                if len(rows) > 0:
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                if rows:
                     for row in rows:
                         timestamp = riplib.osxripper_time.get_cocoa_seconds(row["timestamp"])
-                        self._output_file.write("MAC Address        : {0}\r\n".format(row["mac"]))
-                        self._output_file.write("Channel            : {0}\r\n".format(row["channel"]))
-                        self._output_file.write("Timestamp          : {0}\r\n".format(timestamp))
-                        self._output_file.write("Latitude           : {0}\r\n".format(row["latitude"]))
-                        self._output_file.write("Longitude          : {0}\r\n".format(row["longitude"]))
-                        self._output_file.write("Horizontal Accuracy: {0}\r\n".format(row["horizontalaccuracy"]))
-                        self._output_file.write("Altitude           : {0}\r\n".format(row["altitude"]))
-                        self._output_file.write("Vertical Accuracy  : {0}\r\n".format(row["verticalaccuracy"]))
-                        self._output_file.write("Speed              : {0}\r\n".format(row["speed"]))
-                        self._output_file.write("Course             : {0}\r\n".format(row["course"]))
-                        self._output_file.write("Confidence         : {0}\r\n".format(row["confidence"]))
-                        self._output_file.write("Score              : {0}\r\n".format(row["score"]))
-                        self._output_file.write("Reach              : {0}\r\n".format(row["reach"]))
-                        self._output_file.write("\r\n")
+                        self._writer.write_record({
+                            "MAC Address": row["mac"],
+                            "Channel": row["channel"],
+                            "Timestamp": timestamp,
+                            "Latitude": row["latitude"],
+                            "Longitude": row["longitude"],
+                            "Horizontal Accuracy": row["horizontalaccuracy"],
+                            "Altitude": row["altitude"],
+                            "Vertical Accuracy": row["verticalaccuracy"],
+                            "Speed": row["speed"],
+                            "Course": row["course"],
+                            "Confidence": row["confidence"],
+                            "Score": row["score"],
+                            "Reach": row["reach"]
+                        })
+                        self._writer.write_event(timestamp, "Location Cached", "{0} {1},{2}".format(row["mac"], row["latitude"], row["longitude"]))
                 else:
-                    self._output_file.write("No data in database.\r\n")
-            self._output_file.write("\r\n")
+                    self._writer.write_text("No data in database.\r\n")
+            self._writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
-        self._output_file.write("="*50 + "\r\n")
+                riplib.osxripper_sqlite.release(conn)
+        self._writer.write_text("="*50 + "\r\n")
 
 class ParseVers108():
     """
     Convenience class for parsing macOS data
     """
-    def __init__(self, output_file, data_file):
-        self._output_file = output_file
+    def __init__(self, writer, data_file):
+        self._writer = writer
         self._data_file = data_file
 
     def parse(self):
@@ -139,35 +136,36 @@ class ParseVers108():
                 "confidence,score FROM wifilocation ORDER BY timestamp, mac"
         conn = None
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
-                if len(rows) > 0:
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                if rows:
                     for row in rows:
                         timestamp = riplib.osxripper_time.get_cocoa_seconds(row["timestamp"])
-                        self._output_file.write("MAC Address        : {0}\r\n".format(row["mac"]))
-                        self._output_file.write("Channel            : {0}\r\n".format(row["channel"]))
-                        self._output_file.write("Timestamp          : {0}\r\n".format(timestamp))
-                        self._output_file.write("Latitude           : {0}\r\n".format(row["latitude"]))
-                        self._output_file.write("Longitude          : {0}\r\n".format(row["longitude"]))
-                        self._output_file.write("Horizontal Accuracy: {0}\r\n".format(row["horizontalaccuracy"]))
-                        self._output_file.write("Altitude           : {0}\r\n".format(row["altitude"]))
-                        self._output_file.write("Vertical Accuracy  : {0}\r\n".format(row["verticalaccuracy"]))
-                        self._output_file.write("Speed              : {0}\r\n".format(row["speed"]))
-                        self._output_file.write("Course             : {0}\r\n".format(row["course"]))
-                        self._output_file.write("Confidence         : {0}\r\n".format(row["confidence"]))
-                        self._output_file.write("Score              : {0}\r\n".format(row["score"]))
-                        self._output_file.write("\r\n")
+                        self._writer.write_record({
+                            "MAC Address": row["mac"],
+                            "Channel": row["channel"],
+                            "Timestamp": timestamp,
+                            "Latitude": row["latitude"],
+                            "Longitude": row["longitude"],
+                            "Horizontal Accuracy": row["horizontalaccuracy"],
+                            "Altitude": row["altitude"],
+                            "Vertical Accuracy": row["verticalaccuracy"],
+                            "Speed": row["speed"],
+                            "Course": row["course"],
+                            "Confidence": row["confidence"],
+                            "Score": row["score"]
+                        })
+                        self._writer.write_event(timestamp, "Location Cached", "{0} {1},{2}".format(row["mac"], row["latitude"], row["longitude"]))
                 else:
-                    self._output_file.write("No data in database.\r\n")
-            self._output_file.write("\r\n")
+                    self._writer.write_text("No data in database.\r\n")
+            self._writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
-        self._output_file.write("="*50 + "\r\n")
+                riplib.osxripper_sqlite.release(conn)
+        self._writer.write_text("="*50 + "\r\n")
@@ -1,9 +1,10 @@
 """ Module to parse DocumentRevisions database """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,7 +33,7 @@ class DocumentRevisions(Plugin):
         """
         Read the db.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, ".DocumentRevisions-V100", "db-V1", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
@@ -44,15 +45,14 @@ class DocumentRevisions(Plugin):
                                       "mountain_lion", "lion"]:
                 query = "SELECT file_row_id,file_name,file_parent_id,file_path,file_inode,file_last_seen," \
                         "file_status, file_storage_id FROM files"
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     conn = None
                     try:
-                        conn = sqlite3.connect(file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(file)
                         with conn:
                             cur = conn.cursor()
                             cur.execute(query)
-                            rows = cur.fetchall()
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
                             for row in rows:
                                 file_last_seen = riplib.osxripper_time.get_unix_seconds(row["file_last_seen"])
                                 output_file.write("Row ID         : {0}\r\n".format(row["file_row_id"]))
@@ -69,7 +69,7 @@ class DocumentRevisions(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
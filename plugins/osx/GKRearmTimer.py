@@ -1,8 +1,8 @@
 """ Module to  parse .GKRearmTimer plist """
-import codecs
 import logging
 import os
 import plistlib
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,12 +31,12 @@ class GKRearmTimer(Plugin):
         """
         Parse /private/var/db/.GKRearmTimer plist
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             plist_file = os.path.join(self._input_dir, "private", "var", "db", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(plist_file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite"]:
-                if os.path.isfile(plist_file):
+                if riplib.osxripper_inventory.isfile(plist_file):
                     try:
                         with open(plist_file, "rb") as plist_to_load:
                             plist = plistlib.load(plist_to_load)
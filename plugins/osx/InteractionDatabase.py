@@ -1,9 +1,10 @@
 """ Module to parse interactionC.db """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -42,11 +43,11 @@ class InteractionDatabase(Plugin):
                 "zc.zlastoutgoingrecipientdate" \
                 " FROM z_primarykey zpk,zcontacts zc WHERE zpk.z_ent = zc.z_ent"
 
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             database_file = os.path.join(self._input_dir, "private", "var", "db", "CoreDuet", "People", self._data_file)
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan"]:
-                if not os.path.isfile(database_file):
+                if not riplib.osxripper_inventory.isfile(database_file):
                     logging.warning("File: %s does not exist or cannot be found.\r\n", self._data_file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(self._data_file))
                     print("[WARNING] File: {0} does not exist or cannot be found.".format(self._data_file))
@@ -54,13 +55,12 @@ class InteractionDatabase(Plugin):
                     output_file.write("Source Database: {0}\r\n\r\n".format(database_file))
                     conn = None
                     try:
-                        conn = sqlite3.connect(database_file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(database_file)
                         with conn:
                             cur = conn.cursor()
                             cur.execute(query)
-                            rows = cur.fetchall()
-                            if len(rows) == 0:
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                            if not rows:
                                 output_file.write("No data in database.\r\n")
                             else:
                                 for row in rows:
@@ -89,7 +89,7 @@ class InteractionDatabase(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                     output_file.write("="*50 + "\r\n")
 
             elif self._os_version in ["yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
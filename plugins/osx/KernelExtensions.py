@@ -1,7 +1,7 @@
 """ Module to list Kernel Extensions """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -28,12 +28,12 @@ class KernelExtensions(Plugin):
         """
         List contents of /System/Library/Extensions directory
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             extensions_dir = os.path.join(self._input_dir, "System", "Library", "Extensions")
-            if os.path.isdir(extensions_dir):
+            if riplib.osxripper_inventory.isdir(extensions_dir):
                 output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
                 output_file.write("Source Directory: {0}\r\n\r\n".format(extensions_dir))
-                file_listing = os.listdir(extensions_dir)
+                file_listing = riplib.osxripper_inventory.listdir(extensions_dir)
                 for file_name in file_listing:
                     if file_name.endswith(".kext") or file_name.endswith(".ppp") or file_name.endswith(".bundle") or file_name.endswith(".plugin"):
                         output_file.write("\t{0}\r\n".format(file_name))
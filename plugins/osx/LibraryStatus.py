@@ -1,8 +1,8 @@
 """ Module to parse DocumentRevisions LibraryStatus """
-import codecs
 import logging
 import os
 import plistlib
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -30,7 +30,7 @@ class LibraryStatus(Plugin):
         """
         Parse /.DocumentRevisions-V100/LibraryStatus
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             if self._os_version in ["big_sur", "catalina"]:
                 logging.info("This version of OSX is not supported by this plugin.")
@@ -39,7 +39,7 @@ class LibraryStatus(Plugin):
             elif self._os_version in ["mojave", "high_sierra", "sierra", "el_capitan", "yosemite"]:
                 plist_file = os.path.join(self._input_dir, ".DocumentRevisions-V100", self._data_file)
                 output_file.write("Source File: {0}\r\n\r\n".format(plist_file))
-                if os.path.isfile(plist_file):
+                if riplib.osxripper_inventory.isfile(plist_file):
                     with open(plist_file, "rb") as plist_to_load:
                         plist = plistlib.load(plist_to_load)
                     try:
@@ -1,9 +1,9 @@
 """ Module to parse clients.plist """
-import codecs
 import datetime
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,11 +33,11 @@ class LocationdClientsPlist(Plugin):
         Parse /private/var/db/locationd/clients.plist
         """
         mac_absolute = datetime.datetime(2001, 1, 1, 0, 0, 0)
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, "private", "var", "db", "locationd", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan",
                                         "yosemite", "mavericks"]:
                     try:
@@ -1,8 +1,8 @@
 """ Module to parse loginwindow.plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,13 +31,13 @@ class LoginWindowPlist(Plugin):
         """
         Parse /Library/Preferences/com.apple.loginwindow.plist
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, "Library", "Preferences", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     try:
                         bplist = open(file, "rb")
                         plist = riplib.ccl_bplist.load(bplist)
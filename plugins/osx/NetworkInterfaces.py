@@ -1,9 +1,9 @@
 """ Module to parse /Library/Preferences/SystemConfiguration/NetworkInterfaces.plist """
 import binascii
-import codecs
 import logging
 import os
 import plistlib
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,12 +31,12 @@ class NetworkInterfaces(Plugin):
         """
         Parse /Library/Preferences/SystemConfiguration/NetworkInterfaces.plist
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             plist_file = os.path.join(self._input_dir, "Library", "Preferences", "SystemConfiguration", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(plist_file))
 
-            if os.path.isfile(plist_file):
+            if riplib.osxripper_inventory.isfile(plist_file):
                 with open(plist_file, "rb") as plist_to_load:
                     plist = plistlib.load(plist_to_load)
             else:
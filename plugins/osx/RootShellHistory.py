@@ -2,6 +2,7 @@
 import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -30,12 +31,12 @@ class RootShellHistory(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         root_path = os.path.join(self._input_dir, "private", "var", "root")
-        if os.path.isdir(root_path):
-            with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        if riplib.osxripper_inventory.isdir(root_path):
+            with self.open_output_section(self._output_file) as output_file:
                 output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
                 file = os.path.join(root_path, self._data_file)
                 output_file.write("Source File: {0}\r\n\r\n".format(file))
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     history_file = codecs.open(file, "r", encoding="utf-8")
                     for lines in history_file:
                         output_file.write(lines.replace("\n", "\r\n"))
@@ -1,7 +1,8 @@
 """ Module to find Siri usage traces """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
+import riplib.osxripper_logs
 from riplib.plugin import Plugin
 
 
@@ -34,32 +35,36 @@ class SiriLog(Plugin):
         search_line = "com.apple.siri.embeddedspeech.xpc"
         header_line = "    Activities  Actions         Logs     Traces % Events  Public Data Private Data   % Data Description"
 
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
-            output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
+        with self.open_record_writer(self._output_file) as writer:
+            writer.write_header()
             log_file = os.path.join(self._input_dir, "private", "var", "db", "diagnostics", self._data_file)
-            output_file.write("Source File: {0}\r\n\r\n".format(log_file))
+            writer.write_source(log_file)
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra"]:
-                if os.path.isfile(log_file):
-                    with open(log_file, "r") as lf_handle:
+                if riplib.osxripper_inventory.isfile(log_file):
+                    # The statistics of a stream are kept when the time on its date line is between --since and --until
+                    in_range = True
+                    stream_time = None
+                    with riplib.osxripper_logs.open_log(log_file) as lf_handle:
                         for log_line in lf_handle:
                             if date_line in log_line:
-                                output_file.write("{0}\r\n".format(log_line))
-                            elif search_line in log_line:
-                                output_file.write("{0}\r\n".format(header_line))
-                                output_file.write("{0}\r\n".format(log_line))
-                                output_file.write("\r\n")
-                        output_file.write("="*30)
-                    lf_handle.close()
+                                stream_time = riplib.osxripper_logs.find_timestamp(log_line)
+                                in_range = riplib.osxripper_logs.in_range(stream_time, self._since, self._until)
+                                if in_range:
+                                    writer.write_text("{0}\r\n".format(log_line))
+                            elif search_line in log_line and in_range:
+                                record = {"Timestamp": None if stream_time is None else stream_time.isoformat(" "),
+                                          "Statistics": log_line.strip()}
+                                writer.write_log(record, "{0}\r\n{1}\r\n\r\n".format(header_line, log_line))
+                        writer.write_text("="*30)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", log_file)
-                    output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(log_file))
+                    writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(log_file))
                     print("[WARNING] File: {0} does not exist or cannot be found.".format(log_file))
             elif self._os_version in ["el_capitan", "yosemite", "mavericks", "mountain_lion", "lion"]:
                 logging.info("This version of OSX is not supported by this plugin.")
                 print("[INFO] This version of OSX is not supported by this plugin.")
-                output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
+                writer.write_text("[INFO] This version of OSX is not supported by this plugin.\r\n")
             else:
                 logging.warning("Not a known OSX version.")
                 print("[WARNING] Not a known OSX version.")
-                output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+                writer.write_footer()
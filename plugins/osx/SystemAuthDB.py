@@ -1,8 +1,9 @@
 """ Module to parse auth.db """
-import codecs
 import logging
 import os
 import sqlite3
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 import riplib.osxripper_time
 
@@ -31,7 +32,7 @@ class SystemAuthDB(Plugin):
         """
         Read the /private/var/db/auth.db SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             query = "SELECT name, rules.'group', type, class, tries, version, kofn, created, modified, " \
                     "identifier, comment FROM rules ORDER BY name"
@@ -39,15 +40,14 @@ class SystemAuthDB(Plugin):
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan",
                                     "yosemite", "mavericks"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     conn = None
                     try:
-                        conn = sqlite3.connect(file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(file)
                         with conn:
                             cur = conn.cursor()
                             cur.execute(query)
-                            rows = cur.fetchall()
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
                             for row in rows:
                                 created = riplib.osxripper_time.get_cocoa_seconds(row["created"])
                                 modified = riplib.osxripper_time.get_cocoa_seconds(row["modified"])
@@ -68,7 +68,7 @@ class SystemAuthDB(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
@@ -1,8 +1,8 @@
 """ Module to derive time information from /Library/Preferences/.GlobalPreferences.plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -30,13 +30,13 @@ class SystemGlobalPreferences(Plugin):
         """
         Parse /Library/Preferences/.GlobalPreferences.plist
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             global_plist = os.path.join(self._input_dir, "Library", "Preferences", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(global_plist))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion"]:
-                if os.path.isfile(global_plist):
+                if riplib.osxripper_inventory.isfile(global_plist):
                     bplist = open(global_plist, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -46,7 +46,7 @@ class SystemGlobalPreferences(Plugin):
                     logging.warning("File %s does not exist.", global_plist)
                     print("[WARNING] File {0} does not exist.".format(global_plist))
             elif self._os_version == "snow_leopard":
-                if os.path.isfile(global_plist):
+                if riplib.osxripper_inventory.isfile(global_plist):
                     bplist = open(global_plist, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -1,8 +1,10 @@
 """ Module to information from /private/var/db/CoreDuet/Knowledge/KnowledgeC.db reference """
-import codecs
 import logging
 import os
 import sqlite3
+import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -45,6 +47,7 @@ class SystemKnowledgeC(Plugin):
                      "datetime(ZSTARTDATE + 978307200, 'UNIXEPOCH', 'LOCALTIME') as \"START\", " \
                      "datetime(ZENDDATE + 978307200, 'UNIXEPOCH', 'LOCALTIME') as \"END\", " \
                      "(ZENDDATE - ZSTARTDATE) as \"USAGE IN SECONDS\", " \
+                     "ZSTARTDATE as \"RAW START\", " \
                      "ZSTREAMNAME," \
                      "ZVALUESTRING " \
                      "FROM " \
@@ -55,20 +58,20 @@ class SystemKnowledgeC(Plugin):
 
         headers = "ENTRY CREATION\tDAY OF WEEK\tGMT OFFSET\tSTART\tEND\tUSAGE IN SECONDS\tSTREAMNAME\tVALUESTRING\r\n"
 
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
             file = os.path.join(self._input_dir, "private", "var", "db", "CoreDuet", "Knowledge", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra"]:
-                if os.path.isfile(file):
-                    conn = None
+                if riplib.osxripper_inventory.isfile(file):
+                    sqlite_connection = None
+                    timeline = self.open_timeline_writer()
                     try:
-                        sqlite_connection = sqlite3.connect(file)
-                        sqlite_connection.row_factory = sqlite3.Row
+                        sqlite_connection = riplib.osxripper_sqlite.connect_readonly(file)
                         with sqlite_connection:
                             cur = sqlite_connection.cursor()
                             cur.execute(mac4n6_sql)
-                            rows = cur.fetchall()
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
                             output_file.write(headers)
                             for row in rows:
                                 output_file.write("{0}\t".format(row["ENTRY CREATION"]))
@@ -80,13 +83,16 @@ class SystemKnowledgeC(Plugin):
                                 output_file.write("{0}\t".format(row["ZSTREAMNAME"]))
                                 output_file.write("{0}\t".format(row["ZVALUESTRING"]))
                                 output_file.write("\r\n")
+                                timeline.add_event(riplib.osxripper_time.get_cocoa_seconds(row["RAW START"]), "", "App In Focus",
+                                                   row["ZVALUESTRING"])
                         output_file.write("\r\n")
                     except sqlite3.Error as error:
                         logging.error("%s", error.args[0])
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
-                        if conn:
-                            conn.close()
+                        timeline.close()
+                        if sqlite_connection:
+                            riplib.osxripper_sqlite.release(sqlite_connection)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
@@ -1,8 +1,8 @@
 """ Module to extract and decompress system logs """
-import codecs
 import logging
 import os
-import gzip
+import riplib.osxripper_inventory
+import riplib.osxripper_logs
 from riplib.plugin import Plugin
 
 
@@ -30,48 +30,73 @@ class SystemLogs(Plugin):
         """
         Locate and extract System.log and backups from /private/var/log
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(self._output_file) as writer:
+            writer.write_header()
             working_dir = os.path.join(self._input_dir, "private", "var", "log")
-            output_file.write("Source Directory: {0}\r\n\r\n".format(working_dir))
+            writer.write_source(working_dir, "Source Directory")
 
         # Get list of system logs as there many be many zipped up
         # Output log file names at the top of master output file so we know what we are working with
 
-            if os.path.isdir(working_dir) and os.path.isfile(os.path.join(working_dir, "system.log")):
+            if riplib.osxripper_inventory.isdir(working_dir) and riplib.osxripper_inventory.isfile(os.path.join(working_dir, "system.log")):
                 file_listing = []
-                file_listing_all = os.listdir(working_dir)
-                output_file.write("="*10 + " Log File Found: System Log " + "="*10 + "\r\n")
+                file_listing_all = riplib.osxripper_inventory.listdir(working_dir)
+                writer.write_text("="*10 + " Log File Found: System Log " + "="*10 + "\r\n")
                 for file_name in file_listing_all:
                     if file_name.startswith("system") and file_name.endswith(".gz"):
                         file_listing.append(os.path.join(working_dir, file_name))
-                        output_file.write("="*10 + " Log File Found: " + os.path.join(working_dir, file_name) + " " + "="*10 + "\r\n")
+                        writer.write_text("="*10 + " Log File Found: " + os.path.join(working_dir, file_name) + " " + "="*10 + "\r\n")
 
         # Open first unzipped log and write this out to master output file
+        # Logs are copied in chunks and written out after each, so a log is never held in memory.
+        # Entries outside --since and --until are dropped as they are read.
 
-                output_file.write("\r\n")
-                system_log_file = codecs.open(os.path.join(working_dir, "system.log"), "r", encoding="utf-8")
-                output_file.write("\r\n")
-                output_file.write("="*10 + " Current Live System Log file " + "="*10 + "\r\n")
-                output_file.write("\r\n")
-                for lines in system_log_file:
-                    output_file.write(lines.replace("\n", "\r\n"))
-                system_log_file.close()
+                writer.write_text("\r\n")
+                writer.write_text("\r\n")
+                writer.write_text("="*10 + " Current Live System Log file " + "="*10 + "\r\n")
+                writer.write_text("\r\n")
+                system_log = os.path.join(working_dir, "system.log")
+                reader = self.open_log_reader(system_log)
+                for chunk in riplib.osxripper_logs.read_chunks(system_log):
+                    self.__write_entries(writer, reader.feed(chunk.replace("\n", "\r\n")), system_log)
+                self.__write_entries(writer, reader.close(), system_log)
 
-        # Open the zipped log files and write the contents out appended to the master output file
+        # Decompress the zipped log files, several ahead of the one being written, and append them to the master output file
 
-                for logs in file_listing:
-                    output_file.write("\r\n")
-                    output_file.write("="*10 + " Log file: " + logs + "="*10 + "\r\n")
-                    output_file.write("\r\n")
-                    running_file = gzip.open(logs, "rb")
-                    dumped_file = running_file.read()
-                    output_file.write(dumped_file.decode('utf-8'))
-                    running_file.close()
-                output_file.write("\r\n")
-                output_file.write("="*40 + "\r\n\r\n")
+                current_log = None
+                reader = None
+                for logs, chunk, error in riplib.osxripper_logs.read_logs(file_listing):
+                    if logs != current_log:
+                        if reader is not None:
+                            self.__write_entries(writer, reader.close(), current_log)
+                        current_log = logs
+                        reader = self.open_log_reader(logs)
+                        writer.write_text("\r\n")
+                        writer.write_text("="*10 + " Log file: " + logs + "="*10 + "\r\n")
+                        writer.write_text("\r\n")
+                    self.__write_entries(writer, reader.feed(chunk), logs)
+                    if error is not None:
+                        self.__write_entries(writer, reader.close(), logs)
+                        reader = None
+                        logging.warning("Unable to read %s: %s", logs, error)
+                        writer.write_text("\r\n[WARNING] Unable to read {0}: {1}\r\n".format(logs, error))
+                        print("[WARNING] Unable to read {0}: {1}".format(logs, error))
+                if reader is not None:
+                    self.__write_entries(writer, reader.close(), current_log)
+                writer.write_text("\r\n")
+                writer.write_footer()
             else:
                 logging.warning("Directory %s or File %s does not exist or cannot be found.\r\n", working_dir, "System Log")
-                output_file.write("[WARNING] Directory {0} or File {1} does not exist or cannot be found.\r\n".format(working_dir, "System Log"))
+                writer.write_text("[WARNING] Directory {0} or File {1} does not exist or cannot be found.\r\n".format(working_dir, "System Log"))
                 print("[WARNING] Directory {0} or File {1} does not exist or cannot be found.\r\n".format(working_dir, "System Log"))
-            output_file.close()
+
+    @staticmethod
+    def __write_entries(writer, entries, log_file):
+        """
+        Write the log entries read from a chunk of a log and flush them to the output file
+        """
+        for record, text in entries:
+            if record is not None:
+                record["Source File"] = log_file
+            writer.write_log(record, text)
+        writer.flush()
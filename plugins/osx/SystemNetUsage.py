@@ -1,9 +1,10 @@
 """ Module to get information from /private/var/networkd/netusage.sqlite """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,16 +32,15 @@ class SystemNetUsage(Plugin):
         """
         Read the /private/var/networkd/netusage.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             file = os.path.join(self._input_dir, "private", "var", "networkd", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     conn = None
                     try:
-                        conn = sqlite3.connect(file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(file)
                         output_file.write("="*10 + " Network Attachments " + "="*10 + "\r\n")
                         run_network_attachment_query(conn, output_file)
                         output_file.write("="*10 + " Networked Processes " + "="*10 + "\r\n")
@@ -53,7 +53,7 @@ class SystemNetUsage(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
@@ -79,7 +79,7 @@ def run_process_query(sqlite_connection, output_file):
     with sqlite_connection:
         cur = sqlite_connection.cursor()
         cur.execute(query)
-        rows = cur.fetchall()
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
         for row in rows:
             first_timestamp = riplib.osxripper_time.get_cocoa_seconds(row["zfirsttimestamp"])
             timestamp = riplib.osxripper_time.get_cocoa_seconds(row["ztimestamp"])
@@ -100,7 +100,7 @@ def run_live_usage_query(sqlite_connection, output_file):
     with sqlite_connection:
         cur = sqlite_connection.cursor()
         cur.execute(query)
-        rows = cur.fetchall()
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
         for row in rows:
             ztimestamp = riplib.osxripper_time.get_cocoa_seconds(row["ztimestamp"])
             output_file.write("Name     : {0}\r\n".format(row["z_name"]))
@@ -125,7 +125,7 @@ def run_network_attachment_query(sqlite_connection, output_file):
     with sqlite_connection:
         cur = sqlite_connection.cursor()
         cur.execute(query)
-        rows = cur.fetchall()
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
         for row in rows:
             zfirsttimestamp = riplib.osxripper_time.get_cocoa_seconds(row["zfirsttimestamp"])
             ztimestamp = riplib.osxripper_time.get_cocoa_seconds(row["ztimestamp"])
@@ -1,9 +1,10 @@
 """ Module to parse information from /private/var/db/systemstats/snapshots.db """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,21 +34,20 @@ class SystemSnapshots(Plugin):
         """
         Read the /private/var/db/systemstats/snapshots.db SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             query = "SELECT time, pid, uniqueid, comm FROM snapshots ORDER BY time"
             file = os.path.join(self._input_dir, "private", "var", "db", "systemstats", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["el_capitan", "yosemite", "mavericks"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     conn = None
                     try:
-                        conn = sqlite3.connect(file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(file)
                         with conn:
                             cur = conn.cursor()
                             cur.execute(query)
-                            rows = cur.fetchall()
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
                             for row in rows:
                                 snap_time = riplib.osxripper_time.get_unix_micros(row["time"])
                                 output_file.write("Comm     : {0}\r\n".format(row["comm"]))
@@ -60,7 +60,7 @@ class SystemSnapshots(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
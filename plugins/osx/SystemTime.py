@@ -1,9 +1,9 @@
 """ Module to parse Time information """
-import codecs
 import logging
 import os
 import plistlib
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -48,19 +48,19 @@ class SystemTime(Plugin):
             time_settings_plist = os.path.join(self._input_dir, "private", "var", "db", "timed", "Library", "Preferences", "com.apple.timed.plist")
             ntp_conf = os.path.join(self._input_dir, "private", "etc", "ntp.conf")
 
-            if os.path.isfile(global_plist):
+            if riplib.osxripper_inventory.isfile(global_plist):
                 self.__parse_sierra_global_plist(global_plist)
             else:
                 logging.warning("File {0} does not exist.".format(global_plist))
                 print("[WARNING] File {0} does not exist.".format(global_plist))
 
-            if os.path.isfile(time_settings_plist):
+            if riplib.osxripper_inventory.isfile(time_settings_plist):
                 self.__parse_catalina_auto_time_settings_plist(time_settings_plist)
             else:
                 logging.warning("File %s does not exist.", time_settings_plist)
                 print("[WARNING] File {0} does not exist.".format(time_settings_plist))
 
-            if os.path.isfile(ntp_conf):
+            if riplib.osxripper_inventory.isfile(ntp_conf):
                 self.__read_ntp(ntp_conf)
             else:
                 logging.warning("File %s does not exist.", ntp_conf)
@@ -71,25 +71,25 @@ class SystemTime(Plugin):
             auto_tz_plist = os.path.join(self._input_dir, "Library", "Caches", "com.apple.AutoTimeZone.plist")
             tz_auto_plist = os.path.join(self._input_dir, "Library", "Preferences", "com.apple.timezone.auto.plist")
             ntp_conf = os.path.join(self._input_dir, "private", "etc", "ntp.conf")
-            if os.path.isfile(global_plist):
+            if riplib.osxripper_inventory.isfile(global_plist):
                 self.__parse_global_plist(global_plist)
             else:
                 logging.warning("File %s does not exist.", global_plist)
                 print("[WARNING] File {0} does not exist.".format(global_plist))
 
-            if os.path.isfile(auto_tz_plist):
+            if riplib.osxripper_inventory.isfile(auto_tz_plist):
                 self.__parse_auto_timezone_plist(auto_tz_plist)
             else:
                 logging.warning("File %s does not exist.", auto_tz_plist)
                 print("[WARNING] File {0} does not exist.".format(auto_tz_plist))
 
-            if os.path.isfile(tz_auto_plist):
+            if riplib.osxripper_inventory.isfile(tz_auto_plist):
                 self.__parse_timezone_auto_plist(tz_auto_plist)
             else:
                 logging.warning("File %s does not exist.", tz_auto_plist)
                 print("[WARNING] File {0} does not exist.".format(tz_auto_plist))
 
-            if os.path.isfile(ntp_conf):
+            if riplib.osxripper_inventory.isfile(ntp_conf):
                 self.__read_ntp(ntp_conf)
             else:
                 logging.warning("File %s does not exist.", ntp_conf)
@@ -100,13 +100,13 @@ class SystemTime(Plugin):
             # auto_tz_plist = os.path.join(self._input_dir, "Library", "Caches", "com.apple.AutoTimeZone.plist")
             # tz_auto_plist = os.path.join(self._input_dir, "Library", "Preferences", "com.apple.timezone.auto.plist")
             ntp_conf = os.path.join(self._input_dir, "private", "etc", "ntp.conf")
-            if os.path.isfile(global_plist):
+            if riplib.osxripper_inventory.isfile(global_plist):
                 self.__parse_global_plist(global_plist)
             else:
                 logging.warning("File %s does not exist.", global_plist)
                 print("[WARNING] File {0} does not exist.".format(global_plist))
 
-            if os.path.isfile(ntp_conf):
+            if riplib.osxripper_inventory.isfile(ntp_conf):
                 self.__read_ntp(ntp_conf)
             else:
                 logging.warning("File %s does not exist.", ntp_conf)
@@ -119,7 +119,7 @@ class SystemTime(Plugin):
         """
         Parse a Binary Plist file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("=" * 10 + " Local Time Zone " + "=" * 10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             bplist = open(file, "rb")
@@ -138,7 +138,7 @@ class SystemTime(Plugin):
         """
         Parse a Binary Plist file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("=" * 10 + " Local Time Zone " + "=" * 10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             bplist = open(file, "rb")
@@ -159,7 +159,7 @@ class SystemTime(Plugin):
         output_file.close()
 
     def __read_ntp(self, file):
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("=" * 10 + " Time Server Setting " + "=" * 10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             # file_ntp = open(file, "rb")
@@ -174,7 +174,7 @@ class SystemTime(Plugin):
 # this deos not appear to be the case when addressing an extracted copy from an image
 ########################################################################################
 #    def __read_localtime(self, file):
-#        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+#        with self.open_output_section(self._output_file) as output_file:
 #            output_file.write("=" * 10 + " Local Timezone " + "=" * 10 + "\r\n")
 #            output_file.write("Source File: {0}".format(file))
 #            output_file.write("N.B. On a live system this may look like a binary dump,
@@ -189,7 +189,7 @@ class SystemTime(Plugin):
         """
         Parse a plain XML Plist file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " Auto Timezone " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             with open(file, 'rb') as auto_tz_file:
@@ -208,7 +208,7 @@ class SystemTime(Plugin):
         """
         Parse a plain XML Plist file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " Timezone Auto " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             with open(file, 'rb') as auto_tz_file:
@@ -225,7 +225,7 @@ class SystemTime(Plugin):
         """
         Parse a binary Plist file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*8 + " Automatic Time Settings " + "="*8 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             bplist = open(file, "rb")
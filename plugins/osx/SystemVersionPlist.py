@@ -1,8 +1,8 @@
 """ Module to retrieve OSX version information """
-import codecs
 import logging
 import os
 import plistlib
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -30,13 +30,13 @@ class SystemVersionPlist(Plugin):
         """
         Parse SystemVersion.plist and write version information to file
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             plist_file = os.path.join(self._input_dir, "System", "Library", "CoreServices", self._data_file)
             output_file.write("Source File: {0}\r\n\r\n".format(plist_file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan",
                                     "yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                if os.path.isfile(plist_file):
+                if riplib.osxripper_inventory.isfile(plist_file):
                     try:
                         with open(plist_file, "rb") as plist_to_load:
                             plist = plistlib.load(plist_to_load)
@@ -1,7 +1,7 @@
 """ Module to list .wdgt directories in /Library/Widgets """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -30,7 +30,7 @@ class SystemWidgets(Plugin):
         """
         List .wdgt files under /Library/Widgets
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             working_dir = os.path.join(self._input_dir, "Library", "Widgets")
             output_file.write("Source Directory: {0}\r\n\r\n".format(working_dir))
@@ -41,8 +41,8 @@ class SystemWidgets(Plugin):
                 output_file.write("[INFO] This version of OSX is not supported this plugin.\r\n")
             elif self._os_version in ["mojave", "sierra", "el_capitan", "yosemite", "mavericks",
                                       "mountain_lion", "lion", "snow_leopard"]:
-                if os.path.isdir(working_dir):
-                    file_listing = os.listdir(working_dir)
+                if riplib.osxripper_inventory.isdir(working_dir):
+                    file_listing = riplib.osxripper_inventory.listdir(working_dir)
                     for file_name in file_listing:
                         if file_name.endswith(".wdgt"):
                             output_file.write(file_name + "\r\n")
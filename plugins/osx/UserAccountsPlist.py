@@ -1,9 +1,9 @@
 """ Module to parse /private/var/db/dslocal/nodes/Default/users/<username>.plist """
-import codecs
 import logging
 import os
 import plistlib
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,8 +33,8 @@ class UserAccountsPlist(Plugin):
         Public function called to parse the data file set in __init__
         """
         working_dir = os.path.join(self._input_dir, "private", "var", "db", "dslocal", "nodes", "Default", "users")
-        if os.path.exists(working_dir):
-            file_listing = os.listdir(working_dir)
+        if riplib.osxripper_inventory.exists(working_dir):
+            file_listing = riplib.osxripper_inventory.listdir(working_dir)
             for file_name in file_listing:
                 stat_info = os.stat(working_dir + os.path.sep + file_name)
                 if file_name.endswith(".plist") and stat_info.st_size > 0:
@@ -48,7 +48,7 @@ class UserAccountsPlist(Plugin):
         """
         Parse a User Account Binary Plist files
         """
-        with codecs.open(os.path.join(self._output_dir, self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section(self._output_file) as output_file:
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion"]:
                 parse_os = ParseVers110107(output_file, file)
@@ -1,9 +1,10 @@
 """ Module to parse information from /Users/<username>/Library/Accounts/Accounts3.sqlite """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -34,12 +35,12 @@ class UsersAccounts3(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     sqlite_db = os.path.join(users_path, username, "Library", "Accounts", self._data_file)
-                    if os.path.isfile(sqlite_db):
+                    if riplib.osxripper_inventory.isfile(sqlite_db):
                         self.__parse_sqlite_db(sqlite_db, username)
                     else:
                         logging.warning("%s does not exist.", sqlite_db)
@@ -52,7 +53,7 @@ class UsersAccounts3(Plugin):
         """
         Read the Accounts3.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["el_capitan", "yosemite"]:
@@ -88,13 +89,12 @@ class ParseVers10111010():
                 "FROM zaccount za,zaccounttype zat WHERE za.zaccounttype = zat.z_pk"
         conn = None
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
-                if len(rows) != 0:
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                if rows:
                     for row in rows:
                         zdate = riplib.osxripper_time.get_cocoa_seconds(row["zdate"])
                         self._output_file.write("Account            : {0}\r\n".format(row["zaccounttypedescription"]))
@@ -113,7 +113,7 @@ class ParseVers10111010():
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
+                riplib.osxripper_sqlite.release(conn)
 
 class ParseVers110106():
     """
@@ -131,13 +131,12 @@ class ParseVers110106():
                 "zaccountdescription,zowningbundleid FROM zaccount"
         conn = None
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
-                if len(rows) != 0:
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                if rows:
                     for row in rows:
                         zdate = riplib.osxripper_time.get_cocoa_seconds(row["zdate"])
                         self._output_file.write("Username           : {0}\r\n".format(row["zusername"]))
@@ -154,4 +153,4 @@ class ParseVers110106():
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
+                riplib.osxripper_sqlite.release(conn)
@@ -1,9 +1,10 @@
 """ Module to parse information from /Users/<username>/Library/Accounts/Accounts4.sqlite """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -34,12 +35,12 @@ class UsersAccounts4(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     sqlite_db = os.path.join(users_path, username, "Library", "Accounts", self._data_file)
-                    if os.path.isfile(sqlite_db):
+                    if riplib.osxripper_inventory.isfile(sqlite_db):
                         self.__parse_sqlite_db(sqlite_db, username)
                     else:
                         logging.warning("%s does not exist.", sqlite_db)
@@ -52,7 +53,7 @@ class UsersAccounts4(Plugin):
         """
         Read the Accounts4.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra"]:
@@ -61,13 +62,12 @@ class UsersAccounts4(Plugin):
                         "FROM zaccount za,zaccounttype zat WHERE za.zaccounttype = zat.z_pk"
                 conn = None
                 try:
-                    conn = sqlite3.connect(file)
-                    conn.row_factory = sqlite3.Row
+                    conn = riplib.osxripper_sqlite.connect_readonly(file)
                     with conn:
                         cur = conn.cursor()
                         cur.execute(query)
-                        rows = cur.fetchall()
-                        if len(rows) != 0:
+                        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                        if rows:
                             for row in rows:
                                 zdate = riplib.osxripper_time.get_cocoa_seconds(row["zdate"])
                                 output_file.write("Account            : {0}\r\n".format(row["zaccounttypedescription"]))
@@ -86,7 +86,7 @@ class UsersAccounts4(Plugin):
                     print("[ERROR] {0}".format(error.args[0]))
                 finally:
                     if conn:
-                        conn.close()
+                        riplib.osxripper_sqlite.release(conn)
             elif self._os_version in ["el_capitan", "yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
                 logging.info("This version of OSX is not supported by this plugin.")
                 print("[INFO] This version of OSX is not supported by this plugin.")
@@ -1,7 +1,7 @@
 """ Module to list .app folders in users' home folder """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,12 +31,12 @@ class UsersApplications(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     user_dir = os.path.join(users_path, username)
-                    if os.path.isdir(user_dir):
+                    if riplib.osxripper_inventory.isdir(user_dir):
                         self.__list_files(user_dir, username)
                     else:
                         logging.warning("%s does not exist.", user_dir)
@@ -49,10 +49,10 @@ class UsersApplications(Plugin):
         """
         List .app directories
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + '_Applications.txt'), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + '_Applications.txt') as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source Directory: {0}\r\n\r\n".format(file))
-            for root, dirs, _ in os.walk(file):
+            for root, dirs, _ in riplib.osxripper_inventory.walk(file):
                 for user_dir in dirs:
                     if user_dir.endswith(".app"):
                         output_file.write("{0}{1}{2}\r\n".format(root, os.path.sep, user_dir, sep=""))
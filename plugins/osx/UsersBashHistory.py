@@ -2,6 +2,7 @@
 import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,22 +32,22 @@ class UsersBashHistory(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
         else:
             print("[WARNING] {0} does not exist.".format(users_path))
             return
         for username in user_list:
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan"]:
-                if os.path.isdir(users_path):
-                    # user_list = os.listdir(users_path)
-                    if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(users_path):
+                    # user_list = riplib.osxripper_inventory.listdir(users_path)
+                    if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                         sessions = os.path.join(users_path, username, ".bash_sessions")
-                        if os.path.isdir(sessions):
+                        if riplib.osxripper_inventory.isdir(sessions):
                             self.__parse_bash_sessions(username, sessions)
-            if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+            if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                 history = os.path.join(users_path, username, self._data_file)
-                if os.path.isfile(history):
+                if riplib.osxripper_inventory.isfile(history):
                     self.__parse_history(history, username)
                 else:
                     logging.warning("%s does not exist.", history)
@@ -56,10 +57,10 @@ class UsersBashHistory(Plugin):
         """
         Read /Users/username/.bash_sessions/*
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
             output_file.write("Bash Sessions\r\n")
-            sessions_files = os.listdir(sessions_dir)
+            sessions_files = riplib.osxripper_inventory.listdir(sessions_dir)
             for session_file in sessions_files:
                 if ".session" in session_file:
                     s_file = codecs.open(os.path.join(sessions_dir, session_file), "r", encoding="utf-8")
@@ -78,10 +79,10 @@ class UsersBashHistory(Plugin):
         Parse /Users/username/.bash_history
         N.B. OSX version checking removed as this is a common directory and file across versions
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 history_file = codecs.open(file, "r", encoding="utf-8")
                 for lines in history_file:
                     output_file.write(lines.replace("\n", "\r\n"))
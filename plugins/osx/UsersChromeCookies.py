@@ -1,9 +1,11 @@
 """ Module to parse Google Chrome Cookies database"""
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -34,99 +36,104 @@ class UsersChromeCookies(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                    history_path = os.path.join(users_path, username, "Library", "Application Support", "Google", "Chrome", "Default")
-                    if os.path.isdir(history_path):
-                        self.__parse_sqlite_db(history_path, username)
-                    else:
-                        logging.warning("%s does not exist.", history_path)
-                        print("[WARNING] {0} does not exist.".format(history_path))
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
 
-    def __parse_sqlite_db(self, file, username):
+    def __parse_profile(self, profile):
+        """
+        Parse the Chrome cookies of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
         """
         Read the History SQLite database
         """
         query = "SELECT host_key,name,value,path,creation_utc,last_access_utc,expires_utc," \
                     "secure,httponly,has_expires,persistent,priority " \
-                    "FROM cookies ORDER BY creation_utc;"
+                    "FROM cookies.cookies ORDER BY creation_utc;"
 
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Chrome_Cookies.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(profile.get_output_file("Cookies"), profile.get_context) as writer:
+            writer.write_header()
             history_db = os.path.join(file, self._data_file)
-            if os.path.isfile(history_db):
-                output_file.write("Source File: {0}\r\n\r\n".format(history_db))
-                conn = None
+            if riplib.osxripper_inventory.isfile(history_db):
+                writer.write_source(history_db)
                 try:
-                    conn = sqlite3.connect(history_db)
-                    conn.row_factory = sqlite3.Row
-                    with conn:
-                        cur = conn.cursor()
-                        cur.execute(query)
-                        rows = cur.fetchall()
-                        for row in rows:
-                            creation_utc = riplib.osxripper_time.get_gregorian_micros(row["creation_utc"])
-                            last_access_utc = riplib.osxripper_time.get_gregorian_micros(row["last_access_utc"])
-                            expires_utc = riplib.osxripper_time.get_gregorian_micros(row["expires_utc"])
-
-                            output_file.write("Host Key       : {0}\r\n".format(row["host_key"]))
-                            output_file.write("Name           : {0}\r\n".format(row["name"]))
-                            output_file.write("Value          : {0}\r\n".format(row["value"]))
-                            output_file.write("Path           : {0}\r\n".format(row["path"]))
-                            output_file.write("Creation UTC   : {0}\r\n".format(creation_utc))
-                            output_file.write("Last Access UTC: {0}\r\n".format(last_access_utc))
-                            output_file.write("Expires UTC    : {0}\r\n".format(expires_utc))
-                            output_file.write("Secure         : {0}\r\n".format(row["secure"]))
-                            output_file.write("HTTP Only      : {0}\r\n".format(row["httponly"]))
-                            output_file.write("Has Expires    : {0}\r\n".format(row["has_expires"]))
-                            output_file.write("Persistent     : {0}\r\n".format(row["persistent"]))
-                            output_file.write("Priority       : {0}\r\n".format(row["priority"]))
-                            output_file.write("\r\n")
-                except sqlite3.Error as _:
-                    self.__parse_alt(output_file, conn)
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        self.__parse_cookies(writer, database, query)
+                except sqlite3.Error as error:
+                    logging.error("%s", error.args[0])
+                    print("[ERROR] {0}".format(error.args[0]))
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                 print("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
 
-    def __parse_alt(self, output_file, db_connection):
+    def __parse_cookies(self, writer, database, query):
+        """
+        Read the cookies table, with the alternate schema if the query fails
+        """
+        try:
+            cur = database.execute(query)
+            for rows in riplib.osxripper_sqlite.iterate_rows(cur).batches():
+                creation_times = riplib.osxripper_time.get_gregorian_micros_batch([row["creation_utc"] for row in rows])
+                last_access_times = riplib.osxripper_time.get_gregorian_micros_batch([row["last_access_utc"] for row in rows])
+                expiry_times = riplib.osxripper_time.get_gregorian_micros_batch([row["expires_utc"] for row in rows])
+                for row, creation_utc, last_access_utc, expires_utc in zip(rows, creation_times, last_access_times,
+                                                                          expiry_times):
+                    writer.write_record({
+                        "Host Key": row["host_key"],
+                        "Name": row["name"],
+                        "Value": row["value"],
+                        "Path": row["path"],
+                        "Creation UTC": creation_utc,
+                        "Last Access UTC": last_access_utc,
+                        "Expires UTC": expires_utc,
+                        "Secure": row["secure"],
+                        "HTTP Only": row["httponly"],
+                        "Has Expires": row["has_expires"],
+                        "Persistent": row["persistent"],
+                        "Priority": row["priority"]
+                    })
+                    writer.write_event(creation_utc, "Cookie Created", "{0} {1}".format(row["host_key"], row["name"]))
+                    writer.write_event(last_access_utc, "Cookie Last Accessed", "{0} {1}".format(row["host_key"], row["name"]))
+        except sqlite3.Error as _:
+            self.__parse_alt(writer, database)
+
+    def __parse_alt(self, writer, database):
         """
         Alternate schema
         """
         query_alt = "SELECT host_key,name,value,path,creation_utc,last_access_utc,expires_utc,is_secure," \
-                    "is_httponly,has_expires,is_persistent,priority FROM cookies ORDER BY creation_utc;"
+                    "is_httponly,has_expires,is_persistent,priority FROM cookies.cookies ORDER BY creation_utc;"
         try:
-            cur = db_connection.cursor()
-            cur.execute(query_alt)
-            rows = cur.fetchall()
-            for row in rows:
-                creation_utc = riplib.osxripper_time.get_gregorian_micros(row["creation_utc"])
-                last_access_utc = riplib.osxripper_time.get_gregorian_micros(row["last_access_utc"])
-                expires_utc = riplib.osxripper_time.get_gregorian_micros(row["expires_utc"])
-
-                output_file.write("Host Key       : {0}\r\n".format(row["host_key"]))
-                output_file.write("Name           : {0}\r\n".format(row["name"]))
-                output_file.write("Value          : {0}\r\n".format(row["value"]))
-                output_file.write("Path           : {0}\r\n".format(row["path"]))
-                output_file.write("Creation UTC   : {0}\r\n".format(creation_utc))
-                output_file.write("Last Access UTC: {0}\r\n".format(last_access_utc))
-                output_file.write("Expires UTC    : {0}\r\n".format(expires_utc))
-                output_file.write("Secure         : {0}\r\n".format(row["is_secure"]))
-                output_file.write("HTTP Only      : {0}\r\n".format(row["is_httponly"]))
-                output_file.write("Has Expires    : {0}\r\n".format(row["has_expires"]))
-                output_file.write("Persistent     : {0}\r\n".format(row["is_persistent"]))
-                output_file.write("Priority       : {0}\r\n".format(row["priority"]))
-                output_file.write("\r\n")
+            cur = database.execute(query_alt)
+            for rows in riplib.osxripper_sqlite.iterate_rows(cur).batches():
+                creation_times = riplib.osxripper_time.get_gregorian_micros_batch([row["creation_utc"] for row in rows])
+                last_access_times = riplib.osxripper_time.get_gregorian_micros_batch([row["last_access_utc"] for row in rows])
+                expiry_times = riplib.osxripper_time.get_gregorian_micros_batch([row["expires_utc"] for row in rows])
+                for row, creation_utc, last_access_utc, expires_utc in zip(rows, creation_times, last_access_times,
+                                                                          expiry_times):
+                    writer.write_record({
+                        "Host Key": row["host_key"],
+                        "Name": row["name"],
+                        "Value": row["value"],
+                        "Path": row["path"],
+                        "Creation UTC": creation_utc,
+                        "Last Access UTC": last_access_utc,
+                        "Expires UTC": expires_utc,
+                        "Secure": row["is_secure"],
+                        "HTTP Only": row["is_httponly"],
+                        "Has Expires": row["has_expires"],
+                        "Persistent": row["is_persistent"],
+                        "Priority": row["priority"]
+                    })
+                    writer.write_event(creation_utc, "Cookie Created", "{0} {1}".format(row["host_key"], row["name"]))
+                    writer.write_event(last_access_utc, "Cookie Last Accessed", "{0} {1}".format(row["host_key"], row["name"]))
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
-        finally:
-            if db_connection:
-                db_connection.close()
@@ -0,0 +1,168 @@
+""" Module to correlate the Google Chrome History of a profile with its Favicons and downloads """
+import logging
+import os
+import sqlite3
+import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
+from riplib.plugin import Plugin
+
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class UsersChromeCorrelation(Plugin):
+    """
+    Parse information from /Users/<username>/Library/Application Support/Google/Chrome/Default/History
+    joined with the Favicons database of the same profile
+    """
+
+    def __init__(self):
+        """
+        Initialise the class.
+        """
+        super().__init__()
+        self.set_name("User Chrome Browser History Correlation")
+        self.set_description("Parse information from /Users/<username>/Library/Application Support/Google/Chrome/Default/History and Favicons")
+        self.set_data_file("History")
+        self.set_output_file("")  # this will have to be defined per user account
+        self.set_type("sqlite")
+
+    def parse(self):
+        """
+        Iterate over /Users directory and find user sub-directories
+        """
+        users_path = os.path.join(self._input_dir, "Users")
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
+        else:
+            logging.warning("%s does not exist.", users_path)
+            print("[WARNING] {0} does not exist.".format(users_path))
+
+    def __parse_profile(self, profile):
+        """
+        Correlate the Chrome databases of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
+        """
+        Read the History SQLite database with the Favicons database attached
+        """
+        with self.open_record_writer(profile.get_output_file("Correlation"), profile.get_context) as writer:
+            writer.write_header()
+            history_db = os.path.join(file, self._data_file)
+            if riplib.osxripper_inventory.isfile(history_db):
+                writer.write_source(history_db)
+                try:
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        if database.has_columns("favicons", "icon_mapping", ["page_url", "icon_id"]):
+                            writer.write_text("Joined File: {0}\r\n\r\n".format(os.path.join(file, "Favicons")))
+                            self.__parse_visited_favicons(database, writer)
+                            self.__parse_unvisited_favicons(database, writer)
+                        else:
+                            writer.write_text("[INFO] No Favicons database to correlate.\r\n")
+                        if database.has_columns("history", "downloads", ["start_time"]):
+                            self.__parse_downloads(database, writer)
+                except sqlite3.Error as error:
+                    logging.error("%s", error.args[0])
+                    print("[ERROR] {0}".format(error.args[0]))
+            else:
+                logging.warning("File: %s does not exist or cannot be found.\r\n", file)
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
+            writer.write_footer()
+
+    @staticmethod
+    def __parse_visited_favicons(database, writer):
+        """
+        Write the visited pages with the icon the Favicons database holds for them
+        """
+        writer.start_section("Favicons of Visited Pages")
+        query = "SELECT u.url,u.title,u.visit_count,u.last_visit_time,fi.url AS icon_url " \
+                "FROM history.urls u JOIN favicons.icon_mapping im ON im.page_url = u.url " \
+                "JOIN favicons.favicons fi ON fi.id = im.icon_id ORDER BY u.last_visit_time"
+        cur = database.execute(query)
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+        if not rows:
+            writer.write_text("No data in database.\r\n")
+        for batch in rows.batches():
+            last_visit_times = riplib.osxripper_time.get_gregorian_micros_batch([row["last_visit_time"] for row in batch])
+            for row, last_visit_time in zip(batch, last_visit_times):
+                writer.write_record({
+                    "URL": row["url"],
+                    "Title": row["title"],
+                    "Visit Count": row["visit_count"],
+                    "Last Visit Time": last_visit_time,
+                    "Icon URL": row["icon_url"]
+                })
+
+    @staticmethod
+    def __parse_unvisited_favicons(database, writer):
+        """
+        Write the pages with an icon but no entry in History, e.g. visits since deleted from History
+        """
+        writer.start_section("Favicon Pages Not in History")
+        if database.has_columns("favicons", "favicon_bitmaps", ["icon_id", "last_updated"]):
+            last_updated = "(SELECT MAX(fb.last_updated) FROM favicons.favicon_bitmaps fb WHERE fb.icon_id = fi.id)"
+        else:
+            last_updated = "NULL"
+        query = "SELECT im.page_url,fi.url AS icon_url,{0} AS last_updated " \
+                "FROM favicons.icon_mapping im JOIN favicons.favicons fi ON fi.id = im.icon_id " \
+                "WHERE NOT EXISTS (SELECT 1 FROM history.urls u WHERE u.url = im.page_url) " \
+                "ORDER BY im.page_url".format(last_updated)
+        cur = database.execute(query)
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+        if not rows:
+            writer.write_text("No data in database.\r\n")
+        for batch in rows.batches():
+            last_updated_times = riplib.osxripper_time.get_gregorian_micros_batch([row["last_updated"] for row in batch])
+            for row, last_updated_time in zip(batch, last_updated_times):
+                writer.write_record({
+                    "Page URL": row["page_url"],
+                    "Icon URL": row["icon_url"],
+                    "Icon Last Updated": last_updated_time
+                })
+                writer.write_event(last_updated_time, "Favicon Updated Without History", row["page_url"])
+
+    @staticmethod
+    def __parse_downloads(database, writer):
+        """
+        Write the downloads with the page they were started from and its last visit before the download
+        """
+        writer.start_section("Downloads with Visits")
+        page_column = "tab_url" if database.has_columns("history", "downloads", ["tab_url"]) else "referrer"
+        if database.has_columns("history", "downloads_url_chains", ["id", "chain_index", "url"]):
+            download_url = "(SELECT c.url FROM history.downloads_url_chains c WHERE c.id = d.id " \
+                           "ORDER BY c.chain_index DESC LIMIT 1)"
+        else:
+            download_url = "NULL"
+        query = "SELECT d.id,d.target_path,d.start_time,d.{0} AS page_url,{1} AS download_url," \
+                "u.title,u.visit_count,(SELECT MAX(v.visit_time) FROM history.visits v WHERE v.url = u.id " \
+                "AND v.visit_time <= d.start_time) AS visit_time " \
+                "FROM history.downloads d LEFT JOIN history.urls u ON u.url = d.{0} ORDER BY d.start_time".format(page_column, download_url)
+        cur = database.execute(query)
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+        if not rows:
+            writer.write_text("No data in database.\r\n")
+        for batch in rows.batches():
+            start_times = riplib.osxripper_time.get_gregorian_micros_batch([row["start_time"] for row in batch])
+            visit_times = riplib.osxripper_time.get_gregorian_micros_batch([row["visit_time"] for row in batch])
+            for row, start_time, visit_time in zip(batch, start_times, visit_times):
+                if row["visit_time"] is None:
+                    visit_time = ""  # no visit of the page before the download
+                writer.write_record({
+                    "ID": row["id"],
+                    "Target Path": row["target_path"],
+                    "Download URL": row["download_url"],
+                    "Start Time": start_time,
+                    "Page URL": row["page_url"],
+                    "Page Title": row["title"],
+                    "Page Visit Count": row["visit_count"],
+                    "Last Page Visit Before Download": visit_time
+                })
+                writer.write_event(start_time, "Download Started From Page",
+                                   "{0} -> {1}".format(row["page_url"], row["target_path"]))
@@ -1,9 +1,11 @@
 """ Module to parse Downloads data from Google Chrome """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -22,71 +24,62 @@ class UsersChromeDownloads(Plugin):
         Initialise the class.
         """
         super().__init__()
-        self.set_name = "User Chrome Browser Download History"
-        self.set_description = "Parse information from /Users/<username>/Library/Application Support/Google/Chrome/Default/History"
-        self.set_data_file = "History"
-        self.set_output_file = ""  # this will have to be defined per user account
-        self.set_type = "sqlite"
+        self.set_name("User Chrome Browser Download History")
+        self.set_description("Parse information from /Users/<username>/Library/Application Support/Google/Chrome/Default/History")
+        self.set_data_file("History")
+        self.set_output_file("")  # this will have to be defined per user account
+        self.set_type("sqlite")
 
     def parse(self):
         """
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                    history_path = os.path\
-                        .join(users_path, username, "Library", "Application Support", "Google", "Chrome", "Default")
-                    if os.path.isdir(history_path):
-                        self.__parse_sqlite_db(history_path, username)
-                    else:
-                        logging.warning("%s does not exist.", history_path)
-                        print("[WARNING] {0} does not exist.".format(history_path))
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
 
-    def __parse_sqlite_db(self, file, username):
+    def __parse_profile(self, profile):
+        """
+        Parse the Chrome downloads of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
         """
         Read the History SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Chrome_Downloads.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(profile.get_output_file("Downloads"), profile.get_context) as writer:
+            writer.write_header()
             history_db = os.path.join(file, "History")
             query = "SELECT id, current_path, target_path," \
                     "start_time," \
-                    "received_bytes, total_bytes, referrer FROM downloads"
-            if os.path.isfile(history_db):
-                output_file.write("Source File: {0}\r\n\r\n".format(history_db))
-                conn = None
+                    "received_bytes, total_bytes, referrer FROM history.downloads"
+            if riplib.osxripper_inventory.isfile(history_db):
+                writer.write_source(history_db)
                 try:
-                    conn = sqlite3.connect(history_db)
-                    conn.row_factory = sqlite3.Row
-                    with conn:
-                        cur = conn.cursor()
-                        cur.execute(query)
-                        rows = cur.fetchall()
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        cur = database.execute(query)
+                        rows = riplib.osxripper_sqlite.iterate_rows(cur)
                         for row in rows:
                             start_time = riplib.osxripper_time.get_gregorian_micros(row["start_time"])
-                            output_file.write("ID          : {0}\r\n".format(row["id"]))
-                            output_file.write("Current Path: {0}\r\n".format(row["current_path"]))
-                            output_file.write("Target Path : {0}\r\n".format(row["target_path"]))
-                            output_file.write("Start Time  : {0}\r\n".format(start_time))
-                            output_file.write("Received    : {0}\r\n".format(row["received_bytes"]))
-                            output_file.write("Total Bytes : {0}\r\n".format(row["total_bytes"]))
-                            output_file.write("Referer     : {0}\r\n".format(row["referrer"]))
-                            output_file.write("\r\n")
+                            writer.write_record({
+                                "ID": row["id"],
+                                "Current Path": row["current_path"],
+                                "Target Path": row["target_path"],
+                                "Start Time": start_time,
+                                "Received": row["received_bytes"],
+                                "Total Bytes": row["total_bytes"],
+                                "Referer": row["referrer"]
+                            })
+                            writer.write_event(start_time, "Download Started", "{0} -> {1}".format(row["referrer"], row["target_path"]))
                 except sqlite3.Error as error:
                     logging.error("%s", error.args[0])
                     print("[ERROR] {0}".format(error.args[0]))
-                finally:
-                    if conn:
-                        conn.close()
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                 print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
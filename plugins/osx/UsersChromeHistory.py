@@ -1,9 +1,11 @@
 """ Module to parse Google Chrome History """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,60 +35,103 @@ class UsersChromeHistory(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                    history_path = os.path\
-                        .join(users_path, username, "Library", "Application Support", "Google", "Chrome", "Default")
-                    if os.path.isdir(history_path):
-                        self.__parse_sqlite_db(history_path, username)
-                    else:
-                        logging.warning("%s does not exist.", history_path)
-                        print("[WARNING] {0} does not exist.".format(history_path))
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
 
-    def __parse_sqlite_db(self, file, username):
+    def __parse_profile(self, profile):
+        """
+        Parse the Chrome history of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
         """
         Read the History SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Chrome_History.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(profile.get_output_file("History"), profile.get_context) as writer:
+            writer.write_header()
             history_db = os.path.join(file, "History")
             query = "SELECT id, url,title,term,visit_count,last_visit_time," \
-                    "typed_count,hidden FROM urls, keyword_search_terms WHERE keyword_search_terms.url_id=urls.id"
-            if os.path.isfile(history_db):
-                output_file.write("Source File: {0}\r\n\r\n".format(history_db))
-                conn = None
+                    "typed_count,hidden FROM history.urls, history.keyword_search_terms WHERE keyword_search_terms.url_id=urls.id"
+            if riplib.osxripper_inventory.isfile(history_db):
+                writer.write_source(history_db)
                 try:
-                    conn = sqlite3.connect(history_db)
-                    conn.row_factory = sqlite3.Row
-                    with conn:
-                        cur = conn.cursor()
-                        cur.execute(query)
-                        rows = cur.fetchall()
-                        for row in rows:
-                            last_visit_time = riplib.osxripper_time.get_gregorian_micros(row["last_visit_time"])
-                            output_file.write("ID         : {0}\r\n".format(row["id"]))
-                            output_file.write("URL        : {0}\r\n".format(row["url"]))
-                            output_file.write("Title      : {0}\r\n".format(row["term"]))
-                            output_file.write("Search Term: {0}\r\n".format(row["term"]))
-                            output_file.write("Visit Count: {0}\r\n".format(row["visit_count"]))
-                            output_file.write("Last Visit : {0}\r\n".format(last_visit_time))
-                            output_file.write("Typed Count: {0}\r\n".format(row["typed_count"]))
-                            output_file.write("Hidden     : {0}\r\n".format(row["hidden"]))
-                            output_file.write("\r\n")
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        cur = database.execute(query)
+                        for rows in riplib.osxripper_sqlite.iterate_rows(cur).batches():
+                            last_visit_times = riplib.osxripper_time.get_gregorian_micros_batch(
+                                [row["last_visit_time"] for row in rows])
+                            for row, last_visit_time in zip(rows, last_visit_times):
+                                writer.write_record({
+                                    "ID": row["id"],
+                                    "URL": row["url"],
+                                    "Title": row["term"],
+                                    "Search Term": row["term"],
+                                    "Visit Count": row["visit_count"],
+                                    "Last Visit": last_visit_time,
+                                    "Typed Count": row["typed_count"],
+                                    "Hidden": row["hidden"]
+                                })
+                                writer.write_event(last_visit_time, "Last Visit", row["url"])
+                        self.__parse_visits(database, writer)
                 except sqlite3.Error as error:
                     logging.error("%s", error.args[0])
                     print("[ERROR] {0}".format(error.args[0]))
-                finally:
-                    if conn:
-                        conn.close()
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                 print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
+
+    def __parse_visits(self, database, writer):
+        """
+        Write every visit of the visits table with its URL, transition and the visit it came from,
+        oldest first and limited to --since and --until
+        """
+        writer.start_section("Visits")
+        visit_columns = database.get_columns("history", "visits")
+        if "visit_time" not in visit_columns:
+            writer.write_text("No visits table in database.\r\n")
+            return
+        duration = "visit_duration" if "visit_duration" in visit_columns else "NULL"
+        conditions, parameters = [], []
+        if self.get_since is not None:
+            conditions.append("visit_time >= ?")
+            parameters.append(riplib.osxripper_time.get_gregorian_micros_delta(self.get_since))
+        if self.get_until is not None:
+            conditions.append("visit_time < ?")
+            parameters.append(riplib.osxripper_time.get_gregorian_micros_delta(self.get_until))
+        # The range is applied to the visits_time_index scan before the joins, urls and the referring
+        # visit are then looked up by their primary keys for the visits in range only
+        query = "SELECT v.id,v.visit_time,u.url,u.title,v.transition,v.from_visit,fu.url AS from_url," \
+                "v.visit_duration FROM (SELECT id,url,visit_time,transition,from_visit,{0} AS visit_duration " \
+                "FROM history.visits{1} ORDER BY visit_time,id) v LEFT JOIN history.urls u ON u.id = v.url " \
+                "LEFT JOIN history.visits f ON f.id = v.from_visit LEFT JOIN history.urls fu ON fu.id = f.url " \
+                "ORDER BY v.visit_time,v.id".format(duration,
+                                                    " WHERE " + " AND ".join(conditions) if conditions else "")
+        cur = database.get_connection.cursor()
+        # Plain tuples, a history can hold millions of visits and sqlite3.Row costs a lookup per column
+        cur.row_factory = None
+        riplib.osxripper_sqlite.execute(cur, query, parameters)
+        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+        if not rows:
+            writer.write_text("No data in database.\r\n")
+        get_transition = riplib.osxripper_chrome.get_transition
+        for batch in rows.batches():
+            visit_times = riplib.osxripper_time.get_gregorian_micros_batch([row[1] for row in batch])
+            for (visit_id, _, url, title, transition, from_visit, from_url, visit_duration), visit_time \
+                    in zip(batch, visit_times):
+                writer.write_record({
+                    "Visit ID": visit_id,
+                    "Visit Time": visit_time,
+                    "URL": url,
+                    "Title": title,
+                    "Transition": get_transition(transition),
+                    "From Visit": from_visit or None,
+                    "From URL": from_url,
+                    "Visit Duration": visit_duration
+                })
+                writer.write_event(visit_time, "Visit", url)
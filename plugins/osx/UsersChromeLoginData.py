@@ -1,9 +1,11 @@
 """ Module to parse information from Google Chrome login data """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -33,27 +35,24 @@ class UsersChromeLoginData(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                    history_path = os.path\
-                        .join(users_path, username, "Library", "Application Support", "Google", "Chrome", "Default")
-                    if os.path.isdir(history_path):
-                        self.__parse_sqlite_db(history_path, username)
-                    else:
-                        logging.warning("%s does not exist.", history_path)
-                        print("[WARNING] {0} does not exist.".format(history_path))
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
 
-    def __parse_sqlite_db(self, file, username):
+    def __parse_profile(self, profile):
+        """
+        Parse the Chrome login data of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
         """
         Read the Login Data SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Chrome_Login_Data.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(profile.get_output_file("Login_Data"), profile.get_context) as writer:
+            writer.write_header()
             history_db = os.path.join(file, self._data_file)
             # query = "SELECT username_value,display_name,origin_url,action_url," \
             #         "date_created,date_synced," \
@@ -62,49 +61,44 @@ class UsersChromeLoginData(Plugin):
             query = "SELECT username_value,display_name,origin_url,action_url," \
                     "date_created,date_synced," \
                     "signon_realm,preferred,times_used,blacklisted_by_user," \
-                    "scheme,password_type,federation_url FROM logins ORDER BY username_value"
-            if os.path.isfile(history_db):
-                output_file.write("Source File: {0}\r\n\r\n".format(history_db))
-                output_file.write("N.B. Creds are stored as BLOBS, not retrieved by this plugin\r\n\r\n")
-                conn = None
+                    "scheme,password_type,federation_url FROM login_data.logins ORDER BY username_value"
+            if riplib.osxripper_inventory.isfile(history_db):
+                writer.write_source(history_db)
+                writer.write_text("N.B. Creds are stored as BLOBS, not retrieved by this plugin\r\n\r\n")
                 try:
-                    conn = sqlite3.connect(history_db)
-                    conn.row_factory = sqlite3.Row
-                    with conn:
-                        cur = conn.cursor()
-                        cur.execute(query)
-                        rows = cur.fetchall()
-                        if len(rows) == 0:
-                            output_file.write("No data found in this database.\r\n\r\n")
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        cur = database.execute(query)
+                        rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                        if not rows:
+                            writer.write_text("No data found in this database.\r\n\r\n")
                         else:
                             for row in rows:
                                 date_created = riplib.osxripper_time.get_gregorian_micros(row["date_created"])
                                 date_synced = riplib.osxripper_time.get_gregorian_micros(row["date_synced"])
-                                output_file.write("Username           : {0}\r\n".format(row["username_value"]))
-                                output_file.write("Display Name       : {0}\r\n".format(row["display_name"]))
-                                output_file.write("Origin URL         : {0}\r\n".format(row["origin_url"]))
-                                output_file.write("Action URL         : {0}\r\n".format(row["action_url"]))
-                                output_file.write("Date Created       : {0}\r\n".format(date_created))
-                                output_file.write("Date Synced        : {0}\r\n".format(date_synced))
-                                output_file.write("Signon Realm       : {0}\r\n".format(row["signon_realm"]))
-                                output_file.write("SSL Valid          : {0}\r\n".format(row["ssl_valid"]))
-                                output_file.write("Preferred          : {0}\r\n".format(row["preferred"]))
-                                output_file.write("Times Used         : {0}\r\n".format(row["times_used"]))
-                                output_file.write("Blacklisted by User: {0}\r\n".format(row["blacklisted_by_user"]))
-                                output_file.write("Scheme             : {0}\r\n".format(row["scheme"]))
-                                output_file.write("Password Type      : {0}\r\n".format(row["password_type"]))
-                                # output_file.write("Avatar URL         : {0}\r\n".format(row["avatar_url"]))
-                                output_file.write("Federation URL     : {0}\r\n".format(row["federation_url"]))
-                                output_file.write("\r\n")
+                                writer.write_record({
+                                    "Username": row["username_value"],
+                                    "Display Name": row["display_name"],
+                                    "Origin URL": row["origin_url"],
+                                    "Action URL": row["action_url"],
+                                    "Date Created": date_created,
+                                    "Date Synced": date_synced,
+                                    "Signon Realm": row["signon_realm"],
+                                    "SSL Valid": row["ssl_valid"],
+                                    "Preferred": row["preferred"],
+                                    "Times Used": row["times_used"],
+                                    "Blacklisted by User": row["blacklisted_by_user"],
+                                    "Scheme": row["scheme"],
+                                    "Password Type": row["password_type"],
+                                    # "Avatar URL": row["avatar_url"],
+                                    "Federation URL": row["federation_url"]
+                                })
+                                writer.write_event(date_created, "Login Created", "{0} {1}".format(row["origin_url"], row["username_value"]))
+                                writer.write_event(date_synced, "Login Synced", "{0} {1}".format(row["origin_url"], row["username_value"]))
                 except sqlite3.Error as error:
                     logging.error("%s", error.args[0])
                     print("[ERROR] {0}".format(error.args[0]))
-                finally:
-                    if conn:
-                        conn.close()
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                 print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
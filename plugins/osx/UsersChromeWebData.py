@@ -1,9 +1,12 @@
 """ Module to parse Autofill data form Google Chrome """
-import codecs
+import functools
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_chrome
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,165 +36,173 @@ class UsersChromeWebData(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                    history_path = os.path.join(users_path, username, "Library", "Application Support", "Google", "Chrome", "Default")
-                    if os.path.isdir(history_path):
-                        self.__parse_sqlite_db(history_path, username)
-                    else:
-                        logging.warning("%s does not exist.", history_path)
-                        print("[WARNING] {0} does not exist.".format(history_path))
+        if riplib.osxripper_inventory.isdir(users_path):
+            self.map_profiles(self.__parse_profile, riplib.osxripper_chrome.find_all_profiles(self._input_dir))
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
 
-    def __parse_sqlite_db(self, file, username):
+    def __parse_profile(self, profile):
+        """
+        Parse the Chrome web data of a single profile
+        """
+        self.__parse_sqlite_db(profile.get_path, profile)
+
+    def __parse_sqlite_db(self, file, profile):
         """
         Read the Web Data SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Chrome_Web_Data.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
+        with self.open_record_writer(profile.get_output_file("Web_Data"), profile.get_context) as writer:
+            writer.write_header()
             web_data_db = os.path.join(file, "Web Data")
 
-            if os.path.isfile(web_data_db):
-                output_file.write("Source File: {0}\r\n\r\n".format(web_data_db))
-                conn = None
+            if riplib.osxripper_inventory.isfile(web_data_db):
+                writer.write_source(web_data_db)
+                # The tables are written in this order
+                table_parsers = [self._parse_autofill, self._parse_autofill_profile_emails,
+                                 self._parse_autofill_profile_names, self._parse_autofill_profile_phones,
+                                 self._parse_autofill_profiles, self._parse_autofill_profiles_trash,
+                                 self._parse_credit_cards, self._parse_keywords, self._parse_service]
                 try:
-                    conn = sqlite3.connect(web_data_db)
-                    conn.row_factory = sqlite3.Row
-                    self._parse_autofill(output_file, conn)
-                    self._parse_autofill_profile_emails(output_file, conn)
-                    self._parse_autofill_profile_names(output_file, conn)
-                    self._parse_autofill_profile_phones(output_file, conn)
-                    self._parse_autofill_profiles(output_file, conn)
-                    self._parse_autofill_profiles_trash(output_file, conn)
-                    self._parse_credit_cards(output_file, conn)
-                    self._parse_keywords(output_file, conn)
-                    self._parse_service(output_file, conn)
-                finally:
-                    if conn:
-                        conn.close()
+                    with riplib.osxripper_chrome.ProfileDatabase(profile) as database:
+                        self.map_sections(writer, [functools.partial(self._parse_table, table_parser, database)
+                                                   for table_parser in table_parsers])
+                except sqlite3.Error as error:
+                    logging.error("%s", error.args[0])
+                    print("[ERROR] {0}".format(error.args[0]))
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
-                output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
+                writer.write_text("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                 print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
+
+
+    @classmethod
+    def _parse_table(cls, table_parser, database, writer):
+        """
+        Call a table parser with the writer map_sections gives it
+        """
+        table_parser(writer, database)
 
 
     @classmethod
-    def _parse_autofill(cls, output_file, db_connection):
+    def _parse_autofill(cls, writer, database):
         """
         Collate data from autofill table
         """
         try:
-            query = "SELECT name,value,value_lower,date_created,date_last_used,count FROM autofill"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill " + "="*10 + "\r\n")
-            if len(rows) != 0:
-                for row in rows:
-                    date_created = riplib.osxripper_time.get_unix_seconds(row["date_created"])
-                    date_last_used = riplib.osxripper_time.get_unix_seconds(row["date_last_used"])
-                    output_file.write("Name          : {0}\r\n".format(row["name"]))
-                    output_file.write("Value         : {0}\r\n".format(row["value"]))
-                    output_file.write("Value Lower   : {0}\r\n".format(row["value_lower"]))
-                    output_file.write("Date Created  : {0}\r\n".format(date_created))
-                    output_file.write("Date Last Used: {0}\r\n".format(date_last_used))
-                    output_file.write("Count         : {0}\r\n".format(row["count"]))
+            query = "SELECT name,value,value_lower,date_created,date_last_used,count FROM web_data.autofill"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill", spacing=False)
+            if rows:
+                for batch in rows.batches():
+                    dates_created = riplib.osxripper_time.get_unix_seconds_batch([row["date_created"] for row in batch])
+                    dates_last_used = riplib.osxripper_time.get_unix_seconds_batch([row["date_last_used"] for row in batch])
+                    for row, date_created, date_last_used in zip(batch, dates_created, dates_last_used):
+                        writer.write_record({
+                            "Name": row["name"],
+                            "Value": row["value"],
+                            "Value Lower": row["value_lower"],
+                            "Date Created": date_created,
+                            "Date Last Used": date_last_used,
+                            "Count": row["count"]
+                        })
+                        writer.write_event(date_created, "Autofill Created", "{0}: {1}".format(row["name"], row["value"]))
+                        writer.write_event(date_last_used, "Autofill Last Used", "{0}: {1}".format(row["name"], row["value"]))
             else:
-                output_file.write("No data found in Autofill table.\r\n")
+                writer.write_text("No data found in Autofill table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_autofill_profile_emails(cls, output_file, db_connection):
+    def _parse_autofill_profile_emails(cls, writer, database):
         """
         Collate data from autofill profiles emails table
         """
         try:
-            query = "SELECT guid, email FROM autofill_profile_emails"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill Profile Emails " + "="*10 + "\r\n")
-            if len(rows) != 0:
+            query = "SELECT guid, email FROM web_data.autofill_profile_emails"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill Profile Emails", spacing=False)
+            if rows:
                 for row in rows:
-                    output_file.write("GUID : {0}\r\n".format(row["guid"]))
-                    output_file.write("Email: {0}\r\n".format(row["email"]))
+                    writer.write_record({
+                        "GUID": row["guid"],
+                        "Email": row["email"]
+                    })
             else:
-                output_file.write("No data found in Autofill Profile Email table.\r\n")
+                writer.write_text("No data found in Autofill Profile Email table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_autofill_profile_names(cls, output_file, db_connection):
+    def _parse_autofill_profile_names(cls, writer, database):
         """
         Collate data from autofill profiles names table
         """
         try:
-            query = "SELECT guid, first_name, middle_name, last_name, full_name FROM autofill_profile_names"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill Profile Names " + "="*10 + "\r\n")
-            if len(rows) != 0:
+            query = "SELECT guid, first_name, middle_name, last_name, full_name FROM web_data.autofill_profile_names"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill Profile Names", spacing=False)
+            if rows:
                 for row in rows:
-                    output_file.write("GUID       : {0}\r\n".format(row["guid"]))
-                    output_file.write("First Name : {0}\r\n".format(row["first_name"]))
-                    output_file.write("Middle Name: {0}\r\n".format(row["middle_name"]))
-                    output_file.write("Last Name  : {0}\r\n".format(row["last_name"]))
-                    output_file.write("Full Name  : {0}\r\n".format(row["full_name"]))
+                    writer.write_record({
+                        "GUID": row["guid"],
+                        "First Name": row["first_name"],
+                        "Middle Name": row["middle_name"],
+                        "Last Name": row["last_name"],
+                        "Full Name": row["full_name"]
+                    })
             else:
-                output_file.write("No data found in Autofill Profile Names table.\r\n")
+                writer.write_text("No data found in Autofill Profile Names table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_autofill_profile_phones(cls, output_file, db_connection):
+    def _parse_autofill_profile_phones(cls, writer, database):
         """
         Collate data from autofill profiles phones table
         """
         try:
-            query = "SELECT guid, number FROM autofill_profile_phones"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill Profile Phones " + "="*10 + "\r\n")
-            if len(rows) != 0:
+            query = "SELECT guid, number FROM web_data.autofill_profile_phones"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill Profile Phones", spacing=False)
+            if rows:
                 for row in rows:
-                    output_file.write("GUID        : {0}\r\n".format(row["guid"]))
-                    output_file.write("Phone Number: {0}\r\n".format(row["number"]))
+                    writer.write_record({
+                        "GUID": row["guid"],
+                        "Phone Number": row["number"]
+                    })
             else:
-                output_file.write("No data found in Autofill Profile Phones table.\r\n")
+                writer.write_text("No data found in Autofill Profile Phones table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_autofill_profiles(cls, output_file, db_connection):
+    def _parse_autofill_profiles(cls, writer, database):
         """
         Collate data from autofill profiles table
         """
@@ -199,97 +210,100 @@ class UsersChromeWebData(Plugin):
             query = "SELECT guid,company_name,street_address,dependent_locality,city,state,zipcode," \
                     "sorting_code,country_code," \
                     "date_modified," \
-                    "origin,language_code FROM autofill_profiles"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill Profiles " + "="*10 + "\r\n")
-            if len(rows) != 0:
+                    "origin,language_code FROM web_data.autofill_profiles"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill Profiles", spacing=False)
+            if rows:
                 for row in rows:
                     date_modified = riplib.osxripper_time.get_unix_seconds(row["date_modified"])
-                    output_file.write("GUID              : {0}\r\n".format(row["guid"]))
-                    output_file.write("Company Name      : {0}\r\n".format(row["company_name"]))
-                    output_file.write("Street Address    : {0}\r\n".format(row["street_address"]))
-                    output_file.write("Dependent Locality: {0}\r\n".format(row["dependent_locality"]))
-                    output_file.write("City              : {0}\r\n".format(row["city"]))
-                    output_file.write("State             : {0}\r\n".format(row["state"]))
-                    output_file.write("Zipcode           : {0}\r\n".format(row["zipcode"]))
-                    output_file.write("Sorting Code      : {0}\r\n".format(row["sorting_code"]))
-                    output_file.write("Country Code      : {0}\r\n".format(row["country_code"]))
-                    output_file.write("Date Modified     : {0}\r\n".format(date_modified))
-                    output_file.write("Origin            : {0}\r\n".format(row["origin"]))
-                    output_file.write("Language Code     : {0}\r\n".format(row["language_code"]))
+                    writer.write_record({
+                        "GUID": row["guid"],
+                        "Company Name": row["company_name"],
+                        "Street Address": row["street_address"],
+                        "Dependent Locality": row["dependent_locality"],
+                        "City": row["city"],
+                        "State": row["state"],
+                        "Zipcode": row["zipcode"],
+                        "Sorting Code": row["sorting_code"],
+                        "Country Code": row["country_code"],
+                        "Date Modified": date_modified,
+                        "Origin": row["origin"],
+                        "Language Code": row["language_code"]
+                    })
+                    writer.write_event(date_modified, "Autofill Profile Modified", row["guid"])
             else:
-                output_file.write("No data found in Autofill Profiles table.\r\n")
+                writer.write_text("No data found in Autofill Profiles table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_autofill_profiles_trash(cls, output_file, db_connection):
+    def _parse_autofill_profiles_trash(cls, writer, database):
         """
         Collate data from autofill profiles trash table
         """
         try:
-            query = "SELECT guid FROM autofill_profiles_trash"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Autofill Profile Trash " + "="*10 + "\r\n")
-            if len(rows) != 0:
+            query = "SELECT guid FROM web_data.autofill_profiles_trash"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Autofill Profile Trash", spacing=False)
+            if rows:
                 for row in rows:
                     if row[0] is None:
-                        output_file.write("GUID:\r\n")
+                        writer.write_text("GUID:\r\n")
                     else:
-                        output_file.write("GUID: {0}\r\n".format(row[0]))
+                        writer.write_record({"GUID": row[0]})
             else:
-                output_file.write("No data found in Autofill Profile Trash table.\r\n")
+                writer.write_text("No data found in Autofill Profile Trash table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_credit_cards(cls, output_file, db_connection):
+    def _parse_credit_cards(cls, writer, database):
         """
         Collate data from credit cards table
         """
         try:
             query = "SELECT guid, name_on_card,expiration_month,expiration_year,date_modified,origin " \
-                    "FROM credit_cards"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Credit Cards " + "="*10 + "\r\n")
-            output_file.write("N.B. Card Number is encrypted. Ommitted by plugin.\r\n\r\n")
-            if len(rows) != 0:
+                    "FROM web_data.credit_cards"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Credit Cards", spacing=False)
+            writer.write_text("N.B. Card Number is encrypted. Ommitted by plugin.\r\n\r\n")
+            if rows:
                 for row in rows:
                     date_modified = riplib.osxripper_time.get_unix_seconds(row["date_modified"])
-                    output_file.write("GUID            : {0}\r\n".format(row["guid"]))
-                    output_file.write("Name on Card    : {0}\r\n".format(row["name_on_card"]))
-                    output_file.write("Expiration Month: {0}\r\n".format(row["expiration_month"]))
-                    output_file.write("Expiration Year : {0}\r\n".format(row["expiration_year"]))
-                    output_file.write("Date Modified   : {0}\r\n".format(date_modified))
-                    output_file.write("Origin          : {0}\r\n".format(row["origin"]))
+                    writer.write_record({
+                        "GUID": row["guid"],
+                        "Name on Card": row["name_on_card"],
+                        "Expiration Month": row["expiration_month"],
+                        "Expiration Year": row["expiration_year"],
+                        "Date Modified": date_modified,
+                        "Origin": row["origin"]
+                    })
+                    writer.write_event(date_modified, "Credit Card Modified", "{0} {1}".format(row["guid"], row["name_on_card"]))
             else:
-                output_file.write("No data found in Credit Cards table.\r\n")
+                writer.write_text("No data found in Credit Cards table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_keywords(cls, output_file, db_connection):
+    def _parse_keywords(cls, writer, database):
         """
         Collate data from keywords table
         """
@@ -298,73 +312,72 @@ class UsersChromeWebData(Plugin):
                     "originating_url,date_created,usage_count,input_encodings,suggest_url," \
                     "prepopulate_id,created_by_policy,last_modified,sync_guid,alternate_urls," \
                     "image_url,search_url_post_params,suggest_url_post_params,image_url_post_params," \
-                    "new_tab_url FROM keywords"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Keywords " + "="*10 + "\r\n")
-            if len(rows) != 0:
+                    "new_tab_url FROM web_data.keywords"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Keywords")
+            if rows:
                 for row in rows:
                     kw_created = riplib.osxripper_time.get_unix_seconds(row["date_created"])
                     kw_modified = riplib.osxripper_time.get_unix_seconds(row["last_modified"])
-                    output_file.write("ID                          : {0}\r\n".format(row["id"]))
-                    output_file.write("Short Name                  : {0}\r\n".format(row["short_name"]))
-                    output_file.write("Keyword                     : {0}\r\n".format(row["keyword"]))
-                    output_file.write("FavIcon URL                 : {0}\r\n".format(row["favicon_url"]))
-                    output_file.write("URL                         : {0}\r\n".format(row["url"]))
-                    output_file.write("Safe for Autoreplace        : {0}\r\n".format(row["safe_for_autoreplace"]))
-                    output_file.write("Originating URL             : {0}\r\n".format(row["originating_url"]))
-                    output_file.write("Date Created                : {0}\r\n".format(kw_created))
-                    output_file.write("Usage Count                 : {0}\r\n".format(row["usage_count"]))
-                    output_file.write("Input Encodings             : {0}\r\n".format(row["input_encodings"]))
-                    # output_file.write("Show in Default List        : {0}\r\n".format(row["show_in_default_list"]))
-                    output_file.write("Suggest URL                 : {0}\r\n".format(row["suggest_url"]))
-                    output_file.write("Prepoulate ID               : {0}\r\n".format(row["prepopulate_id"]))
-                    output_file.write("Created by Policy           : {0}\r\n".format(row["created_by_policy"]))
-                    # output_file.write("Instant URL                 : {0}\r\n".format(row["instant_url"]))
-                    output_file.write("Last Modified               : {0}\r\n".format(kw_modified))
-                    output_file.write("Sync GUID                   : {0}\r\n".format(row["sync_guid"]))
-                    output_file.write("Alternate URLs              : {0}\r\n".format(row["alternate_urls"]))
-                    # output_file.write("Search Terms Replacement Key: {0}\r\n".
-                    #          format(row["search_terms_replacement_key"]))
-                    output_file.write("Image URL                   : {0}\r\n".format(row["image_url"]))
-                    output_file.write("Search URL POST Params      : {0}\r\n".format(row["search_url_post_params"]))
-                    output_file.write("Suggest URL POST Params     : {0}\r\n".format(row["suggest_url_post_params"]))
-                    # output_file.write("Instant URL POST Params
-                    # : {0}\r\n".format(row["instant_url_post_params"]))
-                    output_file.write("Image URL POST Params       : {0}\r\n".format(row["image_url_post_params"]))
-                    output_file.write("New Tab URL                 : {0}\r\n".format(row["new_tab_url"]))
-                    output_file.write("\r\n")
+                    writer.write_record({
+                        "ID": row["id"],
+                        "Short Name": row["short_name"],
+                        "Keyword": row["keyword"],
+                        "FavIcon URL": row["favicon_url"],
+                        "URL": row["url"],
+                        "Safe for Autoreplace": row["safe_for_autoreplace"],
+                        "Originating URL": row["originating_url"],
+                        "Date Created": kw_created,
+                        "Usage Count": row["usage_count"],
+                        "Input Encodings": row["input_encodings"],
+                        # "Show in Default List": row["show_in_default_list"],
+                        "Suggest URL": row["suggest_url"],
+                        "Prepoulate ID": row["prepopulate_id"],
+                        "Created by Policy": row["created_by_policy"],
+                        # "Instant URL": row["instant_url"],
+                        "Last Modified": kw_modified,
+                        "Sync GUID": row["sync_guid"],
+                        "Alternate URLs": row["alternate_urls"],
+                        # "Search Terms Replacement Key": row["search_terms_replacement_key"],
+                        "Image URL": row["image_url"],
+                        "Search URL POST Params": row["search_url_post_params"],
+                        "Suggest URL POST Params": row["suggest_url_post_params"],
+                        # "Instant URL POST Params": row["instant_url_post_params"],
+                        "Image URL POST Params": row["image_url_post_params"],
+                        "New Tab URL": row["new_tab_url"]
+                    }, label_width=28)
+                    writer.write_event(kw_created, "Keyword Created", "{0} {1}".format(row["keyword"], row["url"]))
+                    writer.write_event(kw_modified, "Keyword Modified", "{0} {1}".format(row["keyword"], row["url"]))
             else:
-                output_file.write("No data found in Keywords table.\r\n")
+                writer.write_text("No data found in Keywords table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
 
 
     @classmethod
-    def _parse_service(cls, output_file, db_connection):
+    def _parse_service(cls, writer, database):
         """
         Collate data from token service table
         """
         try:
-            query = "SELECT service FROM token_service"
-            cur = db_connection.cursor()
-            cur.execute(query)
-            rows = cur.fetchall()
-            output_file.write("="*10 + " Token Service " + "="*10 + "\r\n")
-            output_file.write("N.B. Service tokens are encrypted. Not retrieved by this plugin\r\n\r\n")
-            if len(rows) != 0:
+            query = "SELECT service FROM web_data.token_service"
+            cur = database.execute(query)
+            rows = riplib.osxripper_sqlite.iterate_rows(cur)
+            writer.start_section("Token Service", spacing=False)
+            writer.write_text("N.B. Service tokens are encrypted. Not retrieved by this plugin\r\n\r\n")
+            if rows:
                 for row in rows:
-                    output_file.write("Service: {0}\r\n".format(row["service"]))
+                    writer.write_record({"Service": row["service"]})
             else:
-                output_file.write("No data found in Token Service table.\r\n")
+                writer.write_text("No data found in Token Service table.\r\n")
             if cur:
                 cur.close()
-            output_file.write("\r\n")
+            writer.write_text("\r\n")
         except sqlite3.Error as error:
             logging.error("%s", error.args[0])
             print("[ERROR] {0}".format(error.args[0]))
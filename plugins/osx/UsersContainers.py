@@ -1,7 +1,7 @@
 """ Module for listing Containers """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,12 +32,12 @@ class UsersContainers(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     launchagents_dir = os.path.join(users_path, username, "Library", "Containers")
-                    if os.path.isdir(launchagents_dir):
+                    if riplib.osxripper_inventory.isdir(launchagents_dir):
                         self.__list_files(launchagents_dir, username)
                     else:
                         logging.warning("%s does not exist.", launchagents_dir)
@@ -50,12 +50,12 @@ class UsersContainers(Plugin):
         """
         List information from /Users/username/Library/Containers
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source Directory: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion"]:
-                dir_listing = os.listdir(file)
+                dir_listing = riplib.osxripper_inventory.listdir(file)
                 for launch_agent in dir_listing:
                     output_file.write("\t{0}\r\n".format(launch_agent))
             elif self._os_version == "snow_leopard":
@@ -1,7 +1,8 @@
 """ Module to parse information from CyberGhost log """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
+import riplib.osxripper_logs
 from riplib.plugin import Plugin
 
 __author__ = 'osxripper'
@@ -30,12 +31,12 @@ class UsersCyberGhostLogs(Plugin):
         Scan for the plist
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     config = os.path.join(users_path, username, "Library", "Application Support")
-                    if os.path.isdir(config):
+                    if riplib.osxripper_inventory.isdir(config):
                         self.__read_logs(config, username)
                     else:
                         logging.warning("%s does not exist.", config)
@@ -47,28 +48,37 @@ class UsersCyberGhostLogs(Plugin):
         """
         Parse /Users/{username}/Library/Application Support/CyberGhost {version}
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_VPN_CyberGhost.txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            app_support_dir = os.listdir(file)
+        with self.open_record_writer("Users_" + username + "_VPN_CyberGhost.txt", {"User": username}) as writer:
+            writer.write_header()
+            app_support_dir = riplib.osxripper_inventory.listdir(file)
             for directory in app_support_dir:
                 if "CyberGhost" in directory:
                     ghost_dir = os.path.join(file, directory)
-                    output_file.write("Source Directory: {0}\r\n\r\n".format(ghost_dir))
-                    ghost_dir_list = os.listdir(ghost_dir)
+                    writer.write_source(ghost_dir, "Source Directory")
+                    ghost_dir_list = riplib.osxripper_inventory.listdir(ghost_dir)
                     for ghost_file in ghost_dir_list:
-                        if ghost_file == "CyberGhostMacLog.log":
-                            output_file.write("="*10 + " " + ghost_file + " " + "="*10 + "\r\n")
-                            with open(os.path.join(ghost_dir, ghost_file), "r") as mac_log:
-                                for line in mac_log.readlines():
-                                    output_file.write("{0}\r\n".format(line))
-                            mac_log.close()
-                            output_file.write("\r\n")
-                        if ghost_file == "CyberGhostMacLogScripts.log":
-                            output_file.write("="*10 + " " + ghost_file + " " + "="*10 + "\r\n")
-                            with open(os.path.join(ghost_dir, ghost_file), "r") as scripts_log:
-                                for line in scripts_log.readlines():
-                                    output_file.write("{0}\r\n".format(line))
-                            scripts_log.close()
-                            output_file.write("\r\n")
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+                        if ghost_file in ["CyberGhostMacLog.log", "CyberGhostMacLogScripts.log"]:
+                            writer.write_text("="*10 + " " + ghost_file + " " + "="*10 + "\r\n")
+                            self.__read_log(writer, os.path.join(ghost_dir, ghost_file))
+                            writer.write_text("\r\n")
+            writer.write_footer()
+
+    def __read_log(self, writer, log_file):
+        """
+        Write the entries of a CyberGhost log between get_since and get_until
+        """
+        reader = self.open_log_reader(log_file)
+        with riplib.osxripper_logs.open_log(log_file) as ghost_log:
+            for line in ghost_log:
+                self.__write_entries(writer, reader.feed("{0}\r\n".format(line)), log_file)
+        self.__write_entries(writer, reader.close(), log_file)
+
+    @staticmethod
+    def __write_entries(writer, entries, log_file):
+        """
+        Write log entries, records name the log they were read from
+        """
+        for record, text in entries:
+            if record is not None:
+                record["Source File"] = log_file
+            writer.write_log(record, text)
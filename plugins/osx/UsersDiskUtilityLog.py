@@ -1,7 +1,8 @@
 """ Module to parse DiskUtilit log """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
+import riplib.osxripper_logs
 from riplib.plugin import Plugin
 
 
@@ -32,12 +33,12 @@ class UsersDiskUtilityLog(Plugin):
         read /Users/username/Library/Logs/DiskUtility.log
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     du_log = os.path.join(users_path, username, "Library", "Logs", self._data_file)
-                    if os.path.isfile(du_log):
+                    if riplib.osxripper_inventory.isfile(du_log):
                         self.__read_disk_util_log(du_log, username)
                     else:
                         logging.warning("%s does not exist.", users_path)
@@ -47,21 +48,23 @@ class UsersDiskUtilityLog(Plugin):
         """
         Read the DiskUtility.log
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            output_file.write("Source File: {0}\r\n\r\n".format(file))
+        with self.open_record_writer("Users_" + username + ".txt", {"User": username}, shared=True) as writer:
+            writer.write_header()
+            writer.write_source(file)
             if self._os_version in ["yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                with codecs.open(file, "r", encoding="utf-8") as du_log:
-                    for line in du_log.readlines():
+                reader = self.open_log_reader(file)
+                with riplib.osxripper_logs.open_log(file) as du_log:
+                    for line in du_log:
                         if "**" not in line and len(line) != 0:
-                            output_file.write(line.replace("\n", "\r\n"))
-                du_log.close()
+                            for record, text in reader.feed(line.replace("\n", "\r\n")):
+                                writer.write_log(record, text)
+                for record, text in reader.close():
+                    writer.write_log(record, text)
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan"]:
                 logging.info("This version of OSX is not supported by this plugin.")
                 print("[INFO] This version of OSX is not supported by this plugin.")
-                output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
+                writer.write_text("[INFO] This version of OSX is not supported by this plugin.\r\n")
             else:
                 logging.warning("Not a known OSX version.")
                 print("[WARNING] Not a known OSX version.")
-            output_file.write("="*40 + "\r\n\r\n")
-        output_file.close()
+            writer.write_footer()
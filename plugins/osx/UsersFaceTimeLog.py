@@ -3,6 +3,7 @@ import codecs
 import logging
 import os
 import re
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -34,12 +35,12 @@ class UsersFaceTimeLog(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     ft_log = os.path.join(users_path, username, "Library", "Logs", "FaceTime", self._data_file)
-                    if os.path.isfile(ft_log):
+                    if riplib.osxripper_inventory.isfile(ft_log):
                         self.__parse_facetime_log(ft_log, username)
                     else:
                         logging.warning("%s does not exist.", ft_log)
@@ -49,7 +50,7 @@ class UsersFaceTimeLog(Plugin):
         """
         Read the FaceTime.log file
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite", "mavericks",
@@ -1,8 +1,8 @@
 """ Module to parse finder plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,12 +33,12 @@ class UsersFinderPlist(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
         # username = None
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     plist = os.path.join(users_path, username, "Library", "Preferences", self._data_file)
-                    if os.path.isfile(plist):
+                    if riplib.osxripper_inventory.isfile(plist):
                         self.__parse_bplist(plist, username)
                     else:
                         logging.warning("%s does not exist.", plist)
@@ -51,12 +51,12 @@ class UsersFinderPlist(Plugin):
         """
         Parse /Users/username/Library/Preferences/com.apple.finder.plist
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -78,7 +78,7 @@ class UsersFinderPlist(Plugin):
 
             elif self._os_version in ["lion", "snow_leopard"]:
                 #  This needs double checking, none of the DVD, or DMGs mounted are recorded...
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
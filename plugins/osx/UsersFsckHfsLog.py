@@ -1,7 +1,8 @@
 """ Module to parse fsck log """
-import codecs
 import logging
 import os
+import riplib.osxripper_inventory
+import riplib.osxripper_logs
 from riplib.plugin import Plugin
 
 
@@ -31,12 +32,12 @@ class UsersFsckHfsLog(Plugin):
         Iterate over /Users directory and find user sub-directories and read /Users/username/Library/Logs/fsck_hfs.log
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     fsck_log = os.path.join(users_path, username, "Library", "Logs", self._data_file)
-                    if os.path.isfile(fsck_log):
+                    if riplib.osxripper_inventory.isfile(fsck_log):
                         self.__read_fsck_hfs_log(fsck_log, username)
                     else:
                         logging.warning("%s does not exist.", fsck_log)
@@ -49,25 +50,22 @@ class UsersFsckHfsLog(Plugin):
         """
         Read the fsck_hfs.log file
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
-            output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            output_file.write("Source File: {0}\r\n\r\n".format(file))
+        with self.open_record_writer("Users_" + username + ".txt", {"User": username}, shared=True) as writer:
+            writer.write_header()
+            writer.write_source(file)
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra", "sierra", "el_capitan", "yosemite",
                                     "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                with codecs.open(file, "r", encoding="utf-8") as fsck:
-                    for line in fsck.readlines():
-                        # fsck_hfs started
-                        if "fsck_hfs started" in line:
-                            output_file.write(line + "\r\n")
-                        # The volume
-                        if "The volume" in line:
-                            output_file.write(line + "\r\n")
-                        # fsck_hfs completed
-                        if "fsck_hfs completed" in line:
-                            output_file.write(line + "\r\n")
-                fsck.close()
+                # The volume lines have no timestamp and belong to the fsck_hfs started line before them
+                reader = self.open_log_reader(file)
+                with riplib.osxripper_logs.open_log(file) as fsck:
+                    for line in fsck:
+                        # fsck_hfs started, The volume, fsck_hfs completed
+                        if "fsck_hfs started" in line or "The volume" in line or "fsck_hfs completed" in line:
+                            for record, text in reader.feed(line + "\r\n"):
+                                writer.write_log(record, text)
+                for record, text in reader.close():
+                    writer.write_log(record, text)
             else:
                 logging.warning("Not a known OSX version.")
                 print("[WARNING] Not a known OSX version.")
-            output_file.write("="*40 + "\r\n")
-        output_file.close()
+            writer.write_text("="*40 + "\r\n")
@@ -1,8 +1,10 @@
 """ Module to parse KnowledgeC database """
-import codecs
 import logging
 import os
 import sqlite3
+import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,34 +34,40 @@ class UsersKnowledgeC(Plugin):
         """
         users_path = os.path.join(self._input_dir, "Users")
 
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
-            for username in user_list:
-                with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_KnowledgeC.txt"), "a", encoding="utf-8") as output_file:
-                    if self._os_version in ["big_sur", "catalina"]:
-                        logging.info("This version of OSX is not supported by this plugin.")
-                        print("[INFO] This version of OSX is not supported by this plugin.")
-                        output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
-                    elif self._os_version in ["mojave", "high_sierra"]:
-                        if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
-                            knowledgec_path = os.path.join(users_path, username, "Library", "Application Support", "Knowledge")
-                            if os.path.isdir(knowledgec_path):
-                                self.__parse_sqlite_db(knowledgec_path, output_file)
-                            else:
-                                logging.warning("%s does not exist.", knowledgec_path)
-                                print("[WARNING] {0} does not exist.".format(knowledgec_path))
-                    elif self._os_version in ["yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard",
-                                              "sierra", "el_capitan"]:
-                        logging.info("This version of OSX is not supported by this plugin.")
-                        print("[INFO] This version of OSX is not supported by this plugin.")
-                        output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
+            self.map_users(self.__parse_user, user_list)
+
+    def __parse_user(self, username):
+        """
+        Parse the KnowledgeC database of a single user
+        """
+        users_path = os.path.join(self._input_dir, "Users")
+        with self.open_output_section("Users_" + username + "_KnowledgeC.txt") as output_file:
+            if self._os_version in ["big_sur", "catalina"]:
+                logging.info("This version of OSX is not supported by this plugin.")
+                print("[INFO] This version of OSX is not supported by this plugin.")
+                output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
+            elif self._os_version in ["mojave", "high_sierra"]:
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                    knowledgec_path = os.path.join(users_path, username, "Library", "Application Support", "Knowledge")
+                    if riplib.osxripper_inventory.isdir(knowledgec_path):
+                        self.__parse_sqlite_db(knowledgec_path, output_file, username)
                     else:
-                        logging.warning("Not a known OSX version.")
-                        print("[WARNING] Not a known OSX version.")
-                    output_file.write("=" * 40 + "\r\n\r\n")
-                output_file.close()
+                        logging.warning("%s does not exist.", knowledgec_path)
+                        print("[WARNING] {0} does not exist.".format(knowledgec_path))
+            elif self._os_version in ["yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard",
+                                      "sierra", "el_capitan"]:
+                logging.info("This version of OSX is not supported by this plugin.")
+                print("[INFO] This version of OSX is not supported by this plugin.")
+                output_file.write("[INFO] This version of OSX is not supported by this plugin.\r\n")
+            else:
+                logging.warning("Not a known OSX version.")
+                print("[WARNING] Not a known OSX version.")
+            output_file.write("=" * 40 + "\r\n\r\n")
+        output_file.close()
 
-    def __parse_sqlite_db(self, database_file, output_file):
+    def __parse_sqlite_db(self, database_file, output_file, username):
         """
         Read the /private/var/db/CoreDuet/Knowledge/KnowledgeC.db SQLite database
         """
@@ -77,6 +85,7 @@ class UsersKnowledgeC(Plugin):
                      "datetime(ZSTARTDATE + 978307200, 'UNIXEPOCH', 'LOCALTIME') as \"START\", " \
                      "datetime(ZENDDATE + 978307200, 'UNIXEPOCH', 'LOCALTIME') as \"END\", " \
                      "(ZENDDATE - ZSTARTDATE) as \"USAGE IN SECONDS\", " \
+                     "ZSTARTDATE as \"RAW START\", " \
                      "ZSTREAMNAME," \
                      "ZVALUESTRING " \
                      "FROM " \
@@ -88,17 +97,17 @@ class UsersKnowledgeC(Plugin):
         output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
         knowledgec_db = os.path.join(database_file, "KnowledgeC.db")
 
-        if os.path.isfile(knowledgec_db):
+        if riplib.osxripper_inventory.isfile(knowledgec_db):
             output_file.write("Source File: {0}\r\n\r\n".format(knowledgec_db))
             sqlite_connection = None
+            timeline = self.open_timeline_writer()
             try:
-                sqlite_connection = sqlite3.connect(knowledgec_db)
-                sqlite_connection.row_factory = sqlite3.Row
+                sqlite_connection = riplib.osxripper_sqlite.connect_readonly(knowledgec_db)
                 with sqlite_connection:
                     cur = sqlite_connection.cursor()
                     cur.execute(mac4n6_sql)
-                    rows = cur.fetchall()
-                    if len(rows) == 0:
+                    rows = riplib.osxripper_sqlite.iterate_rows(cur)
+                    if not rows:
                         output_file.write("No rows returned from query\r\n")
                     else:
                         output_file.write(headers)
@@ -112,13 +121,16 @@ class UsersKnowledgeC(Plugin):
                             output_file.write("{0}\t".format(row["ZSTREAMNAME"]))
                             output_file.write("{0}\t".format(row["ZVALUESTRING"]))
                             output_file.write("\r\n")
+                            timeline.add_event(riplib.osxripper_time.get_cocoa_seconds(row["RAW START"]), username, "App In Focus",
+                                               row["ZVALUESTRING"])
                 output_file.write("\r\n")
             except sqlite3.Error as error:
                 logging.error("%s", error.args[0])
                 print("[ERROR] {0}".format(error.args[0]))
             finally:
+                timeline.close()
                 if sqlite_connection:
-                    sqlite_connection.close()
+                    riplib.osxripper_sqlite.release(sqlite_connection)
         else:
             logging.warning("File: %s does not exist or cannot be found.\r\n", database_file)
             output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(database_file))
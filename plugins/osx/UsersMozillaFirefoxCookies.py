@@ -1,9 +1,10 @@
 """ Module to parse Firefox cookiess """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,8 +34,8 @@ class UsersMozillaFirefoxCookies(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
@@ -42,14 +43,14 @@ class UsersMozillaFirefoxCookies(Plugin):
 
         for username in user_list:
             profile_search_path = "None"
-            if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+            if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                 profile_search_path = os.path.join(users_path, username, "Library", "Application Support", "Firefox", "Profiles")
-            if os.path.isdir(profile_search_path):
-                profiles_list = os.listdir(profile_search_path)
+            if riplib.osxripper_inventory.isdir(profile_search_path):
+                profiles_list = riplib.osxripper_inventory.listdir(profile_search_path)
                 for profile in profiles_list:
                     if profile.endswith(".default"):
                         sqlite_db = os.path.join(profile_search_path, profile, self._data_file)
-                        if os.path.isfile(sqlite_db):
+                        if riplib.osxripper_inventory.isfile(sqlite_db):
                             self.__parse_sqlite_db(sqlite_db, username)
                         else:
                             logging.warning("%s does not exist.", sqlite_db)
@@ -60,9 +61,9 @@ class UsersMozillaFirefoxCookies(Plugin):
         """
         Read the places.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Firefox_Cookies.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_Firefox_Cookies.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 output_file.write("Source File: {0}\r\n\r\n".format(file))
                 conn = None
                 try:
@@ -72,12 +73,11 @@ class UsersMozillaFirefoxCookies(Plugin):
                             "expiry," \
                             "isSecure,isHttpOnly FROM moz_cookies ORDER BY creationTime"
 
-                    conn = sqlite3.connect(file)
-                    conn.row_factory = sqlite3.Row
+                    conn = riplib.osxripper_sqlite.connect_readonly(file)
                     with conn:
                         cur = conn.cursor()
                         cur.execute(query)
-                        rows = cur.fetchall()
+                        rows = riplib.osxripper_sqlite.iterate_rows(cur)
                         for row in rows:
                             creation_time = riplib.osxripper_time.get_unix_micros(row["creationTime"])
                             last_accessed = riplib.osxripper_time.get_unix_micros(row["lastAccessed"])
@@ -99,7 +99,7 @@ class UsersMozillaFirefoxCookies(Plugin):
                     print("[ERROR] {0}".format(error.args[0]))
                 finally:
                     if conn:
-                        conn.close()
+                        riplib.osxripper_sqlite.release(conn)
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                 output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
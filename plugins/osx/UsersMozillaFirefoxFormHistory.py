@@ -1,9 +1,10 @@
 """ Module to parse Firefox form history database """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,22 +34,22 @@ class UsersMozillaFirefoxFormHistory(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
         else:
             logging.warning("%s does not exist.", users_path)
             print("[WARNING] {0} does not exist.".format(users_path))
             return
         for username in user_list:
             profile_search_path = "None"
-            if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+            if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                 profile_search_path = os.path.join(users_path, username, "Library", "Application Support", "Firefox", "Profiles")
-            if os.path.isdir(profile_search_path):
-                profiles_list = os.listdir(profile_search_path)
+            if riplib.osxripper_inventory.isdir(profile_search_path):
+                profiles_list = riplib.osxripper_inventory.listdir(profile_search_path)
                 for profile in profiles_list:
                     if profile.endswith(".default"):
                         sqlite_db = os.path.join(profile_search_path, profile, self._data_file)
-                        if os.path.isfile(sqlite_db):
+                        if riplib.osxripper_inventory.isfile(sqlite_db):
                             self.__parse_sqlite_db(sqlite_db, username)
                         else:
                             logging.warning("%s does not exist.", sqlite_db)
@@ -58,9 +59,9 @@ class UsersMozillaFirefoxFormHistory(Plugin):
         """
         Read the formhistory.sqlite SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Firefox_Form_History.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_Firefox_Form_History.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 output_file.write("Source File: {0}\r\n\r\n".format(file))
                 conn = None
                 try:
@@ -69,12 +70,11 @@ class UsersMozillaFirefoxFormHistory(Plugin):
                             "lastUsed " \
                             "FROM moz_formhistory ORDER BY firstUsed"
 
-                    conn = sqlite3.connect(file)
-                    conn.row_factory = sqlite3.Row
+                    conn = riplib.osxripper_sqlite.connect_readonly(file)
                     with conn:
                         cur = conn.cursor()
                         cur.execute(query)
-                        rows = cur.fetchall()
+                        rows = riplib.osxripper_sqlite.iterate_rows(cur)
                         for row in rows:
                             first_used = riplib.osxripper_time.get_unix_micros(row["firstUsed"])
                             last_used = riplib.osxripper_time.get_unix_micros(row["lastUsed"])
@@ -90,7 +90,7 @@ class UsersMozillaFirefoxFormHistory(Plugin):
                     print("[ERROR] {0}".format(error.args[0]))
                 finally:
                     if conn:
-                        conn.close()
+                        riplib.osxripper_sqlite.release(conn)
             else:
                 logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                 output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
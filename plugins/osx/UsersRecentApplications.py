@@ -1,8 +1,8 @@
 """ Module to extract Recent Application information """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -26,19 +26,19 @@ class UsersRecentApplications(Plugin):
         self.set_description("Parse information from /Users/username/Library/Application Support/com.apple.sharedfilelist/com.apple.LSSharedFileList.RecentApplications.sfl")
         self.set_data_file("com.apple.LSSharedFileList.RecentApplications.sfl")
         self.set_output_file("_RecentApplications.txt")
-        self.set_type = "bplist"
+        self.set_type("bplist")
 
     def parse(self):
         """
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     plist = os.path.join(users_path, username, "Library", "Application Support", "com.apple.sharedfilelist", self._data_file)
-                    if os.path.isfile(plist):
+                    if riplib.osxripper_inventory.isfile(plist):
                         self.__parse_bplist(plist, username)
                     else:
                         logging.warning("%s does not exist.", plist)
@@ -51,14 +51,14 @@ class UsersRecentApplications(Plugin):
         """
         Parse com.apple.LSSharedFileList.RecentApplications.sfl
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + self._output_file), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + self._output_file) as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra"]:
                 # Uses .sfl2 files
                 pass
             elif self._os_version in ["sierra", "el_capitan"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -1,8 +1,8 @@
 """ Module to extract information from recentitems plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,10 +32,10 @@ class UsersRecentItemsPlist(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     # if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra"]:
                     #     # File does not exist in these versions
                     #     return
@@ -46,7 +46,7 @@ class UsersRecentItemsPlist(Plugin):
                     else:
                         plist = os.path.join(users_path, username, "Library", "Preferences", self._data_file)
 
-                    if os.path.isfile(plist):
+                    if riplib.osxripper_inventory.isfile(plist):
                         self.__parse_bplist(plist, username)
                     else:
                         logging.warning("%s does not exist.", plist)
@@ -60,10 +60,10 @@ class UsersRecentItemsPlist(Plugin):
         Parse /Users/username/Library/Preferences/com.apple.recentitems.plist or in El Capitan
         /Users/<username>/Library/Application Support/com.apple.sharedfilelist/com.apple.LSSharedFileList.RecentHosts.sfl
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + ".txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + ".txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             if self._os_version in ["high_sierra", "sierra", "el_capitan"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     output_file.write("Source File: {0}\r\n\r\n".format(file))
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
@@ -71,7 +71,7 @@ class UsersRecentItemsPlist(Plugin):
                     parse_os = ParseVers10131011(output_file, plist)
                     parse_os.parse()
             elif self._os_version in ["yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     output_file.write("Source File: {0}\r\n\r\n".format(file))
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
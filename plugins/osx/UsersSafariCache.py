@@ -1,8 +1,9 @@
 """ Module to parse Safari cache database """
-import codecs
 import logging
 import os
 import sqlite3
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -34,17 +35,17 @@ class UsersSafariCache(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
                 sqlite_db = None
                 if self._os_version in ["mojave", "catalina"]:
-                    if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                    if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                         sqlite_db = os.path.join(users_path, username, "Library", "Containers", "com.apple.Safari", "Data", "Library", "Caches", "com.apple.safari", self._data_file)
                     else:
-                        if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                        if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                             sqlite_db = os.path.join(users_path, username, "Library", "Caches", "com.apple.safari", self._data_file)
-                    if os.path.isfile(sqlite_db):
+                    if riplib.osxripper_inventory.isfile(sqlite_db):
                         self.__parse_sqlite_db(sqlite_db, username)
                     else:
                         logging.warning("%s does not exist.", sqlite_db)
@@ -57,14 +58,14 @@ class UsersSafariCache(Plugin):
         """
         Read the WebpageIcons.db SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Safari_Cache.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_Safari_Cache.txt") as output_file:
             output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
             # if self._os_version in ["big_sur", "mojave", "catalina"]:
             if self._os_version in ["mojave", "catalina"]:
                 # Does not exist in Mojave or Catalina
                 pass
             if self._os_version in ["high_sierra", "sierra", "el_capitan", "yosemite", "mavericks", "mountain_lion"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     output_file.write("Source File: {0}\r\n\r\n".format(file))
                     parse_os = ParseVers1013108(output_file, file)
                     parse_os.parse()
@@ -74,7 +75,7 @@ class UsersSafariCache(Plugin):
                     print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
 
             elif self._os_version in ["lion", "snow_leopard"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     output_file.write("Source File: {0}\r\n\r\n".format(file))
                     parse_os = ParseVers107106(output_file, file)
                     parse_os.parse()
@@ -103,12 +104,11 @@ class ParseVers1013108():
         conn = None
         query = "SELECT request_key, partition, time_stamp FROM cfurl_cache_response"
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
                 for row in rows:
                     self._output_file.write("Request Key: {0}\r\n".format(row["request_key"]))
                     self._output_file.write("Partition  : {0}\r\n".format(row["partition"]))
@@ -120,7 +120,7 @@ class ParseVers1013108():
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
+                riplib.osxripper_sqlite.release(conn)
 
 class ParseVers107106():
     """
@@ -137,12 +137,11 @@ class ParseVers107106():
         query = "SELECT request_key, time_stamp FROM cfurl_cache_response"
         conn = None
         try:
-            conn = sqlite3.connect(self._data_file)
-            conn.row_factory = sqlite3.Row
+            conn = riplib.osxripper_sqlite.connect_readonly(self._data_file)
             with conn:
                 cur = conn.cursor()
                 cur.execute(query)
-                rows = cur.fetchall()
+                rows = riplib.osxripper_sqlite.iterate_rows(cur)
                 for row in rows:
                     self._output_file.write("Request Key: {0}\r\n".format(row["request_key"]))
                     self._output_file.write("Timestamp  : {0}\r\n".format(row["time_stamp"]))
@@ -153,4 +152,4 @@ class ParseVers107106():
             print("[ERROR] {0}".format(error.args[0]))
         finally:
             if conn:
-                conn.close()
+                riplib.osxripper_sqlite.release(conn)
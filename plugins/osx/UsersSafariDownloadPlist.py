@@ -1,9 +1,9 @@
 """ Module tp parse Downloads plist """
-import codecs
 import logging
 import os
 import plistlib
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,12 +33,12 @@ class UsersSafariDownloadPlist(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     plist = os.path.join(users_path, username, "Library", "Safari", self._data_file)
-                    if os.path.isfile(plist):
+                    if riplib.osxripper_inventory.isfile(plist):
                         self.__parse_bplist(plist, username)
                     else:
                         logging.warning("%s does not exist.", plist)
@@ -51,14 +51,14 @@ class UsersSafariDownloadPlist(Plugin):
         """
         Parse /Users/username/Library/Safari/Downloads.plist
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Safari_Downloads.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_Safari_Downloads.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self._os_version in ["big_sur", "catalina", "mojave"]:
                 # Does not exist
                 pass
             elif self._os_version in ["high_sierra", "sierra", "el_capitan", "yosemite"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -70,7 +70,7 @@ class UsersSafariDownloadPlist(Plugin):
                     print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
 
             elif self._os_version in ["mavericks", "mountain_lion", "lion"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
@@ -81,7 +81,7 @@ class UsersSafariDownloadPlist(Plugin):
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
                     print("[WARNING] File: {0} does not exist or cannot be found.".format(file))
             elif self._os_version == "snow_leopard":
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     with open(file, "rb") as plist_to_load:
                         plist = plistlib.load(plist_to_load)
                         plist_to_load.close()
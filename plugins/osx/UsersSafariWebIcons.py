@@ -1,9 +1,10 @@
 """ Module to parse Safari WebPageIcons database """
-import codecs
 import logging
 import os
 import sqlite3
 import riplib.osxripper_time
+import riplib.osxripper_sqlite
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -33,12 +34,12 @@ class UsersSafariWebIcons(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     sqlite_db = os.path.join(users_path, username, "Library", "Safari", self._data_file)
-                    if os.path.isfile(sqlite_db):
+                    if riplib.osxripper_inventory.isfile(sqlite_db):
                         self.__parse_sqlite_db(sqlite_db, username)
                     else:
                         logging.warning("%s does not exist.", sqlite_db)
@@ -51,7 +52,7 @@ class UsersSafariWebIcons(Plugin):
         """
         Read the WebpageIcons.db SQLite database
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_Safari_Webpage_Icons.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_Safari_Webpage_Icons.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             if self._os_version in ["big_sur", "catalina", "mojave", "high_sierra"]:
                 # Does not exist
@@ -60,16 +61,15 @@ class UsersSafariWebIcons(Plugin):
                 query = "SELECT pu.url AS p_url,ii.url AS i_url,ii.stamp " \
                         "FROM IconInfo ii,PageURL pu " \
                         "WHERE pu.iconID = ii.iconID"
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     output_file.write("Source File: {0}\r\n\r\n".format(file))
                     conn = None
                     try:
-                        conn = sqlite3.connect(file)
-                        conn.row_factory = sqlite3.Row
+                        conn = riplib.osxripper_sqlite.connect_readonly(file)
                         with conn:
                             cur = conn.cursor()
                             cur.execute(query)
-                            rows = cur.fetchall()
+                            rows = riplib.osxripper_sqlite.iterate_rows(cur)
                             for row in rows:
                                 stamp = riplib.osxripper_time.get_unix_seconds(row["stamp"])
                                 output_file.write("Page URL      : {0}\r\n".format(row["p_url"]))
@@ -81,7 +81,7 @@ class UsersSafariWebIcons(Plugin):
                         print("[ERROR] {0}".format(error.args[0]))
                     finally:
                         if conn:
-                            conn.close()
+                            riplib.osxripper_sqlite.release(conn)
                 else:
                     logging.warning("File: %s does not exist or cannot be found.\r\n", file)
                     output_file.write("[WARNING] File: {0} does not exist or cannot be found.\r\n".format(file))
@@ -1,8 +1,8 @@
 """ Module to parse sidebarlists plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,12 +32,12 @@ class UsersSidebarPlist(Plugin):
         Iterate over /Users directory and find user sub-directories
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     sidebar_plist = os.path.join(users_path, username, "Library", "Preferences", self._data_file)
-                    if os.path.isfile(sidebar_plist):
+                    if riplib.osxripper_inventory.isfile(sidebar_plist):
                         self.__parse_bplist(sidebar_plist, username)
                     else:
                         logging.warning("%s does not exist.", sidebar_plist)
@@ -50,7 +50,7 @@ class UsersSidebarPlist(Plugin):
         """
         Parse /Users/<username>/Library/Preferences/com.apple.sidebarlists.plist
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_SidebarList.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_SidebarList.txt") as output_file:
             output_file.write("=" * 10 + " " + self._name + " " + "=" * 10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
             if self.set_os_version in ["big_sur", "catalina", "mojave", "high_sierra"]:
@@ -58,7 +58,7 @@ class UsersSidebarPlist(Plugin):
                 output_file.write("[INFO] File: com.apple.sidebarlists.plist not in this version.\r\n")
                 print("[INFO] File: com.apple.sidebarlists.plist not in this version.")
             elif self._os_version in ["sierra", "el_capitan", "yosemite", "mavericks", "mountain_lion", "lion", "snow_leopard"]:
-                if os.path.isfile(file):
+                if riplib.osxripper_inventory.isfile(file):
                     bplist = open(file, "rb")
                     plist = riplib.ccl_bplist.load(bplist)
                     bplist.close()
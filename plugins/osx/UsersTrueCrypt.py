@@ -2,6 +2,7 @@
 import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,13 +32,13 @@ class UsersTrueCrypt(Plugin):
         Find the xml file
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     config = os.path\
                         .join(users_path, username, "Library", "Application Support", "TrueCrypt", self._data_file)
-                    if os.path.isfile(config):
+                    if riplib.osxripper_inventory.isfile(config):
                         self.__parse_config(config, username)
                     else:
                         logging.warning("%s does not exist.", config)
@@ -50,10 +51,10 @@ class UsersTrueCrypt(Plugin):
         /Users/{username}/Library/Application Support/TrueCrypt/Configuration.xml
         N.B. OSX version checking removed as this is a common directory and file across versions
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_TrueCrypt_config.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_TrueCrypt_config.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 config_file = codecs.open(file, "r", encoding="utf-8")
                 for lines in config_file:
                     output_file.write(lines.replace("\n", "\r\n"))
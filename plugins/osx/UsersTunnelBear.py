@@ -1,8 +1,8 @@
 """ Module to parse TunnelBear plist """
-import codecs
 import logging
 import os
 import riplib.ccl_bplist
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -32,12 +32,12 @@ class UsersTunnelBear(Plugin):
         Scan for the plist
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     config = os.path.join(users_path, username, "Library", "Preferences", self._data_file)
-                    if os.path.isfile(config):
+                    if riplib.osxripper_inventory.isfile(config):
                         self.__parse_plist(config, username)
                     else:
                         logging.warning("%s does not exist.", config)
@@ -49,10 +49,10 @@ class UsersTunnelBear(Plugin):
         """
         Parse /Users/{username}/Library/Preferences/com.tunnelbear.mac.TunnelBear.plist
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_VPN_TunnelBear.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_VPN_TunnelBear.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 bplist = open(file, "rb")
                 plist = riplib.ccl_bplist.load(bplist)
                 bplist.close()
@@ -2,6 +2,7 @@
 import codecs
 import logging
 import os
+import riplib.osxripper_inventory
 from riplib.plugin import Plugin
 
 
@@ -31,12 +32,12 @@ class UsersVMWare(Plugin):
         Find the inventory listing file
         """
         users_path = os.path.join(self._input_dir, "Users")
-        if os.path.isdir(users_path):
-            user_list = os.listdir(users_path)
+        if riplib.osxripper_inventory.isdir(users_path):
+            user_list = riplib.osxripper_inventory.listdir(users_path)
             for username in user_list:
-                if os.path.isdir(os.path.join(users_path, username)) and not username == "Shared":
+                if riplib.osxripper_inventory.isdir(os.path.join(users_path, username)) and not username == "Shared":
                     inventory = os.path.join(users_path, username, "Library", "Application Support", "VMware Fusion", self._data_file)
-                    if os.path.isfile(inventory):
+                    if riplib.osxripper_inventory.isfile(inventory):
                         self.__parse_config(inventory, username)
                     else:
                         logging.warning("%s does not exist.", inventory)
@@ -49,10 +50,10 @@ class UsersVMWare(Plugin):
         /Users/{username}/Library/Application Support/VMware Fusion/vmInventory file
         N.B. OSX version checking removed as this is a common directory and file across versions
         """
-        with codecs.open(os.path.join(self._output_dir, "Users_" + username + "_VMware_inventory.txt"), "a", encoding="utf-8") as output_file:
+        with self.open_output_section("Users_" + username + "_VMware_inventory.txt") as output_file:
             output_file.write("="*10 + " " + self._name + " " + "="*10 + "\r\n")
             output_file.write("Source File: {0}\r\n\r\n".format(file))
-            if os.path.isfile(file):
+            if riplib.osxripper_inventory.isfile(file):
                 inventory_file = codecs.open(file, "r", encoding="utf-8")
                 for lines in inventory_file:
                     output_file.write(lines.replace("\n", "\r\n"))
@@ -27,8 +27,11 @@ SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import sys
 import os
+import io
+import mmap
 import struct
 import datetime
+import collections.abc
 
 __version__ = "0.16"
 __description__ = "Converts Apple binary PList files into a native Python data structure"
@@ -261,28 +264,239 @@ def __decode_object(f, offset, collection_offset_size, offset_table):
         return dict_result
 
 
+_SIGNED_INT_STRUCTS = {1: struct.Struct(">B"), 2: struct.Struct(">h"), 4: struct.Struct(">i"), 8: struct.Struct(">q")}
+_UNSIGNED_INT_STRUCTS = {1: struct.Struct(">B"), 2: struct.Struct(">H"), 4: struct.Struct(">I"), 8: struct.Struct(">Q")}
+_FLOAT_STRUCTS = {4: struct.Struct(">f"), 8: struct.Struct(">d")}
+_TRAILER_STRUCT = struct.Struct(">6xbbQQQ")
+
+
+def _unpack_int(buf, offset, length, signed=True):
+    # Same results as __decode_multibyte_int, unpacked in place from the buffer
+    structs = _SIGNED_INT_STRUCTS if signed else _UNSIGNED_INT_STRUCTS
+    if length in structs:
+        return structs[length].unpack_from(buf, offset)[0]
+    return __decode_multibyte_int(bytes(buf[offset:offset + length]), signed)
+
+
+def _unpack_float(buf, offset, length):
+    if length not in _FLOAT_STRUCTS:
+        raise BplistError("Cannot decode float of length {0}".format(length))
+    return _FLOAT_STRUCTS[length].unpack_from(buf, offset)[0]
+
+
+def _map_file(f):
+    """Returns a read-only buffer over the whole of a file-like object, memory mapped where possible."""
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        # Not a real file (e.g. BytesIO) or an empty file, mmap cannot be used
+        f.seek(0)
+        return f.read()
+
+
+class _BplistReader:
+    """Decodes objects straight out of a memory mapped binary plist using struct.unpack_from.
+    Objects are decoded on request and cached by object index until the reader is closed."""
+
+    def __init__(self, f):
+        self._cache = {}
+        self._mapping = _map_file(f)
+        self._buf = memoryview(self._mapping)
+        if self._buf[0:8] != b"bplist00":
+            self.close()
+            raise BplistError("Bad file header")
+        if len(self._buf) < 40:
+            self.close()
+            raise BplistError("File too short to contain a trailer")
+        (self._offset_int_size, self._collection_offset_size, self._object_count,
+         self.top_level_object_index, self._offset_table_offset) = _TRAILER_STRUCT.unpack_from(self._buf, len(self._buf) - 32)
+
+    def close(self):
+        self._cache.clear()
+        self._buf.release()
+        if isinstance(self._mapping, mmap.mmap):
+            try:
+                self._mapping.close()
+            except BufferError:
+                # Still exported by a live memoryview slice, the mapping is freed with it
+                pass
+
+    def object_offset(self, index):
+        if not 0 <= index < self._object_count:
+            raise BplistError("Object reference {0} out of range".format(index))
+        return _unpack_int(self._buf, self._offset_table_offset + index * self._offset_int_size,
+                           self._offset_int_size, False)
+
+    def object(self, index, lazy=False):
+        """Returns the decoded object at index, collections are returned as lazy views if lazy is True.
+        Decoded lists and dicts are not cached, each reference to one gets its own copy that callers may change."""
+        key = (index, lazy)
+        try:
+            return self._cache[key]
+        except KeyError:
+            pass
+        result = self._decode(self.object_offset(index), lazy)
+        if lazy or not isinstance(result, (list, dict)):
+            self._cache[key] = result
+        return result
+
+    def _read_length(self, offset, type_byte, name):
+        # Returns the length/count of a variable sized object and the offset of its payload
+        if type_byte & 0x0F != 0x0F:
+            return type_byte & 0x0F, offset + 1
+        int_type_byte = self._buf[offset + 1]
+        if int_type_byte & 0xF0 != 0x10:
+            raise BplistError("Long {0} field definition not followed by int type at offset {1}".format(name, offset + 2))
+        int_length = 2 ** (int_type_byte & 0x0F)
+        return _unpack_int(self._buf, offset + 2, int_length, False), offset + 2 + int_length
+
+    def _read_refs(self, offset, count):
+        size = self._collection_offset_size
+        return [_unpack_int(self._buf, offset + i * size, size, False) for i in range(count)]
+
+    def _decode(self, offset, lazy):
+        buf = self._buf
+        type_byte = buf[offset]
+        if type_byte == 0x00:  # Null      0000 0000
+            return None
+        elif type_byte == 0x08:  # False   0000 1000
+            return False
+        elif type_byte == 0x09:  # True    0000 1001
+            return True
+        elif type_byte == 0x0F:  # Fill    0000 1111
+            raise BplistError("Fill type not currently supported at offset {0}".format(offset + 1))
+        high_nibble = type_byte & 0xF0
+        if high_nibble == 0x10:  # Int    0001 xxxx
+            return _unpack_int(buf, offset + 1, 2 ** (type_byte & 0x0F))
+        elif high_nibble == 0x20:  # Float   0010 nnnn
+            return _unpack_float(buf, offset + 1, 2 ** (type_byte & 0x0F))
+        elif type_byte == 0x33:  # Date   0011 0011
+            date_value = _unpack_float(buf, offset + 1, 8)
+            try:
+                return datetime.datetime(2001, 1, 1) + datetime.timedelta(seconds=date_value)
+            except OverflowError:
+                return datetime.datetime.min
+        elif high_nibble == 0x40:  # Data   0100 nnnn
+            length, start = self._read_length(offset, type_byte, "Data")
+            return bytes(buf[start:start + length])
+        elif high_nibble == 0x50:  # ASCII  0101 nnnn
+            length, start = self._read_length(offset, type_byte, "ASCII")
+            return bytes(buf[start:start + length]).decode("ascii")
+        elif high_nibble == 0x60:  # UTF-16  0110 nnnn
+            length, start = self._read_length(offset, type_byte, "UTF-16")
+            return bytes(buf[start:start + length * 2]).decode("utf_16_be")
+        elif high_nibble == 0x80:  # UID    1000 nnnn
+            return BplistUID(_unpack_int(buf, offset + 1, (type_byte & 0x0F) + 1, False))
+        elif high_nibble == 0xA0 or high_nibble == 0xC0:  # Array 1010 nnnn, Set 1100 nnnn
+            count, start = self._read_length(offset, type_byte, "Array" if high_nibble == 0xA0 else "Set")
+            refs = self._read_refs(start, count)
+            if lazy:
+                return LazyBplistList(self, refs)
+            return [self.object(ref) for ref in refs]
+        elif high_nibble == 0xD0:  # Dict  1101 nnnn
+            count, start = self._read_length(offset, type_byte, "Dict")
+            key_refs = self._read_refs(start, count)
+            value_refs = self._read_refs(start + count * self._collection_offset_size, count)
+            if lazy:
+                return LazyBplistDict(self, key_refs, value_refs)
+            return {self.object(key_ref): self.object(value_ref) for key_ref, value_ref in zip(key_refs, value_refs)}
+
+
+class LazyBplistList(collections.abc.Sequence):
+    """Read-only list view over a bplist array, items are decoded on first access."""
+
+    def __init__(self, reader, refs):
+        self._reader = reader
+        self._refs = refs
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._reader.object(ref, True) for ref in self._refs[index]]
+        return self._reader.object(self._refs[index], True)
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __repr__(self):
+        return "LazyBplistList({0} items)".format(len(self._refs))
+
+
+class LazyBplistDict(collections.abc.Mapping):
+    """Read-only dict view over a bplist dictionary, keys are decoded on first use and values on first access."""
+
+    def __init__(self, reader, key_refs, value_refs):
+        self._reader = reader
+        self._key_refs = key_refs
+        self._value_refs = value_refs
+        self._index = None
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = {self._reader.object(key_ref): value_ref
+                           for key_ref, value_ref in zip(self._key_refs, self._value_refs)}
+        return self._index
+
+    def __getitem__(self, key):
+        return self._reader.object(self._get_index()[key], True)
+
+    def __contains__(self, key):
+        return key in self._get_index()
+
+    def __iter__(self):
+        return iter(self._get_index())
+
+    def __len__(self):
+        return len(self._key_refs)
+
+    def __repr__(self):
+        return "LazyBplistDict({0} items)".format(len(self._key_refs))
+
+
 def load(f):
     """
     Reads and converts a file-like object containing a binary property list.
     Takes a file-like object (must support reading and seeking) as an argument
     Returns a data structure representing the data in the property list
     """
-    # Check magic number
-    if f.read(8) != b"bplist00":
-        raise BplistError("Bad file header")
-
-    # Read trailer
-    f.seek(-32, os.SEEK_END)
-    trailer = f.read(32)
-    offset_int_size, collection_offset_size, object_count, top_level_object_index, offest_table_offset = struct.unpack(">6xbbQQQ", trailer)
-
-    # Read offset table
-    f.seek(offest_table_offset)
-    offset_table = []
-    for _ in range(object_count):
-        offset_table.append(__decode_multibyte_int(f.read(offset_int_size), False))
-    
-    return __decode_object(f, offset_table[top_level_object_index], collection_offset_size, offset_table)
+    reader = _BplistReader(f)
+    try:
+        return reader.object(reader.top_level_object_index)
+    finally:
+        reader.close()
+
+
+class LazyBplist:
+    """A binary property list opened by load_lazy. The lazy views read from the memory mapped file until
+    close() is called, used as a context manager it returns the top level object and closes on exit."""
+
+    def __init__(self, reader):
+        self._reader = reader
+        self.root = reader.object(reader.top_level_object_index, True)
+
+    def close(self):
+        self._reader.close()
+
+    def __enter__(self):
+        return self.root
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_lazy(f):
+    """
+    Reads a file-like object containing a binary property list without decoding it up front.
+    Returns a LazyBplist, its root holds the top level object. Dictionaries and arrays are returned as
+    read-only LazyBplistDict/LazyBplistList views which decode their contents on access, so only the
+    parts of a large plist that are used get decoded. The file is memory mapped where possible and may
+    be closed once this returns, the views can be used until the LazyBplist is closed.
+    """
+    reader = _BplistReader(f)
+    try:
+        return LazyBplist(reader)
+    except BaseException:
+        reader.close()
+        raise
 
 
 def NSKeyedArchiver_common_objects_convertor(o):
@@ -0,0 +1,197 @@
+""" Module to run a batch of images over a pool of warm worker processes """
+import csv
+import importlib
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from riplib import osxripper_output
+from riplib import osxripper_records
+from riplib import osxripper_scheduler
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+IMAGE_WORKERS = 2  # images prepared and scheduled at the same time
+IMAGE_ATTRIBUTE = "osxripper_image"  # log record attribute holding the index of the image it belongs to
+PLUGIN_PACKAGE = "plugins.osx"
+
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+_image = threading.local()  # .index is the image the thread or worker process is working on
+
+
+class BatchImage():
+    """
+    Class to hold an input and output directory pair of a batch and the outcome of its run
+    """
+    def __init__(self, index, input_dir, output_dir):
+        """
+        Initialise the class.
+        """
+        self.index = index
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.os_version = None
+        self.status = STATUS_PENDING
+        self.error = None
+        self.wall_time = 0.0
+        self.results = []
+
+    @property
+    def get_failed_count(self):
+        """
+        Return the number of plugins that failed or were skipped
+        """
+        return len([result for result in self.results if result.status != osxripper_scheduler.STATUS_OK])
+
+    def __repr__(self):
+        """
+        Return a string representation of the image
+        """
+        return "BatchImage(%d, %s, %s, %s)" % (self.index, self.input_dir, self.output_dir, self.status)
+
+
+def read_batch_manifest(manifest_path):
+    """
+    Return a BatchImage per line of a batch manifest. Each line holds an input and an output directory
+    separated by a tab or a comma, paths containing commas are quoted. Blank lines and lines starting
+    with # are ignored.
+    """
+    images = []
+    with open(manifest_path, "r", encoding="utf-8", newline="") as manifest_file:
+        for line_number, line in enumerate(manifest_file, 1):
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            fields = next(csv.reader([line.rstrip("\r\n")], delimiter="\t" if "\t" in line else ","))
+            fields = [field.strip() for field in fields]
+            if len(fields) != 2 or not all(fields):
+                raise ValueError("{0} line {1}: expected an input and an output directory"
+                                 .format(manifest_path, line_number))
+            images.append(BatchImage(len(images) + 1, fields[0], fields[1]))
+    return images
+
+
+def set_current_image(index):
+    """
+    Set the image the calling thread is working on, its log records are stamped with the index
+    """
+    _image.index = index
+
+
+class ImageFilter(logging.Filter):
+    """
+    Stamp log records with the image the logging thread or worker process is working on
+    """
+    def filter(self, record):
+        if not hasattr(record, IMAGE_ATTRIBUTE):
+            setattr(record, IMAGE_ATTRIBUTE, getattr(_image, "index", None))
+        return True
+
+
+class ImageLogFilter(logging.Filter):
+    """
+    Keep only the log records of one image, used on the handler writing the image's log file
+    """
+    def __init__(self, index):
+        """
+        Initialise the class.
+        """
+        super().__init__()
+        self._index = index
+
+    def filter(self, record):
+        return getattr(record, IMAGE_ATTRIBUTE, None) == self._index
+
+
+class _RootHandler(logging.Handler):
+    """
+    Pass the log records of worker processes to the handlers the root logger has when they arrive,
+    so image log files added during the batch receive them
+    """
+    def emit(self, record):
+        logging.getLogger().handle(record)
+
+
+class WarmPool():
+    """
+    Pool of worker processes kept for the whole batch, each worker imports the plugins once when it
+    starts and routes its logging to the driver
+    """
+    def __init__(self, max_workers, class_names):
+        """
+        Initialise the class.
+        """
+        self._max_workers = max(1, max_workers)
+        self._class_names = list(class_names)
+        self._executor = None
+        self._log_queue = None
+        self._log_listener = None
+
+    @property
+    def get_executor(self):
+        """
+        Return the executor of the pool
+        """
+        return self._executor
+
+    @property
+    def get_max_workers(self):
+        """
+        Return the number of worker processes
+        """
+        return self._max_workers
+
+    def __enter__(self):
+        """
+        Start the worker processes
+        """
+        self._log_queue = multiprocessing.Queue()
+        self._log_listener = logging.handlers.QueueListener(self._log_queue, _RootHandler())
+        self._log_listener.start()
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers, initializer=_init_worker,
+                                             initargs=(self._log_queue, logging.getLogger().level, self._class_names))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Shut down the worker processes
+        """
+        self._executor.shutdown(wait=True)
+        self._log_listener.stop()
+        self._log_listener = None
+
+
+def _init_worker(log_queue, log_level, class_names):
+    """
+    Route the logging of a worker process to the driver and import the plugin modules
+    """
+    osxripper_scheduler._init_worker_process(log_queue, log_level)
+    logging.getLogger().addFilter(ImageFilter())
+    for class_name in class_names:
+        try:
+            importlib.import_module(PLUGIN_PACKAGE + "." + class_name)
+        except Exception as error:
+            logging.error("Unable to import %s: %s: %s", class_name, error.__class__.__name__, error)
+
+
+def run_image_plugin(image_index, plugin, profile=False, run_cache=None):
+    """
+    Run a plugin of a batch image in a worker process, see osxripper_scheduler.run_plugin, or
+    run_cached_plugin when the image has a run cache. The output files and database the worker opened
+    for the image are let go so the driver can finish the image while the worker goes on with other images.
+    """
+    set_current_image(image_index)
+    try:
+        if run_cache is not None:
+            return osxripper_scheduler.run_cached_plugin(run_cache, plugin, profile)
+        return osxripper_scheduler.run_plugin(plugin, profile)
+    finally:
+        osxripper_output.close_all()
+        osxripper_records.detach_database(plugin.get_output_dir)
+        set_current_image(None)
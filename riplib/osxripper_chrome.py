@@ -0,0 +1,379 @@
+""" Module to locate the profiles of Google Chrome and other Chromium based browsers of each user """
+import functools
+import json
+import logging
+import os
+import re
+import threading
+from riplib import osxripper_inventory
+from riplib import osxripper_runcache
+from riplib import osxripper_sqlite
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+LOCAL_STATE = "Local State"  # JSON file of a browser's user data directory listing its profiles
+DEFAULT_PROFILE = "Default"
+# A directory of the user data directory holding a profile, other profiles are found through Local State
+PROFILE_DIRECTORY = re.compile(r"^(Default|Profile \d+|Guest Profile)$")
+# A user data directory that is a profile itself, as Opera's is, holds this file
+PROFILE_FILE = "Preferences"
+
+# Browser -> user data directory below ~/Library/Application Support, Chrome first
+BROWSERS = [
+    ("Chrome", os.path.join("Google", "Chrome")),
+    ("Chrome Beta", os.path.join("Google", "Chrome Beta")),
+    ("Chrome Canary", os.path.join("Google", "Chrome Canary")),
+    ("Chromium", "Chromium"),
+    ("Edge", "Microsoft Edge"),
+    ("Brave", os.path.join("BraveSoftware", "Brave-Browser")),
+    ("Vivaldi", "Vivaldi"),
+    ("Opera", "com.operasoftware.Opera")
+]
+
+# Schema name -> database of a profile, attached by ProfileDatabase to one connection under these names
+PROFILE_DATABASES = [
+    ("history", "History"),
+    ("favicons", "Favicons"),
+    ("cookies", "Cookies"),
+    ("login_data", "Login Data"),
+    ("web_data", "Web Data")
+]
+
+# Core page transition types of a visit, the low byte of visits.transition
+TRANSITIONS = ["LINK", "TYPED", "AUTO_BOOKMARK", "AUTO_SUBFRAME", "MANUAL_SUBFRAME", "GENERATED", "AUTO_TOPLEVEL",
+               "FORM_SUBMIT", "RELOAD", "KEYWORD", "KEYWORD_GENERATED"]
+# Qualifier bits of visits.transition, in the order they are listed
+TRANSITION_QUALIFIERS = [
+    (0x00800000, "BLOCKED"),
+    (0x01000000, "FORWARD_BACK"),
+    (0x02000000, "FROM_ADDRESS_BAR"),
+    (0x04000000, "HOME_PAGE"),
+    (0x08000000, "FROM_API"),
+    (0x10000000, "CHAIN_START"),
+    (0x20000000, "CHAIN_END"),
+    (0x40000000, "CLIENT_REDIRECT"),
+    (0x80000000, "SERVER_REDIRECT")
+]
+
+_locators = {}
+_locators_lock = threading.Lock()
+
+
+class ChromeProfile():
+    """
+    Class to hold a profile directory of a Chromium based browser of a user
+    """
+    def __init__(self, username, browser, profile_dir, path, name=None):
+        """
+        Initialise the class. profile_dir is the directory name, e.g. Default or Profile 1, name the
+        name given to the profile in the browser.
+        """
+        self._username = username
+        self._browser = browser
+        self._profile_dir = profile_dir
+        self._path = path
+        self._name = name
+
+    @property
+    def get_username(self):
+        """
+        Return the user account the profile belongs to
+        """
+        return self._username
+
+    @property
+    def get_browser(self):
+        """
+        Return the browser, e.g. Chrome or Brave
+        """
+        return self._browser
+
+    @property
+    def get_profile_dir(self):
+        """
+        Return the directory name of the profile, e.g. Default or Profile 1
+        """
+        return self._profile_dir
+
+    @property
+    def get_path(self):
+        """
+        Return the path of the profile directory
+        """
+        return self._path
+
+    @property
+    def get_name(self):
+        """
+        Return the name the browser shows for the profile, None if unknown
+        """
+        return self._name
+
+    @property
+    def is_default(self):
+        """
+        Return True for the Default profile of Chrome, the profile the plugins always read
+        """
+        return self._browser == BROWSERS[0][0] and self._profile_dir == DEFAULT_PROFILE
+
+    @property
+    def get_context(self):
+        """
+        Return the writer context of records read from the profile
+        """
+        return {"User": self._username, "Browser": self._browser, "Profile": self._profile_dir}
+
+    def get_output_file(self, artifact):
+        """
+        Return the output file name for an artifact of the profile, e.g. History gives
+        Users_username_Chrome_History.txt for Chrome's Default profile and
+        Users_username_Chrome_Profile_1_History.txt for another
+        """
+        if self.is_default:
+            prefix = self._browser
+        else:
+            prefix = self._browser + "_" + self._profile_dir
+        return "Users_{0}_{1}_{2}.txt".format(self._username, re.sub(r"[^\w.-]+", "_", prefix), artifact)
+
+    def __str__(self):
+        """
+        Return the user, browser and profile
+        """
+        return "{0} {1} {2}".format(self._username, self._browser, self._profile_dir)
+
+    def __repr__(self):
+        """
+        Return a string representation of the profile
+        """
+        return "ChromeProfile(%s, %s, %s)" % (self._username, self._browser, self._profile_dir)
+
+
+class ProfileLocator():
+    """
+    Find the Chromium profiles of the users of an input directory, from each browser's Local State
+    and by scanning its user data directory. Each user is looked up once and shared by all plugins.
+    """
+    def __init__(self, input_dir):
+        """
+        Initialise the class.
+        """
+        self._input_dir = input_dir
+        self._users = {}  # username -> (profiles, sources)
+        self._lock = threading.Lock()
+
+    def find_profiles(self, username):
+        """
+        Return the ChromeProfiles of a user, Chrome's Default profile first
+        """
+        with self._lock:
+            if username not in self._users:
+                self._users[username] = self._locate(username)
+            profiles, sources = self._users[username]
+        # What the lookup read is a source of every plugin using its result
+        for kind, path in sources:
+            osxripper_runcache.track(kind, path)
+        return list(profiles)
+
+    def _locate(self, username):
+        """
+        Return the profiles of a user and the (kind, path) sources they were found from
+        """
+        profiles, sources = [], []
+        support_path = os.path.join(self._input_dir, "Users", username, "Library", "Application Support")
+        for browser, relative_path in BROWSERS:
+            user_data_dir = os.path.join(support_path, relative_path)
+            sources.append((osxripper_runcache.KIND_DIRECTORY, os.path.dirname(user_data_dir)))
+            if not osxripper_inventory.isdir(user_data_dir):
+                continue
+            sources.append((osxripper_runcache.KIND_DIRECTORY, user_data_dir))
+            names = _read_profile_names(os.path.join(user_data_dir, LOCAL_STATE), sources)
+            profile_dirs = [name for name in osxripper_inventory.listdir(user_data_dir)
+                            if (name in names or PROFILE_DIRECTORY.match(name))
+                            and osxripper_inventory.isdir(os.path.join(user_data_dir, name))]
+            for profile_dir in sorted(profile_dirs, key=_profile_order):
+                profiles.append(ChromeProfile(username, browser, profile_dir, os.path.join(user_data_dir, profile_dir),
+                                              names.get(profile_dir)))
+            if not profile_dirs and osxripper_inventory.isfile(os.path.join(user_data_dir, PROFILE_FILE)):
+                profiles.append(ChromeProfile(username, browser, DEFAULT_PROFILE, user_data_dir))
+        return profiles, sources
+
+
+class ProfileDatabase():
+    """
+    Open the databases of a profile as the schemas of PROFILE_DATABASES of one read only connection,
+    e.g. history.urls and favicons.icon_mapping, so they can be joined in one query. The plugins reading
+    a profile share the connection, the profile is opened once however many of them read it.
+    """
+    def __init__(self, profile):
+        """
+        Initialise the class.
+        """
+        self._profile = profile
+        self._connection = None
+        self._attached = []
+
+    @property
+    def get_connection(self):
+        """
+        Return the connection, None until opened
+        """
+        return self._connection
+
+    @property
+    def get_attached(self):
+        """
+        Return the schema names of the databases attached
+        """
+        return list(self._attached)
+
+    def get_database_path(self, schema):
+        """
+        Return the path of the database of a schema of PROFILE_DATABASES
+        """
+        return os.path.join(self._profile.get_path, dict(PROFILE_DATABASES)[schema])
+
+    def open(self):
+        """
+        Open the shared connection of the profile with the databases that exist attached
+        """
+        attachments = {}
+        for schema, _ in PROFILE_DATABASES:
+            database_path = self.get_database_path(schema)
+            if osxripper_inventory.isfile(database_path):
+                attachments[schema] = database_path
+        self._connection = osxripper_sqlite.connect_attached(attachments)
+        self._attached = list(attachments)
+        return self._connection
+
+    def execute(self, query, parameters=()):
+        """
+        Execute a query on a new cursor of the connection and return the cursor
+        """
+        return osxripper_sqlite.execute(self._connection.cursor(), query, parameters)
+
+    def get_columns(self, schema, table):
+        """
+        Return the column names of a table of an attached schema, empty if the table does not exist
+        """
+        if schema not in self._attached:
+            return []
+        return osxripper_sqlite.get_columns(self._connection, table, schema)
+
+    def has_columns(self, schema, table, columns=()):
+        """
+        Return True if the table exists in an attached schema with all of columns
+        """
+        table_columns = self.get_columns(schema, table)
+        return bool(table_columns) and all(column in table_columns for column in columns)
+
+    def close(self):
+        """
+        Hand the connection back
+        """
+        if self._connection is not None:
+            osxripper_sqlite.release(self._connection)
+            self._connection = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+@functools.lru_cache(maxsize=1024)
+def get_transition(transition):
+    """
+    Return the name of a visit's page transition with its qualifiers, e.g. LINK CHAIN_START CHAIN_END
+    """
+    if transition is None:
+        return None
+    core = transition & 0xFF
+    names = [TRANSITIONS[core] if core < len(TRANSITIONS) else str(core)]
+    names.extend(name for mask, name in TRANSITION_QUALIFIERS if transition & mask)
+    return " ".join(names)
+
+
+def _read_profile_names(local_state_path, sources):
+    """
+    Return a dict of profile directory to profile name from a Local State file, empty if it cannot be read
+    """
+    if not osxripper_inventory.isfile(local_state_path):
+        return {}
+    sources.append((osxripper_runcache.KIND_FILE, local_state_path))
+    try:
+        with open(local_state_path, "r", encoding="utf-8") as local_state_file:
+            info_cache = json.load(local_state_file).get("profile", {}).get("info_cache", {})
+        return {profile_dir: info.get("name") if isinstance(info, dict) else None
+                for profile_dir, info in info_cache.items()}
+    except (OSError, ValueError, AttributeError) as error:
+        logging.warning("Unable to read the profiles of %s: %s", local_state_path, error)
+        print("[WARNING] Unable to read the profiles of {0}: {1}".format(local_state_path, error))
+        return {}
+
+
+def _profile_order(profile_dir):
+    """
+    Return the sort key of a profile directory, Default first and Profile 2 before Profile 10
+    """
+    if profile_dir == DEFAULT_PROFILE:
+        return 0, 0, profile_dir
+    match = re.match(r"^Profile (\d+)$", profile_dir)
+    if match is not None:
+        return 1, int(match.group(1)), profile_dir
+    return 2, 0, profile_dir
+
+
+def get_locator(input_dir):
+    """
+    Return the shared ProfileLocator of an input directory, creating it on first use
+    """
+    key = os.path.normpath(os.path.abspath(input_dir))
+    with _locators_lock:
+        if key not in _locators:
+            _locators[key] = ProfileLocator(input_dir)
+        return _locators[key]
+
+
+def find_profiles(input_dir, username):
+    """
+    Return the ChromeProfiles of a user of an input directory, Chrome's Default profile first
+    """
+    return get_locator(input_dir).find_profiles(username)
+
+
+def find_all_profiles(input_dir):
+    """
+    Return the ChromeProfiles of every user account of an input directory, Shared excluded. A user
+    without a profile is reported with the path of Chrome's Default profile as not existing.
+    """
+    profiles = []
+    users_path = os.path.join(input_dir, "Users")
+    for username in osxripper_inventory.listdir(users_path):
+        if username == "Shared" or not osxripper_inventory.isdir(os.path.join(users_path, username)):
+            continue
+        user_profiles = find_profiles(input_dir, username)
+        if not user_profiles:
+            default_path = get_default_path(input_dir, username)
+            logging.warning("%s does not exist.", default_path)
+            print("[WARNING] {0} does not exist.".format(default_path))
+        profiles.extend(user_profiles)
+    return profiles
+
+
+def get_default_path(input_dir, username):
+    """
+    Return the path of Chrome's Default profile of a user, where the plugins read before there were profiles
+    """
+    return os.path.join(input_dir, "Users", username, "Library", "Application Support", BROWSERS[0][1], DEFAULT_PROFILE)
+
+
+def clear():
+    """
+    Discard all cached profiles
+    """
+    with _locators_lock:
+        _locators.clear()
@@ -0,0 +1,312 @@
+""" Module to cache file system metadata of the input directory """
+import os
+import threading
+from riplib import osxripper_runcache
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+_inventories = {}
+_inventories_lock = threading.Lock()
+
+
+class InventoryEntry():
+    """
+    Class to hold the cached metadata of a single directory entry
+    """
+    __slots__ = ("name", "path", "is_dir", "is_file", "is_symlink", "_dir_entry", "_stat")
+
+    def __init__(self, dir_entry):
+        """
+        Initialise the class from an os.DirEntry, is_dir and is_file follow symlinks like os.path
+        """
+        self.name = dir_entry.name
+        self.path = dir_entry.path
+        try:
+            self.is_dir = dir_entry.is_dir()
+        except OSError:
+            self.is_dir = False
+        try:
+            self.is_file = dir_entry.is_file()
+        except OSError:
+            self.is_file = False
+        self.is_symlink = dir_entry.is_symlink()
+        self._dir_entry = dir_entry
+        self._stat = None
+
+    def stat(self):
+        """
+        Return the stat result of the entry, retrieved once on first use
+        """
+        if self._stat is None:
+            self._stat = self._dir_entry.stat()
+            self._dir_entry = None
+        return self._stat
+
+
+class Inventory():
+    """
+    Scan each directory below a root once with os.scandir and answer listdir, isdir, isfile,
+    exists, stat and walk queries from the cached entries
+    """
+    def __init__(self, root):
+        """
+        Initialise the class.
+        """
+        self._root = _normalise(root)
+        self._directories = {}
+        self._folded = {}  # directory -> case folded name -> name, built on the first miss
+        self._lock = threading.Lock()
+
+    @property
+    def get_root(self):
+        """
+        Return the root directory of the inventory
+        """
+        return self._root
+
+    def contains(self, path):
+        """
+        Return True if the normalised path is the root or below it
+        """
+        return _is_below(path, self._root)
+
+    def scandir(self, path):
+        """
+        Return a dict of name to InventoryEntry for a directory, or None if it is not a directory
+        """
+        path = _normalise(path)
+        osxripper_runcache.track(osxripper_runcache.KIND_DIRECTORY, path)
+        try:
+            return self._directories[path]
+        except KeyError:
+            pass
+        entries = None
+        parent, name = os.path.split(path)
+        parent_entries = self._directories.get(parent) if path != self._root else None
+        parent_entry = self._lookup(parent, parent_entries, name) if parent_entries is not None else None
+        if parent_entries is not None and (parent_entry is None or not parent_entry.is_dir):
+            # The parent listing already tells us this is not a directory
+            entries = None
+        else:
+            try:
+                with os.scandir(path) as iterator:
+                    entries = {dir_entry.name: InventoryEntry(dir_entry) for dir_entry in iterator}
+            except OSError:
+                entries = None
+        with self._lock:
+            return self._directories.setdefault(path, entries)
+
+    def get_entry(self, path):
+        """
+        Return the InventoryEntry for a path or None if it does not exist
+        """
+        parent, name = os.path.split(_normalise(path))
+        entries = self.scandir(parent)
+        if entries is None:
+            return None
+        return self._lookup(parent, entries, name)
+
+    def _lookup(self, directory, entries, name):
+        """
+        Return the entry of a name in a directory listing. A name only differing in case is left to
+        os.path, HFS+ and APFS volumes are mostly case-insensitive but some are case-sensitive.
+        """
+        entry = entries.get(name)
+        if entry is not None:
+            return entry
+        folded = self._folded.get(directory)
+        if folded is None:
+            folded = {}
+            for entry_name in entries:
+                folded.setdefault(entry_name.casefold(), entry_name)
+            with self._lock:
+                folded = self._folded.setdefault(directory, folded)
+        entry_name = folded.get(name.casefold())
+        if entry_name is not None and os.path.lexists(os.path.join(directory, name)):
+            return entries[entry_name]
+        return None
+
+    def invalidate(self, path=None):
+        """
+        Drop the cached listings of a directory and the directories below it, or of every directory,
+        so they are scanned again after the input directory changed
+        """
+        with self._lock:
+            if path is None:
+                self._directories.clear()
+                self._folded.clear()
+                return
+            path = _normalise(path)
+            for directory in [directory for directory in self._directories if _is_below(directory, path)]:
+                del self._directories[directory]
+                self._folded.pop(directory, None)
+
+    def listdir(self, path):
+        """
+        Return the names in a directory, raising OSError like os.listdir if it is not a directory
+        """
+        entries = self.scandir(path)
+        if entries is None:
+            raise FileNotFoundError("No such directory: '{0}'".format(path))
+        return list(entries)
+
+    def isdir(self, path):
+        """
+        Return True if path is a directory
+        """
+        if _normalise(path) == self._root:
+            return self.scandir(path) is not None
+        entry = self.get_entry(path)
+        return entry is not None and entry.is_dir
+
+    def isfile(self, path):
+        """
+        Return True if path is a regular file
+        """
+        entry = self.get_entry(path)
+        return entry is not None and entry.is_file
+
+    def exists(self, path):
+        """
+        Return True if path exists
+        """
+        if _normalise(path) == self._root:
+            return self.scandir(path) is not None
+        return self.get_entry(path) is not None
+
+    def stat(self, path):
+        """
+        Return the cached stat result for path, raising FileNotFoundError if it does not exist
+        """
+        entry = self.get_entry(path)
+        if entry is None:
+            raise FileNotFoundError("No such file or directory: '{0}'".format(path))
+        osxripper_runcache.track(osxripper_runcache.KIND_STAT, path)
+        return entry.stat()
+
+    def walk(self, top):
+        """
+        Generate (dirpath, dirnames, filenames) top down like os.walk, dirpath is built from top as given
+        """
+        entries = self.scandir(top)
+        if entries is None:
+            return
+        dir_names = [name for name, entry in entries.items() if entry.is_dir]
+        file_names = [name for name, entry in entries.items() if not entry.is_dir]
+        yield top, dir_names, file_names
+        for dir_name in dir_names:
+            if not entries[dir_name].is_symlink:
+                yield from self.walk(os.path.join(top, dir_name))
+
+
+def _normalise(path):
+    """
+    Return an absolute normalised path used as the cache key
+    """
+    return os.path.normpath(os.path.abspath(path))
+
+
+def _is_below(path, directory):
+    """
+    Return True if the normalised path is directory or below it
+    """
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def get_inventory(root):
+    """
+    Return the shared Inventory for a root directory, creating it on first use
+    """
+    root = _normalise(root)
+    with _inventories_lock:
+        if root not in _inventories:
+            _inventories[root] = Inventory(root)
+        return _inventories[root]
+
+
+def discard(root):
+    """
+    Discard the inventory of a root directory, e.g. when the run over an image has finished
+    """
+    with _inventories_lock:
+        _inventories.pop(_normalise(root), None)
+
+
+def invalidate(path):
+    """
+    Drop the cached listings of a directory and those below it from the inventory covering it
+    """
+    norm_path, inventory = _find_inventory(path)
+    if inventory is not None:
+        inventory.invalidate(norm_path)
+
+
+def clear():
+    """
+    Discard all cached inventories
+    """
+    with _inventories_lock:
+        _inventories.clear()
+
+
+def _find_inventory(path):
+    """
+    Return the normalised path and the inventory covering it, if any
+    """
+    path = _normalise(path)
+    for inventory in list(_inventories.values()):
+        if inventory.contains(path):
+            return path, inventory
+    return path, None
+
+
+def listdir(path):
+    """
+    Drop-in replacement for os.listdir backed by the inventory
+    """
+    norm_path, inventory = _find_inventory(path)
+    if inventory is None:
+        return os.listdir(path)
+    return inventory.listdir(norm_path)
+
+
+def isdir(path):
+    """
+    Drop-in replacement for os.path.isdir backed by the inventory
+    """
+    norm_path, inventory = _find_inventory(path)
+    if inventory is None:
+        return os.path.isdir(path)
+    return inventory.isdir(norm_path)
+
+
+def isfile(path):
+    """
+    Drop-in replacement for os.path.isfile backed by the inventory
+    """
+    norm_path, inventory = _find_inventory(path)
+    if inventory is None:
+        return os.path.isfile(path)
+    return inventory.isfile(norm_path)
+
+
+def exists(path):
+    """
+    Drop-in replacement for os.path.exists backed by the inventory
+    """
+    norm_path, inventory = _find_inventory(path)
+    if inventory is None:
+        return os.path.exists(path)
+    return inventory.exists(norm_path)
+
+
+def walk(top):
+    """
+    Drop-in replacement for os.walk backed by the inventory
+    """
+    _, inventory = _find_inventory(top)
+    if inventory is None:
+        return os.walk(top)
+    return inventory.walk(top)
@@ -0,0 +1,309 @@
+""" Module to read plain and gzip compressed text logs in bounded chunks """
+import calendar
+import datetime
+import gzip
+import os
+import queue
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from riplib import osxripper_profile
+from riplib import osxripper_runcache
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+ENCODING = "utf-8"
+CHUNK_SIZE = 1048576  # characters read from a log at a time
+LOG_WORKERS = 4  # compressed logs decompressed at the same time
+PREFETCH_CHUNKS = 4  # chunks a worker decompresses ahead of the reader, per log
+
+ENTRY_LINES = 1000  # lines without a timestamp kept in one entry before it is written out
+
+# Errors of a truncated or corrupt log, the other logs are still read
+READ_ERRORS = (OSError, EOFError, zlib.error)
+
+_END = object()  # marks the end of a log in its chunk queue
+
+MONTHS = {"Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+          "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12}
+
+# Oct 11 09:00:00 host process[pid] (sender[pid]): message, the year is not logged
+SYSLOG_LINE = re.compile(r"^(?P<month>[A-Z][a-z]{2}) {1,2}(?P<day>\d{1,2}) (?P<time>\d{2}:\d{2}:\d{2})(?P<fraction>\.\d+)? "
+                         r"(?P<host>\S+) (?:(?P<process>[^\[:]+?)(?:\[(?P<pid>\d+)\])?(?: \([^)]*\))?: )?(?P<message>.*)$")
+# 2016-03-01 10:00:00.123 +0000 process[pid:thread]: message, as written by NSLog, Disk Utility and others
+ISO_LINE = re.compile(r"^(?P<date>\d{4}-\d{2}-\d{2})[ T](?P<time>\d{2}:\d{2}:\d{2})(?P<fraction>\.\d+)?"
+                      r"(?: ?(?:[+-]\d{2}:?\d{2}|Z))?:? (?:(?P<process>[^\s\[:]+)\[(?P<pid>\d+)(?::[0-9a-fA-Fx]+)?\]:? )?"
+                      r"(?P<message>.*)$")
+# /dev/rdisk2s2: fsck_hfs started at Mon Jan 26 10:50:27 2015
+CTIME_LINE = re.compile(r"\bat (?P<ctime>[A-Z][a-z]{2} [A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2} \d{4})\s*$")
+# A date and time anywhere in a line
+TIMESTAMP = re.compile(r"(?P<date>\d{4}-\d{2}-\d{2})[ T](?P<time>\d{2}:\d{2}:\d{2})")
+
+# Formats accepted by parse_time, e.g. for --since and --until
+TIME_FORMATS = ["%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d"]
+
+
+def open_log(log_path, encoding=ENCODING):
+    """
+    Return a text file reading a log, .gz logs are decompressed as they are read. Bytes that do not
+    decode are replaced and line endings are left as they are.
+    """
+    if log_path.endswith(".gz"):
+        return gzip.open(log_path, "rt", encoding=encoding, errors="replace", newline="")
+    return open(log_path, "r", encoding=encoding, errors="replace", newline="")
+
+
+def read_chunks(log_path, chunk_size=CHUNK_SIZE):
+    """
+    Generate the text of a log in chunks of at most chunk_size characters
+    """
+    with open_log(log_path) as log_file:
+        while True:
+            chunk = log_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_logs(log_paths, workers=LOG_WORKERS, chunk_size=CHUNK_SIZE, prefetch=PREFETCH_CHUNKS):
+    """
+    Generate (log path, chunk, error) for the logs in order. The logs after the one being read are
+    decompressed by up to workers threads, each keeping at most prefetch chunks in memory. Each log
+    starts with an empty chunk so empty logs are seen too. A log that cannot be read ends with a tuple
+    holding an empty chunk and the error, the next log follows.
+    """
+    log_paths = list(log_paths)
+    if workers <= 1 or len(log_paths) <= 1:
+        for log_path in log_paths:
+            yield log_path, "", None
+            try:
+                for chunk in read_chunks(log_path, chunk_size):
+                    yield log_path, chunk, None
+            except READ_ERRORS as error:
+                yield log_path, "", error
+        return
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=max(1, prefetch)) for _ in log_paths]
+    fill = osxripper_runcache.bind(osxripper_profile.bind(_fill))
+    with ThreadPoolExecutor(max_workers=min(workers, len(log_paths))) as executor:
+        for log_path, chunk_queue in zip(log_paths, queues):
+            executor.submit(fill, log_path, chunk_queue, chunk_size, stop)
+        try:
+            for log_path, chunk_queue in zip(log_paths, queues):
+                yield log_path, "", None
+                while True:
+                    item = chunk_queue.get()
+                    if item is _END:
+                        break
+                    if isinstance(item, READ_ERRORS):
+                        yield log_path, "", item
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    yield log_path, item, None
+        finally:
+            # Let the workers go when the reader stops early
+            stop.set()
+
+
+def _fill(log_path, chunk_queue, chunk_size, stop):
+    """
+    Decompress a log into its chunk queue, run by the read_logs workers
+    """
+    try:
+        for chunk in read_chunks(log_path, chunk_size):
+            if not _put(chunk_queue, chunk, stop):
+                return
+        _put(chunk_queue, _END, stop)
+    except Exception as error:
+        _put(chunk_queue, error, stop)
+
+
+def _put(chunk_queue, item, stop):
+    """
+    Put item on the queue unless the reader stopped, return False if it did
+    """
+    while not stop.is_set():
+        try:
+            chunk_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def parse_time(value):
+    """
+    Return the datetime of a time given on the command line, e.g. 2020-01-31 or 2020-01-31 13:45:00
+    """
+    for time_format in TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value.strip(), time_format)
+        except ValueError:
+            continue
+    raise ValueError("Unknown time format: {0}".format(value))
+
+
+def get_reference_time(log_path):
+    """
+    Return the modification time of a log, the year of syslog lines is taken from it
+    """
+    try:
+        return datetime.datetime.fromtimestamp(os.path.getmtime(log_path))
+    except (OSError, ValueError, OverflowError):
+        return None
+
+
+def _fraction(value):
+    """
+    Return the microseconds of a fraction of a second such as .123
+    """
+    return int((value[1:] + "000000")[:6]) if value else 0
+
+
+def _syslog_timestamp(year, month, day, time, fraction):
+    """
+    Return the datetime of a syslog date in year, Feb 29 falls in the last leap year up to year
+    """
+    if month == 2 and day == 29:
+        while not calendar.isleap(year):
+            year -= 1
+    hour, minute, second = (int(part) for part in time.split(":"))
+    return datetime.datetime(year, month, day, hour, minute, second, _fraction(fraction))
+
+
+def parse_line(line, reference=None):
+    """
+    Return a dict of the Timestamp, Host, Process, PID and Message of a log line, None if the line
+    has no timestamp, e.g. the continuation of a multi line message. Timestamps are naive datetimes as
+    written in the log, syslog lines take the year that puts them last before reference.
+    """
+    line = line.rstrip("\r\n")
+    match = SYSLOG_LINE.match(line)
+    if match is not None and match.group("month") in MONTHS:
+        month, day = MONTHS[match.group("month")], int(match.group("day"))
+        year = reference.year if reference is not None else datetime.datetime.now().year
+        try:
+            timestamp = _syslog_timestamp(year, month, day, match.group("time"), match.group("fraction"))
+            if reference is not None and timestamp > reference + datetime.timedelta(days=1):
+                timestamp = _syslog_timestamp(year - 1, month, day, match.group("time"), match.group("fraction"))
+        except ValueError:
+            return None
+        return {"Timestamp": timestamp, "Host": match.group("host"), "Process": match.group("process"),
+                "PID": match.group("pid"), "Message": match.group("message")}
+    match = ISO_LINE.match(line)
+    if match is not None:
+        try:
+            timestamp = datetime.datetime.strptime(match.group("date") + " " + match.group("time"), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            return None
+        return {"Timestamp": timestamp.replace(microsecond=_fraction(match.group("fraction"))), "Host": None,
+                "Process": match.group("process"), "PID": match.group("pid"), "Message": match.group("message")}
+    match = CTIME_LINE.search(line)
+    if match is not None:
+        try:
+            timestamp = datetime.datetime.strptime(" ".join(match.group("ctime").split()), "%a %b %d %H:%M:%S %Y")
+        except ValueError:
+            return None
+        return {"Timestamp": timestamp, "Host": None, "Process": None, "PID": None, "Message": line}
+    return None
+
+
+def find_timestamp(line):
+    """
+    Return the first date and time in a line as a datetime, None if there is none
+    """
+    match = TIMESTAMP.search(line)
+    if match is None:
+        return None
+    try:
+        return datetime.datetime.strptime(match.group("date") + " " + match.group("time"), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def in_range(timestamp, since=None, until=None):
+    """
+    Return True if timestamp is at or after since and before until, a missing timestamp is only in
+    range when there are no limits
+    """
+    if since is None and until is None:
+        return True
+    if timestamp is None:
+        return False
+    return (since is None or timestamp >= since) and (until is None or timestamp < until)
+
+
+class LogReader():
+    """
+    Split the text of a log, fed in chunks, into entries of a line with a timestamp and the lines
+    without one that follow it. Entries outside since and until are dropped as they are read. When
+    records is False and there are no limits the text is passed through without being parsed.
+    """
+    def __init__(self, since=None, until=None, reference=None, records=True):
+        """
+        Initialise the class. reference is the time the log was last written, see parse_line.
+        """
+        self._since = since
+        self._until = until
+        self._reference = reference
+        self._parse = records or since is not None or until is not None
+        self._partial = ""
+        self._record = None
+        self._lines = []
+
+    def feed(self, chunk):
+        """
+        Return a list of (record, text) for the entries completed by a chunk of the log. record is
+        the dict of parse_line with the message lines of the entry, None when not parsing.
+        """
+        if not self._parse:
+            return [(None, chunk)] if chunk else []
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        entries = []
+        for line in lines:
+            self._add_line(line + "\n", entries)
+        return entries
+
+    def close(self):
+        """
+        Return a list of (record, text) for the entries left at the end of the log
+        """
+        entries = []
+        if self._partial:
+            self._add_line(self._partial, entries)
+            self._partial = ""
+        self._end_entry(entries)
+        return entries
+
+    def _add_line(self, line, entries):
+        """
+        Start a new entry with a line holding a timestamp, or add the line to the current entry
+        """
+        record = parse_line(line, self._reference)
+        if record is not None or self._record is None or len(self._lines) >= ENTRY_LINES:
+            self._end_entry(entries)
+            if record is None:
+                # Lines before the first timestamp, or the rest of a long entry
+                record = {"Timestamp": self._record["Timestamp"] if self._record else None, "Host": None,
+                          "Process": None, "PID": None, "Message": line.rstrip("\r\n")}
+            self._record = record
+            self._lines = [line]
+            return
+        self._record["Message"] += "\n" + line.rstrip("\r\n")
+        self._lines.append(line)
+
+    def _end_entry(self, entries):
+        """
+        Add the current entry to entries if it is in range
+        """
+        if self._lines and in_range(self._record["Timestamp"], self._since, self._until):
+            record = dict(self._record)
+            if record["Timestamp"] is not None:
+                record["Timestamp"] = record["Timestamp"].isoformat(" ")
+            entries.append((record, "".join(self._lines)))
+        self._lines = []
@@ -0,0 +1,304 @@
+""" Module to describe the available plugins without importing them, from a cached manifest """
+import ast
+import fnmatch
+import json
+import logging
+import os
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+MANIFEST_VERSION = 3
+# Kept beside the bytecode of the plugins, so it is rebuilt the same way a stale .pyc is
+MANIFEST_FILE = os.path.join("__pycache__", "osxripper_manifest.json")
+
+# Manifest fields and the plugin attributes and setters assigning them in __init__
+_ATTRIBUTES = {
+    "_name": "name",
+    "_description": "description",
+    "_type": "type",
+    "_data_file": "data_file",
+    "_output_file": "output_file",
+    "_supported_os_versions": "os_versions"
+}
+_SETTERS = {
+    "set_name": "name",
+    "set_description": "description",
+    "set_type": "type",
+    "set_data_file": "data_file",
+    "set_output_file": "output_file",
+    "set_supported_os_versions": "os_versions"
+}
+
+
+class ManifestEntry():
+    """
+    Class to hold the description of a plugin as read from its source
+    """
+    def __init__(self, class_name, metadata):
+        """
+        Initialise the class.
+        """
+        self._class_name = class_name
+        self._metadata = metadata
+
+    @property
+    def get_class_name(self):
+        """
+        Return the plugin class name, the same as its module name
+        """
+        return self._class_name
+
+    @property
+    def get_name(self):
+        """
+        Return the name of the plugin, None when it could not be read from the source
+        """
+        return self._metadata.get("name")
+
+    @property
+    def get_description(self):
+        """
+        Return the description of the plugin
+        """
+        return self._metadata.get("description")
+
+    @property
+    def get_type(self):
+        """
+        Return the plugin type
+        """
+        return self._metadata.get("type", "text")
+
+    @property
+    def get_os_versions(self):
+        """
+        Return the OSX versions the plugin parses data for, None when it does not check the version
+        """
+        return self._metadata.get("os_versions")
+
+    @property
+    def is_complete(self):
+        """
+        Return True if the name and description were read from the source
+        """
+        return self.get_name is not None and self.get_description is not None
+
+    def supports(self, os_version):
+        """
+        Return True if the plugin parses data for os_version
+        """
+        return self.get_os_versions is None or os_version in self.get_os_versions
+
+    def __repr__(self):
+        """
+        Return a string representation of the entry
+        """
+        return "ManifestEntry(%s, %s)" % (self._class_name, self.get_name)
+
+
+def _literal(node):
+    """
+    Return the value of a literal expression node, None if it is not a literal
+    """
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError):
+        return None
+
+
+def _is_os_version(node):
+    """
+    Return True if node reads the OSX version of the plugin, e.g. self._os_version
+    """
+    return isinstance(node, ast.Attribute) and node.attr in ("_os_version", "get_os_version")
+
+
+def _only_reports(statements, *phrases):
+    """
+    Return True if the statements do nothing but report one of the phrases, e.g. print and log
+    "This version of OSX is not supported by this plugin."
+    """
+    reported = False
+    for statement in statements:
+        if isinstance(statement, (ast.Pass, ast.Return)):
+            continue
+        if not isinstance(statement, ast.Expr):
+            return False
+        for node in ast.walk(statement):
+            value = _literal(node) if isinstance(node, ast.expr) else None
+            if isinstance(value, str) and any(phrase in value.lower() for phrase in phrases):
+                reported = True
+    return reported
+
+
+def _is_version_test(node):
+    """
+    Return True if node is an if statement comparing the OSX version of the plugin
+    """
+    return isinstance(node, ast.If) and isinstance(node.test, ast.Compare) \
+        and _is_os_version(node.test.left) and len(node.test.comparators) == 1
+
+
+def _read_os_versions(class_node):
+    """
+    Return the sorted OSX versions tested by the plugin in branches that parse data. None, meaning
+    all versions, when the plugin never tests the version or may parse data for versions it does not
+    name, e.g. in a final else, past a test without an else or after a != test.
+    """
+    tested = False
+    versions = set()
+    for node in ast.walk(class_node):
+        if not _is_version_test(node):
+            continue
+        value = _literal(node.test.comparators[0])
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, (list, tuple, set)) or not isinstance(node.test.ops[0], (ast.Eq, ast.In)):
+            return None
+        tested = True
+        if not _only_reports(node.body, "not supported"):
+            versions.update(version for version in value if isinstance(version, str))
+        if len(node.orelse) == 1 and _is_version_test(node.orelse[0]):
+            continue
+        if not node.orelse or not _only_reports(node.orelse, "not supported", "not a known"):
+            # Versions not named carry on past the test, or are parsed in the else
+            return None
+    return sorted(versions) if tested else None
+
+
+def read_plugin_metadata(source_path):
+    """
+    Return a dict of the plugin description set in __init__ of the class named after the module,
+    fields that are not literal values are left out
+    """
+    class_name = os.path.splitext(os.path.basename(source_path))[0]
+    with open(source_path, "rb") as source_file:
+        tree = ast.parse(source_file.read(), source_path)
+    metadata = {}
+    for class_node in tree.body:
+        if not isinstance(class_node, ast.ClassDef) or class_node.name != class_name:
+            continue
+        for function_node in class_node.body:
+            if not isinstance(function_node, ast.FunctionDef) or function_node.name != "__init__":
+                continue
+            for node in ast.walk(function_node):
+                if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                        and node.func.attr in _SETTERS and len(node.args) == 1:
+                    field, value = _SETTERS[node.func.attr], _literal(node.args[0])
+                elif isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                        and isinstance(node.targets[0], ast.Attribute) and node.targets[0].attr in _ATTRIBUTES:
+                    field, value = _ATTRIBUTES[node.targets[0].attr], _literal(node.value)
+                else:
+                    continue
+                if value is not None:
+                    metadata[field] = sorted(value) if field == "os_versions" else value
+        if "os_versions" not in metadata:
+            metadata["os_versions"] = _read_os_versions(class_node)
+    return metadata
+
+
+def _read_cache(manifest_path):
+    """
+    Return the cached plugin entries, empty if there is no usable cache
+    """
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("plugins", {})
+
+
+def _write_cache(manifest_path, plugins):
+    """
+    Write the plugin entries to the cache, a read only plugin directory is not an error
+    """
+    temp_path = "{0}.{1}.tmp".format(manifest_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump({"version": MANIFEST_VERSION, "plugins": plugins}, manifest_file, indent=1, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+    except OSError as error:
+        logging.info("Plugin manifest not cached: %s", error)
+
+
+def load_manifest(plugins_dir):
+    """
+    Return a ManifestEntry per plugin module in plugins_dir, sorted by module name. Entries are
+    read from the cached manifest and only modules whose size or modification time changed are parsed.
+    """
+    manifest_path = os.path.join(plugins_dir, MANIFEST_FILE)
+    cached = _read_cache(manifest_path)
+    plugins = {}
+    changed = False
+    for source_name in sorted(os.listdir(plugins_dir)):
+        if not source_name.endswith(".py") or "__init__" in source_name:
+            continue
+        class_name = os.path.splitext(source_name)[0]
+        source_path = os.path.join(plugins_dir, source_name)
+        source_stat = os.stat(source_path)
+        cached_plugin = cached.get(class_name)
+        if cached_plugin is not None and cached_plugin.get("mtime") == source_stat.st_mtime_ns \
+                and cached_plugin.get("size") == source_stat.st_size:
+            plugins[class_name] = cached_plugin
+            continue
+        try:
+            metadata = read_plugin_metadata(source_path)
+        except (SyntaxError, ValueError) as error:
+            # Left to the import to report
+            logging.warning("Unable to read plugin metadata from %s: %s", source_path, error)
+            metadata = {}
+        metadata["mtime"] = source_stat.st_mtime_ns
+        metadata["size"] = source_stat.st_size
+        plugins[class_name] = metadata
+        changed = True
+    if changed or len(plugins) != len(cached):
+        _write_cache(manifest_path, plugins)
+    return [ManifestEntry(class_name, plugins[class_name]) for class_name in sorted(plugins)]
+
+
+def split_names(value):
+    """
+    Return the names in a comma separated option value, e.g. --plugins UsersChrome*,Autoruns
+    """
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def matches(manifest_entry, patterns):
+    """
+    Return True if the class name or name of the plugin matches one of the shell style patterns,
+    case is ignored
+    """
+    for pattern in patterns:
+        pattern = pattern.lower()
+        if fnmatch.fnmatchcase(manifest_entry.get_class_name.lower(), pattern) \
+                or fnmatch.fnmatchcase((manifest_entry.get_name or "").lower(), pattern):
+            return True
+    return False
+
+
+def select(manifest_entries, plugins=None, exclude=None, types=None, os_version=None):
+    """
+    Return a tuple of the entries selected by the plugin and type filters and supporting os_version,
+    and the entries left out only because they do not support os_version. Filters that are empty or
+    None select everything.
+    """
+    selected = []
+    unsupported = []
+    for manifest_entry in manifest_entries:
+        if plugins and not matches(manifest_entry, plugins):
+            continue
+        if exclude and matches(manifest_entry, exclude):
+            continue
+        if types and manifest_entry.get_type not in types:
+            continue
+        if os_version is not None and not manifest_entry.supports(os_version):
+            unsupported.append(manifest_entry)
+            continue
+        selected.append(manifest_entry)
+    return selected, unsupported
@@ -0,0 +1,180 @@
+""" Module to append plugin output to shared report files, one write per section """
+import collections
+import os
+import threading
+from riplib import osxripper_profile
+from riplib import osxripper_runcache
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+ENCODING = "utf-8"
+MAX_OPEN_FILES = 64  # output files kept open between sections, least recently used are closed first
+
+_handles = collections.OrderedDict()  # path -> [file, sections writing, write lock], least recently used first
+_handles_lock = threading.Lock()
+
+
+class OutputSection():
+    """
+    Collect the text a plugin writes to an output file in memory, it is appended to the file in a
+    single write when the section is closed so plugins sharing a file, e.g. Users_username.txt,
+    never interleave mid record. Used in place of a file opened with codecs.open(path, "a").
+    """
+    def __init__(self, output_path, encoding=ENCODING):
+        """
+        Initialise the class.
+        """
+        self._output_path = output_path
+        self._encoding = encoding
+        self._parts = []
+        self._closed = False
+
+    @property
+    def get_output_path(self):
+        """
+        Return the path written to
+        """
+        return self._output_path
+
+    @property
+    def name(self):
+        """
+        Return the path written to, as a file object does
+        """
+        return self._output_path
+
+    def write(self, text):
+        """
+        Add text to the section
+        """
+        self._parts.append(text)
+
+    def writelines(self, lines):
+        """
+        Add lines of text to the section
+        """
+        self._parts.extend(lines)
+
+    def getvalue(self):
+        """
+        Return the text of the section not yet written
+        """
+        return "".join(self._parts)
+
+    def flush(self):
+        """
+        Append the text written so far to the output file and keep the section open, only for output
+        files no other plugin writes to as other sections may come in between
+        """
+        if self._parts and not self._closed:
+            text, self._parts = "".join(self._parts), []
+            commit(self._output_path, text, self._encoding)
+
+    def close(self):
+        """
+        Append the section to the output file, later calls do nothing
+        """
+        if self._closed:
+            return
+        self._closed = True
+        text, self._parts = "".join(self._parts), []
+        commit(self._output_path, text, self._encoding)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Text written before an error is kept, as it was when plugins wrote to the file directly
+        self.close()
+
+
+def open_section(output_path, encoding=ENCODING):
+    """
+    Return an OutputSection appending to output_path
+    """
+    return OutputSection(output_path, encoding)
+
+
+def _acquire(output_path):
+    """
+    Return the handle entry of an output file, opening the file on first use
+    """
+    to_close = []
+    with _handles_lock:
+        entry = _handles.get(output_path)
+        if entry is None:
+            # Unbuffered append, each section reaches the file in one write at its end
+            entry = _handles[output_path] = [open(output_path, "ab", buffering=0), 0, threading.Lock()]
+        entry[1] += 1
+        _handles.move_to_end(output_path)
+        if len(_handles) > MAX_OPEN_FILES:
+            for path in [path for path, idle in _handles.items() if idle[1] == 0]:
+                to_close.append(_handles.pop(path)[0])
+                if len(_handles) <= MAX_OPEN_FILES:
+                    break
+    for handle in to_close:
+        handle.close()
+    return entry
+
+
+def commit(output_path, text, encoding=ENCODING, header=None):
+    """
+    Append text to output_path in a single write, writes to the same file are serialised.
+    For files that start with a header line, e.g. CSV, header is a function returning that line, called
+    under the write lock only while the file is empty. text is then a function of the header line of
+    the file returning the text to append.
+    """
+    if header is None:
+        append(output_path, text.encode(encoding))
+    else:
+        _write(output_path, lambda entry: _header_text(entry, output_path, text, header, encoding))
+
+
+def append(output_path, data):
+    """
+    Append bytes to output_path in a single write, writes to the same file are serialised
+    """
+    _write(output_path, lambda entry: data)
+
+
+def _write(output_path, prepare):
+    """
+    Append the bytes prepare(entry) returns to output_path, prepare is called under the write lock
+    """
+    entry = _acquire(os.path.abspath(output_path))
+    try:
+        with entry[2]:
+            data = prepare(entry)
+            osxripper_profile.count("output_bytes", len(data))
+            osxripper_runcache.track_output(output_path, data)
+            data = memoryview(data)
+            while data:
+                data = data[entry[0].write(data):]
+    finally:
+        with _handles_lock:
+            entry[1] -= 1
+
+
+def _header_text(entry, output_path, text, header, encoding):
+    """
+    Return the bytes to append to a file starting with a header line, the header first if the file
+    is empty. Called under the write lock.
+    """
+    if os.fstat(entry[0].fileno()).st_size:
+        with open(output_path, "rb") as output_file:
+            return text(output_file.readline().decode(encoding)).encode(encoding)
+    line = header()
+    return (line + text(line)).encode(encoding)
+
+
+def close_all():
+    """
+    Close every open output file, called by the drivers at the end of a run
+    """
+    with _handles_lock:
+        handles = [entry[0] for entry in _handles.values()]
+        _handles.clear()
+    for handle in handles:
+        handle.close()
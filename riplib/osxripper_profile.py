@@ -0,0 +1,285 @@
+""" Module to measure the time and resources used by each plugin of a run """
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+PROFILE_FILE = "_osxripper_profile.json"
+THREAD_IO = "/proc/thread-self/io"  # Linux per thread I/O counters
+
+# Counters kept per plugin, in report order
+COUNTERS = ["cpu_time", "read_chars", "input_bytes", "files_opened", "directories_scanned", "rows", "records",
+            "output_bytes"]
+
+_current = threading.local()  # .profile is the PluginProfile of the plugin the thread works for
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+class PluginProfile():
+    """
+    Class to hold the measurements of a single plugin run. Counters are added to by every thread
+    attached to the profile, the plugin's own thread and its map_users workers.
+    """
+    def __init__(self, class_name, name, plugin_type):
+        """
+        Initialise the class.
+        """
+        self.class_name = class_name
+        self.name = name
+        self.type = plugin_type
+        self.status = None
+        self.wall_time = 0.0
+        self.peak_rss_delta = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.counters["cpu_time"] = 0.0
+        if _read_thread_io() is None:
+            self.counters["read_chars"] = None
+        self._lock = threading.Lock()
+
+    def add(self, counter, amount=1):
+        """
+        Add amount to a counter
+        """
+        with self._lock:
+            if self.counters[counter] is not None:
+                self.counters[counter] += amount
+
+    def attach(self):
+        """
+        Return a context manager attributing the work of the calling thread to this profile
+        """
+        return _Attachment(self)
+
+    def as_dict(self):
+        """
+        Return the measurements as a dict for the JSON report
+        """
+        profile = {
+            "class_name": self.class_name,
+            "name": self.name,
+            "type": self.type,
+            "status": self.status,
+            "wall_time": round(self.wall_time, 6),
+            "peak_rss_delta": self.peak_rss_delta
+        }
+        profile.update(self.counters)
+        profile["cpu_time"] = round(profile["cpu_time"], 6)
+        return profile
+
+    def __getstate__(self):
+        """
+        Return the state to pickle, profiles of worker processes are sent back to the driver
+        """
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled profile
+        """
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        """
+        Return a string representation of the profile
+        """
+        return "PluginProfile(%s, %.3f)" % (self.class_name, self.wall_time)
+
+
+class _Attachment():
+    """
+    Attribute the CPU time, reads and audit events of the current thread to a profile while entered
+    """
+    def __init__(self, plugin_profile):
+        self._profile = plugin_profile
+        self._previous = None
+        self._cpu_time = 0.0
+        self._read_chars = None
+
+    def __enter__(self):
+        # Read the counters before attaching so opening /proc is not counted against the plugin
+        self._read_chars = _read_thread_io()
+        self._cpu_time = _thread_cpu_time()
+        self._previous = getattr(_current, "profile", None)
+        _current.profile = self._profile
+        return self._profile
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.profile = self._previous
+        self._profile.add("cpu_time", _thread_cpu_time() - self._cpu_time)
+        read_chars = _read_thread_io()
+        if read_chars is not None and self._read_chars is not None:
+            self._profile.add("read_chars", read_chars - self._read_chars)
+
+
+class _PluginRun():
+    """
+    Time a plugin run on the calling thread, see profile_plugin
+    """
+    def __init__(self, plugin):
+        self._profile = PluginProfile(plugin.__class__.__name__, plugin.get_name, plugin.get_type)
+        self._attachment = self._profile.attach()
+        self._start = 0.0
+        self._peak_rss = None
+
+    def __enter__(self):
+        _install_hook()
+        self._peak_rss = _peak_rss()
+        self._start = time.perf_counter()
+        self._attachment.__enter__()
+        return self._profile
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._attachment.__exit__(exc_type, exc_value, traceback)
+        self._profile.wall_time = time.perf_counter() - self._start
+        self._profile.status = "ok" if exc_type is None else "error"
+        peak_rss = _peak_rss()
+        if peak_rss is not None and self._peak_rss is not None:
+            self._profile.peak_rss_delta = peak_rss - self._peak_rss
+
+
+def profile_plugin(plugin):
+    """
+    Return a context manager measuring the plugin while its parse() runs, entering it gives the
+    PluginProfile. Plugins running at the same time in threads share the process, so the peak RSS
+    delta is only exact when plugins run one at a time.
+    """
+    return _PluginRun(plugin)
+
+
+def count(counter, amount=1):
+    """
+    Add to a counter of the plugin the calling thread works for, nothing is done when not profiling
+    """
+    plugin_profile = getattr(_current, "profile", None)
+    if plugin_profile is not None:
+        plugin_profile.add(counter, amount)
+
+
+def bind(function):
+    """
+    Return function wrapped so the thread calling it works for the calling thread's plugin, used to
+    hand work to a worker pool
+    """
+    plugin_profile = getattr(_current, "profile", None)
+    if plugin_profile is None:
+        return function
+
+    def bound(*args, **kwargs):
+        with plugin_profile.attach():
+            return function(*args, **kwargs)
+    return bound
+
+
+def _thread_cpu_time():
+    """
+    Return the CPU time of the calling thread, of the process before Python 3.7
+    """
+    if hasattr(time, "thread_time"):
+        return time.thread_time()
+    return time.process_time()
+
+
+def _read_thread_io():
+    """
+    Return the bytes read by the calling thread through read calls, None if the platform does not say
+    """
+    try:
+        with open(THREAD_IO, "rb") as io_file:
+            for line in io_file:
+                if line.startswith(b"rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _peak_rss():
+    """
+    Return the peak resident set size of the process in bytes, None where unknown
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _audit(event, args):
+    """
+    Count the files and directories opened by the plugin the calling thread works for
+    """
+    plugin_profile = getattr(_current, "profile", None)
+    if plugin_profile is None:
+        return
+    if event == "open":
+        path, mode, flags = args
+        plugin_profile.add("files_opened")
+        if mode is None:
+            reading = flags is not None and flags & (os.O_WRONLY | os.O_RDWR) == 0
+        else:
+            reading = "r" in mode and "+" not in mode
+        if reading and isinstance(path, (str, bytes)):
+            try:
+                plugin_profile.add("input_bytes", os.stat(path).st_size)
+            except OSError:
+                pass
+    elif event == "os.scandir":
+        plugin_profile.add("directories_scanned")
+
+
+def _install_hook():
+    """
+    Install the audit hook on first use, audit hooks need Python 3.8 and cannot be removed
+    """
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed and hasattr(sys, "addaudithook"):
+            sys.addaudithook(_audit)
+        _hook_installed = True
+
+
+def write_report(output_dir, profiles, wall_time):
+    """
+    Write the profiles of a run to _osxripper_profile.json in the output directory and print them as a
+    table, slowest first
+    """
+    profiles = sorted(profiles, key=lambda item: item.wall_time, reverse=True)
+    report = {
+        "wall_time": round(wall_time, 6),
+        "plugin_count": len(profiles),
+        "counters": COUNTERS,
+        "plugins": [plugin_profile.as_dict() for plugin_profile in profiles]
+    }
+    profile_path = os.path.join(output_dir, PROFILE_FILE)
+    with open(profile_path, "w", encoding="utf-8") as profile_file:
+        json.dump(report, profile_file, indent=1)
+
+    lines = ["{0:<32} {1:>6} {2:>9} {3:>9} {4:>10} {5:>11} {6:>6} {7:>9} {8:>9}".format(
+        "Plugin", "Status", "Wall (s)", "CPU (s)", "RSS+ (KiB)", "Input (KiB)", "Files", "Rows", "Records")]
+    for plugin_profile in profiles:
+        counters = plugin_profile.counters
+        lines.append("{0:<32} {1:>6} {2:>9.3f} {3:>9.3f} {4:>10} {5:>11} {6:>6} {7:>9} {8:>9}".format(
+            plugin_profile.class_name[:32], plugin_profile.status or "", plugin_profile.wall_time,
+            counters["cpu_time"], "-" if plugin_profile.peak_rss_delta is None else plugin_profile.peak_rss_delta // 1024,
+            counters["input_bytes"] // 1024, counters["files_opened"], counters["rows"], counters["records"]))
+    print("[INFO] Plugin profile, slowest first:")
+    for line in lines:
+        print(line)
+        logging.info(line)
+    print("[INFO] Profile written to {0}.".format(profile_path))
+    logging.info("Profile written to %s.", profile_path)
+    return profile_path
@@ -0,0 +1,625 @@
+""" Module to write plugin artifacts as records in text, JSONL or CSV format """
+import collections
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+from riplib import osxripper_output
+from riplib import osxripper_profile
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+FORMAT_TEXT = "text"
+FORMAT_JSONL = "jsonl"
+FORMAT_CSV = "csv"
+FORMAT_SQLITE = "sqlite"
+
+BATCH_SIZE = 1024  # records buffered before a write to the output file
+SQLITE_BATCH_SIZE = 10000  # records inserted per transaction into the output database
+SQLITE_DATABASE = "osxripper.sqlite"
+TEXT_TEMPLATES = 256  # record layouts a text writer keeps formatting templates for
+
+_json_encoder = json.JSONEncoder(default=str, ensure_ascii=False)  # shared, json.dumps builds one per call
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+class RecordWriter():
+    """
+    Base class for record writers. Plugins pass one dict per artifact to write_record,
+    records are buffered and written out in batches.
+    """
+    extension = ".txt"
+    batch_size = BATCH_SIZE
+    whole_sections = False  # True if the output of a plugin must reach a shared file in one write
+    own_files = False  # True if plugins sharing an output file each write a file of their own
+
+    def __init__(self, output_path, plugin_name, context=None, batch_size=None, timeline=None):
+        """
+        Initialise the class. output_path is the text output path of the plugin, other
+        formats swap its extension. context holds fields added to every structured record.
+        timeline is an optional TimelineWriter receiving the events passed to write_event.
+        """
+        self._output_path = os.path.splitext(output_path)[0] + self.extension
+        self._plugin_name = plugin_name
+        self._context = dict(context or {})
+        self._batch_size = self.batch_size if batch_size is None else batch_size
+        self._buffer = []
+        self._section = None
+        self._record_count = 0
+        self._timeline = timeline
+
+    @property
+    def get_output_path(self):
+        """
+        Return the path written to
+        """
+        return self._output_path
+
+    @property
+    def get_record_count(self):
+        """
+        Return the number of records written
+        """
+        return self._record_count
+
+    def write_header(self):
+        """
+        Start the plugin's output, the text format writes the plugin name banner
+        """
+
+    def write_footer(self):
+        """
+        End the plugin's output, the text format writes the closing rule
+        """
+
+    def write_source(self, source_file, label="Source File"):
+        """
+        Record the source file the following records were read from
+        """
+        self._context["Source File"] = source_file
+
+    def write_text(self, text):
+        """
+        Write free text such as warnings or notes, only kept by the text format
+        """
+
+    def start_section(self, title, label_width=None, spacing=True):
+        """
+        Start a named section, e.g. one per database table
+        """
+        self._section = title
+
+    def write_record(self, record, label_width=None, spacing=None):
+        """
+        Buffer a single record, a dict of label to value. label_width and spacing override the
+        label padding and blank line between records of the text format.
+        """
+        self._record_count += 1
+        self._buffer.append(self._format_record(record, label_width, spacing))
+        if self._batch_size and len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def write_log(self, record, text):
+        """
+        Write a log entry, see riplib.osxripper_logs.LogReader. The text format keeps the text of the
+        entry as it was read, the other formats the parsed record. Log times are local to the machine
+        that wrote the log, so log entries are not added to the UTC timeline.
+        """
+        if record is not None:
+            self.write_record(record)
+
+    def write_event(self, timestamp, event_type, description):
+        """
+        Add an event to the timeline, the user is taken from the writer context. timestamp is in UTC
+        or has a time zone, see riplib.osxripper_timeline.TimelineWriter.add_event.
+        """
+        if self._timeline is not None:
+            self._timeline.add_event(timestamp, self._context.get("User"), event_type, description)
+
+    def write_buffer(self, record_buffer):
+        """
+        Replay the calls collected by a RecordBuffer, waiting for the calls still to come until the
+        buffer is closed
+        """
+        record_buffer.replay(self)
+
+    def _format_record(self, record, label_width, spacing):
+        """
+        Return the buffered representation of a record, override in subclasses
+        """
+        return record
+
+    def _structured(self, record):
+        """
+        Return a record with the plugin, section and context fields added
+        """
+        structured = {"Plugin": self._plugin_name}
+        if self._section is not None:
+            structured["Section"] = self._section
+        structured.update(self._context)
+        structured.update(record)
+        return structured
+
+    def flush(self):
+        """
+        Append the buffered text to the output file, writers buffering other than text override this
+        """
+        if self._buffer:
+            osxripper_output.commit(self._output_path, "".join(self._buffer))
+        self._buffer = []
+
+    def close(self):
+        """
+        Flush any buffered records and timeline events
+        """
+        self.flush()
+        osxripper_profile.count("records", self._record_count)
+        if self._timeline is not None:
+            self._timeline.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class RecordBuffer():
+    """
+    Collect the calls a worker thread makes as if writing to a RecordWriter, so a plugin can produce
+    sections in parallel and write them in order with RecordWriter.write_buffer. Calls are handed over
+    as they are made, a buffer being written out is not held in memory whole.
+    """
+    def __init__(self):
+        """
+        Initialise the class.
+        """
+        self._calls = collections.deque()  # batches of calls handed over to the writing thread
+        self._pending = []  # calls not handed over yet, only touched by the thread making them
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def write_text(self, text):
+        """
+        Collect a call to RecordWriter.write_text
+        """
+        self._add("write_text", text)
+
+    def start_section(self, title, label_width=None, spacing=True):
+        """
+        Collect a call to RecordWriter.start_section
+        """
+        self._add("start_section", title, label_width, spacing)
+
+    def write_record(self, record, label_width=None, spacing=None):
+        """
+        Collect a call to RecordWriter.write_record
+        """
+        self._add("write_record", record, label_width, spacing)
+
+    def write_log(self, record, text):
+        """
+        Collect a call to RecordWriter.write_log
+        """
+        self._add("write_log", record, text)
+
+    def write_event(self, timestamp, event_type, description):
+        """
+        Collect a call to RecordWriter.write_event
+        """
+        self._add("write_event", timestamp, event_type, description)
+
+    def _add(self, *call):
+        """
+        Add a call for the writer, calls are handed over BATCH_SIZE at a time
+        """
+        self._pending.append(call)
+        if len(self._pending) >= BATCH_SIZE:
+            self._hand_over()
+
+    def _hand_over(self):
+        """
+        Pass the pending calls to the writing thread
+        """
+        with self._condition:
+            if self._pending:
+                self._calls.append(self._pending)
+                self._pending = []
+            self._condition.notify()
+
+    def replay(self, writer):
+        """
+        Make the collected calls on writer until the buffer is closed
+        """
+        while True:
+            with self._condition:
+                while not self._calls and not self._closed:
+                    self._condition.wait()
+                if not self._calls:
+                    return
+                batches, self._calls = self._calls, collections.deque()
+            for calls in batches:
+                for call in calls:
+                    getattr(writer, call[0])(*call[1:])
+
+    def close(self):
+        """
+        Hand over the pending calls and mark the end of the calls
+        """
+        with self._condition:
+            self._closed = True
+        self._hand_over()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TextRecordWriter(RecordWriter):
+    """
+    Write records in the osxripper text report format, one "Label : value" line per field
+    """
+    extension = ".txt"
+    whole_sections = True
+
+    def __init__(self, output_path, plugin_name, context=None, batch_size=None, timeline=None):
+        """
+        Initialise the class.
+        """
+        super().__init__(output_path, plugin_name, context, batch_size, timeline)
+        self._label_width = None
+        self._spacing = True
+        self._templates = {}  # (labels, label width, spacing) -> % template of a record
+
+    def write_header(self):
+        """
+        Write the plugin name banner
+        """
+        self._buffer.append("="*10 + " " + self._plugin_name + " " + "="*10 + "\r\n")
+
+    def write_footer(self):
+        """
+        Write the closing rule
+        """
+        self._buffer.append("="*40 + "\r\n\r\n")
+
+    def write_source(self, source_file, label="Source File"):
+        """
+        Record the source file and write it as a "label: path" line
+        """
+        super().write_source(source_file, label)
+        self._buffer.append("{0}: {1}\r\n\r\n".format(label, source_file))
+
+    def write_text(self, text):
+        """
+        Write free text as it is
+        """
+        self._buffer.append(text)
+
+    def write_log(self, record, text):
+        """
+        Write the text of a log entry as it was read, counting it as a record if it was parsed
+        """
+        if record is not None:
+            self._record_count += 1
+        self._buffer.append(text)
+        if self._batch_size and len(self._buffer) >= self._batch_size:
+            self.flush()
+
+    def start_section(self, title, label_width=None, spacing=True):
+        """
+        Write the section title banner, label_width and spacing apply to the records of the section
+        """
+        super().start_section(title, label_width, spacing)
+        self._label_width = label_width
+        self._spacing = spacing
+        self._buffer.append("="*10 + " " + title + " " + "="*10 + "\r\n")
+
+    def _format_record(self, record, label_width, spacing):
+        """
+        Return a record as "Label : value" lines, labels padded to label_width or the longest label
+        """
+        label_width = label_width or self._label_width
+        if spacing is None:
+            spacing = self._spacing
+        # Records of a plugin share a few layouts, the padded labels are laid out once per layout
+        key = (tuple(record), label_width, spacing)
+        template = self._templates.get(key)
+        if template is None:
+            width = label_width or max(len(label) for label in record)
+            template = "".join("{0}: %s\r\n".format(label.ljust(width).replace("%", "%%")) for label in record)
+            if spacing:
+                template += "\r\n"
+            if len(self._templates) >= TEXT_TEMPLATES:
+                self._templates.clear()
+            self._templates[key] = template
+        return template % tuple(record.values())
+
+
+class JsonlRecordWriter(RecordWriter):
+    """
+    Write records as JSON lines, values that are not JSON types are converted with str()
+    """
+    extension = ".jsonl"
+
+    def _format_record(self, record, label_width, spacing):
+        """
+        Return a record as a JSON line
+        """
+        return _json_encoder.encode(self._structured(record)) + "\n"
+
+
+class CsvRecordWriter(RecordWriter):
+    """
+    Write records as CSV, each section goes to its own file as sections have different columns.
+    The keys of the records in the first write to a file fix its header, later records leave the
+    columns they lack empty and a key the header does not have raises ValueError.
+    """
+    extension = ".csv"
+    own_files = True
+
+    def __init__(self, output_path, plugin_name, context=None, batch_size=None, timeline=None):
+        """
+        Initialise the class.
+        """
+        super().__init__(output_path, plugin_name, context, batch_size, timeline)
+        self._base_path = self._output_path
+
+    def start_section(self, title, label_width=None, spacing=True):
+        """
+        Flush the records of the previous section and write the next to <output>_<title>.csv
+        """
+        self.flush()
+        super().start_section(title, label_width, spacing)
+        base, extension = os.path.splitext(self._base_path)
+        self._output_path = "{0}_{1}{2}".format(base, title.replace(" ", "_"), extension)
+
+    def _format_record(self, record, label_width, spacing):
+        """
+        Return a record with the plugin, section and context fields added
+        """
+        return self._structured(record)
+
+    def flush(self):
+        """
+        Append the buffered records as CSV rows, with the header line first if the file is empty
+        """
+        if self._buffer:
+            records = self._buffer
+            osxripper_output.commit(self._output_path, lambda header: _csv_rows(header, records),
+                                    header=lambda: _csv_header(records))
+        self._buffer = []
+
+
+class SqliteDatabase():
+    """
+    Shared connection to the output database of a run. Tables are created and widened as
+    records arrive, all writes from a process go through one connection and lock.
+    """
+    def __init__(self, database_path):
+        """
+        Initialise the class.
+        """
+        self._database_path = database_path
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._connection = sqlite3.connect(database_path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+
+    @property
+    def get_database_path(self):
+        """
+        Return the path of the database
+        """
+        return self._database_path
+
+    def insert(self, table, records):
+        """
+        Insert a batch of records into table in a single transaction
+        """
+        columns = []
+        for record in records:
+            columns.extend(column for column in record if column not in columns)
+        statement = "INSERT INTO {0} ({1}) VALUES ({2})".format(
+            _quote(table), ",".join(_quote(column) for column in columns), ",".join("?" * len(columns)))
+        rows = [tuple(_sqlite_value(record.get(column)) for column in columns) for record in records]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._ensure_columns(table, columns)
+                self._connection.executemany(statement, rows)
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _ensure_columns(self, table, columns):
+        """
+        Create table or add the columns it is missing, called inside the write transaction so
+        tables created by worker processes sharing the database are seen
+        """
+        known = self._columns.get(table)
+        if known is not None and all(column in known for column in columns):
+            return
+        known = [row[1] for row in self._connection.execute("PRAGMA table_info({0})".format(_quote(table)))]
+        if not known:
+            self._connection.execute("CREATE TABLE {0} ({1})".format(
+                _quote(table), ",".join(_quote(column) for column in columns)))
+            known = list(columns)
+        for column in columns:
+            if column not in known:
+                self._connection.execute("ALTER TABLE {0} ADD COLUMN {1}".format(_quote(table), _quote(column)))
+                known.append(column)
+        self._columns[table] = known
+
+    def close(self):
+        """
+        Close the connection
+        """
+        with self._lock:
+            self._connection.close()
+
+
+class SqliteRecordWriter(RecordWriter):
+    """
+    Write records into the run's osxripper.sqlite in the output directory, one table per plugin,
+    or per plugin section as sections have different columns
+    """
+    extension = ".sqlite"
+    batch_size = SQLITE_BATCH_SIZE
+
+    def __init__(self, output_path, plugin_name, context=None, batch_size=None, timeline=None):
+        """
+        Initialise the class.
+        """
+        super().__init__(output_path, plugin_name, context, batch_size, timeline)
+        self._output_path = os.path.join(os.path.dirname(output_path), SQLITE_DATABASE)
+        self._table = _table_name(plugin_name)
+
+    def start_section(self, title, label_width=None, spacing=True):
+        """
+        Flush the records of the previous section and insert the next into a table of its own
+        """
+        self.flush()
+        super().start_section(title, label_width, spacing)
+        self._table = _table_name(self._plugin_name + " " + title)
+
+    def _format_record(self, record, label_width, spacing):
+        """
+        Return a record with the context fields added, the table names the plugin and section
+        """
+        structured = dict(self._context)
+        structured.update(record)
+        return structured
+
+    def flush(self):
+        """
+        Insert the buffered records into the section's table
+        """
+        if self._buffer:
+            get_database(self._output_path).insert(self._table, self._buffer)
+        self._buffer = []
+
+
+def _quote(identifier):
+    """
+    Return a quoted SQLite identifier
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _table_name(name):
+    """
+    Return a table name made from a plugin or section name
+    """
+    return re.sub(r"\W+", "_", name).strip("_")
+
+
+def _sqlite_value(value):
+    """
+    Return a value SQLite can store, other types are stored as text like the text format
+    """
+    if value is None or isinstance(value, (str, bytes, float)):
+        return value
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return value
+    return str(value)
+
+
+def _csv_header(records):
+    """
+    Return the CSV header line of records, their keys in the order they first appear
+    """
+    field_names = []
+    for record in records:
+        field_names.extend(key for key in record if key not in field_names)
+    output_text = io.StringIO(newline="")
+    csv.writer(output_text).writerow(field_names)
+    return output_text.getvalue()
+
+
+def _csv_rows(header, records):
+    """
+    Return records as CSV rows laid out under the header line, raising ValueError for a key the
+    header does not have
+    """
+    field_names = next(csv.reader([header]))
+    output_text = io.StringIO(newline="")
+    writer = csv.DictWriter(output_text, fieldnames=field_names, restval="")
+    writer.writerows(records)
+    return output_text.getvalue()
+
+
+def get_database(database_path):
+    """
+    Return the shared SqliteDatabase for a path, opening it on first use
+    """
+    with _databases_lock:
+        if database_path not in _databases:
+            _databases[database_path] = SqliteDatabase(database_path)
+        return _databases[database_path]
+
+
+def detach_database(output_dir):
+    """
+    Close this process's connection to the output database of a run, it is opened again on the next write
+    """
+    with _databases_lock:
+        database = _databases.pop(os.path.join(output_dir, SQLITE_DATABASE), None)
+    if database is not None:
+        database.close()
+
+
+def close_database(output_dir):
+    """
+    Close the output database of a run and fold its write ahead log back into a single file
+    """
+    database_path = os.path.join(output_dir, SQLITE_DATABASE)
+    detach_database(output_dir)
+    if os.path.isfile(database_path):
+        connection = sqlite3.connect(database_path, timeout=60)
+        try:
+            connection.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            connection.close()
+
+
+WRITERS = {
+    FORMAT_TEXT: TextRecordWriter,
+    FORMAT_JSONL: JsonlRecordWriter,
+    FORMAT_CSV: CsvRecordWriter,
+    FORMAT_SQLITE: SqliteRecordWriter
+}
+
+
+def get_formats():
+    """
+    Return the names of the available output formats
+    """
+    return list(WRITERS)
+
+
+def open_writer(output_format, output_path, plugin_name, context=None, timeline=None, shared=False):
+    """
+    Return a RecordWriter for the output format. When other plugins write to the same output file,
+    e.g. Users_username.txt, shared keeps the text of the writer whole by writing it when it is closed,
+    and the CSV format writes a file per plugin, e.g. Users_username_User_Disk_Utility_Log.csv.
+    """
+    if output_format not in WRITERS:
+        raise ValueError("Unknown output format: {0}".format(output_format))
+    writer_class = WRITERS[output_format]
+    batch_size = 0 if shared and writer_class.whole_sections else None
+    if shared and writer_class.own_files:
+        base, extension = os.path.splitext(output_path)
+        output_path = "{0}_{1}{2}".format(base, _table_name(plugin_name), extension)
+    return writer_class(output_path, plugin_name, context, batch_size, timeline)
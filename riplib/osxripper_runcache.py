@@ -0,0 +1,485 @@
+""" Module to reuse the output of plugins whose source files did not change since an earlier run """
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import sys
+import threading
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+CACHE_DIRECTORY = "_osxripper_cache"
+CACHE_VERSION = 1
+ENTRY_FILE = "entry.json"
+HASH_BLOCK = 65536  # bytes hashed at the start and at the end of each source file
+JOURNAL_SUFFIXES = ["-wal", "-journal"]  # SQLite write ahead log and journal, read with the database they belong to
+
+# Kinds of source recorded for a plugin: files it read, files it only took the size and times of,
+# and directories it listed or looked up entries in
+KIND_FILE = "file"
+KIND_STAT = "stat"
+KIND_DIRECTORY = "directory"
+KINDS = [KIND_FILE, KIND_STAT, KIND_DIRECTORY]
+
+# Output formats written other than through riplib.osxripper_output, their output cannot be replayed
+UNCACHED_FORMATS = ["sqlite"]
+
+_current = threading.local()  # .recorder is the _Recorder of the plugin the thread works for
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def is_available():
+    """
+    Return True if the files a plugin opens can be recorded, audit hooks need Python 3.8
+    """
+    return hasattr(sys, "addaudithook")
+
+
+def open_run_cache(output_dir, input_dir, os_version, output_format, timeline, since=None, until=None):
+    """
+    Return the RunCache of an output directory after deleting the output of its earlier runs, None
+    when the run cannot be incremental
+    """
+    if not is_available():
+        print("[WARNING] Incremental runs need Python 3.8 or later, every plugin will run.")
+        logging.warning("Incremental runs need Python 3.8 or later, every plugin will run.")
+        return None
+    if output_format in UNCACHED_FORMATS:
+        print("[WARNING] Incremental runs are not available for the {0} format, every plugin will run.".format(output_format))
+        logging.warning("Incremental runs are not available for the %s format, every plugin will run.", output_format)
+        return None
+    run_cache = RunCache(output_dir, input_dir, os_version, output_format, timeline, since, until)
+    deleted = run_cache.clear_outputs()
+    print("[INFO] Incremental run, {0} output files of the last run replaced.".format(deleted))
+    logging.info("Incremental run, cache in %s, %d output files of the last run replaced.",
+                 run_cache.get_cache_dir, deleted)
+    return run_cache
+
+
+class RunCache():
+    """
+    Class to hold the cache of the plugin runs over an output directory. For each plugin it keeps the
+    size, modification time and a hash of the source files it read, the directories it looked in and
+    the output it wrote. A plugin whose sources, code and run settings are unchanged has its output
+    written again instead of being run.
+    """
+    def __init__(self, output_dir, input_dir, os_version, output_format, timeline, since=None, until=None):
+        """
+        Initialise the class. since and until are the log time limits of the run.
+        """
+        self._output_dir = os.path.abspath(output_dir)
+        self._input_dir = os.path.abspath(input_dir)
+        self._cache_dir = os.path.join(self._output_dir, CACHE_DIRECTORY)
+        self._settings = {
+            "version": CACHE_VERSION,
+            "input_dir": self._input_dir,
+            "os_version": os_version,
+            "output_format": output_format,
+            "timeline": bool(timeline),
+            "since": None if since is None else since.isoformat(),
+            "until": None if until is None else until.isoformat(),
+            "library": _library_fingerprint()
+        }
+
+    @property
+    def get_cache_dir(self):
+        """
+        Return the directory holding the cache
+        """
+        return self._cache_dir
+
+    @property
+    def get_input_dir(self):
+        """
+        Return the absolute input directory
+        """
+        return self._input_dir
+
+    @property
+    def get_output_dir(self):
+        """
+        Return the absolute output directory
+        """
+        return self._output_dir
+
+    def _entry_dir(self, class_name):
+        """
+        Return the directory holding the entry and output of a plugin
+        """
+        return os.path.join(self._cache_dir, class_name)
+
+    def load_entry(self, class_name):
+        """
+        Return the cached entry of a plugin as a dict, None if there is no usable entry
+        """
+        try:
+            with open(os.path.join(self._entry_dir(class_name), ENTRY_FILE), "r", encoding="utf-8") as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+            return None
+        return entry
+
+    def find(self, plugin):
+        """
+        Return the cached entry of a plugin if its output can be reused, None if the plugin must run
+        """
+        class_name = plugin.__class__.__name__
+        entry = self.load_entry(class_name)
+        if entry is None or entry.get("status") != "ok":
+            return None
+        if entry.get("settings") != self._settings or entry.get("source") != _source_fingerprint(plugin):
+            return None
+        for kind in KINDS:
+            for path, fingerprint in entry.get("inputs", {}).get(kind, {}).items():
+                if _fingerprint(kind, path) != fingerprint:
+                    logging.info("Run cache: %s changed for %s", path, class_name)
+                    return None
+        entry_dir = self._entry_dir(class_name)
+        for output in entry.get("outputs", []) + entry.get("files", []):
+            if not os.path.isfile(os.path.join(entry_dir, output["blob"])):
+                return None
+        return entry
+
+    def restore(self, entry, append):
+        """
+        Write the cached output of a plugin to the output directory, append(path, data) appends to a
+        shared output file. Return the number of bytes written.
+        """
+        entry_dir = self._entry_dir(entry["class_name"])
+        written = 0
+        for output in entry.get("outputs", []):
+            with open(os.path.join(entry_dir, output["blob"]), "rb") as blob_file:
+                data = blob_file.read()
+            append(os.path.join(self._output_dir, output["path"]), data)
+            written += len(data)
+        for output in entry.get("files", []):
+            output_path = os.path.join(self._output_dir, output["path"])
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            shutil.copyfile(os.path.join(entry_dir, output["blob"]), output_path)
+            written += os.path.getsize(output_path)
+        return written
+
+    def clear_outputs(self):
+        """
+        Delete the output files written by the plugins of earlier runs so this run writes them afresh,
+        called once before the plugins run. Return the number of files deleted.
+        """
+        deleted = set()
+        if not os.path.isdir(self._cache_dir):
+            return 0
+        for class_name in sorted(os.listdir(self._cache_dir)):
+            if class_name.endswith(_Recorder.STAGING_SUFFIX):
+                shutil.rmtree(os.path.join(self._cache_dir, class_name), ignore_errors=True)
+                continue
+            entry = self.load_entry(class_name)
+            if entry is None:
+                continue
+            for output in entry.get("outputs", []) + entry.get("files", []):
+                output_path = os.path.normpath(os.path.join(self._output_dir, output["path"]))
+                if output_path in deleted or not _is_below(output_path, self._output_dir):
+                    continue
+                try:
+                    os.remove(output_path)
+                    deleted.add(output_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as error:
+                    logging.warning("Run cache: unable to delete %s: %s", output_path, error)
+        return len(deleted)
+
+    def record(self, plugin):
+        """
+        Return a context manager recording the sources and output of the plugin while its parse() runs
+        on the calling thread
+        """
+        return _Recorder(self, plugin)
+
+    def store(self, recorder, status):
+        """
+        Save the entry of a recorded plugin run. Entries of failed runs are kept so their output is
+        deleted by the next run, but they are never reused.
+        """
+        entry_dir = self._entry_dir(recorder.class_name)
+        try:
+            files = []
+            for index, relative_path in enumerate(recorder.produced):
+                source_path = os.path.join(self._output_dir, relative_path)
+                if not os.path.isfile(source_path):
+                    continue  # e.g. a temporary file the plugin removed
+                blob = "file{0}.bin".format(index)
+                shutil.copyfile(source_path, os.path.join(recorder.staging_dir, blob))
+                files.append({"path": relative_path, "blob": blob})
+            entry = {
+                "version": CACHE_VERSION,
+                "class_name": recorder.class_name,
+                "name": recorder.name,
+                "status": status,
+                "settings": self._settings,
+                "source": recorder.source,
+                "inputs": {kind: {path: _fingerprint(kind, path) for path in sorted(paths)}
+                           for kind, paths in recorder.inputs.items()},
+                "outputs": [{"path": relative_path, "blob": blob} for relative_path, blob in recorder.outputs.items()],
+                "files": files
+            }
+            with open(os.path.join(recorder.staging_dir, ENTRY_FILE), "w", encoding="utf-8") as entry_file:
+                json.dump(entry, entry_file, indent=1)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(recorder.staging_dir, entry_dir)
+        except OSError as error:
+            logging.warning("Run cache: unable to store %s: %s", recorder.class_name, error)
+            shutil.rmtree(recorder.staging_dir, ignore_errors=True)
+
+    def __repr__(self):
+        """
+        Return a string representation of the cache
+        """
+        return "RunCache(%s)" % self._cache_dir
+
+
+class _Recorder():
+    """
+    Record the sources a plugin reads and the output it writes, output appended to shared files is
+    copied to blob files as it is written
+    """
+    STAGING_SUFFIX = ".partial"
+
+    def __init__(self, run_cache, plugin):
+        self.class_name = plugin.__class__.__name__
+        self.name = plugin.get_name
+        self.source = _source_fingerprint(plugin)
+        self.staging_dir = os.path.join(run_cache.get_cache_dir, self.class_name + self.STAGING_SUFFIX)
+        self.inputs = {kind: set() for kind in KINDS}
+        self.outputs = {}  # output path relative to the output directory -> blob name
+        self.produced = []  # files created in the output directory, relative paths
+        self._input_dir = run_cache.get_input_dir
+        self._output_dir = run_cache.get_output_dir
+        self._cache_dir = run_cache.get_cache_dir
+        self._blob_files = {}
+        self._lock = threading.RLock()
+        self._attachment = None
+
+    def attach(self):
+        """
+        Return a context manager attributing the reads and writes of the calling thread to this recorder
+        """
+        return _Attachment(self)
+
+    def add_input(self, kind, path):
+        """
+        Record a source below the input directory
+        """
+        path = os.path.normpath(os.path.abspath(path))
+        if _is_below(path, self._input_dir):
+            with self._lock:
+                self.inputs[kind].add(path)
+
+    def add_output(self, output_path, data):
+        """
+        Record data appended to an output file
+        """
+        output_path = os.path.normpath(os.path.abspath(output_path))
+        if not _is_below(output_path, self._output_dir):
+            return
+        relative_path = os.path.relpath(output_path, self._output_dir)
+        with self._lock:
+            blob_file = self._blob_files.get(relative_path)
+            if blob_file is None:
+                blob = "output{0}.bin".format(len(self.outputs))
+                blob_file = self._blob_files[relative_path] = open(os.path.join(self.staging_dir, blob), "ab")
+                self.outputs[relative_path] = blob
+            blob_file.write(data)
+
+    def add_produced(self, output_path):
+        """
+        Record a file created in the output directory, e.g. a timeline chunk, copied when the run ends
+        """
+        output_path = os.path.normpath(os.path.abspath(output_path))
+        if not _is_below(output_path, self._output_dir) or _is_below(output_path, self._cache_dir):
+            return
+        relative_path = os.path.relpath(output_path, self._output_dir)
+        with self._lock:
+            if relative_path not in self.produced:
+                self.produced.append(relative_path)
+
+    def __enter__(self):
+        _install_hook()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        os.makedirs(self.staging_dir)
+        self._attachment = self.attach()
+        self._attachment.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._attachment.__exit__(exc_type, exc_value, traceback)
+        with self._lock:
+            for blob_file in self._blob_files.values():
+                blob_file.close()
+            self._blob_files = {}
+
+
+class _Attachment():
+    """
+    Attribute the reads and writes of the current thread to a recorder while entered
+    """
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._previous = None
+
+    def __enter__(self):
+        self._previous = getattr(_current, "recorder", None)
+        _current.recorder = self._recorder
+        return self._recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current.recorder = self._previous
+
+
+def track(kind, path):
+    """
+    Record a source of the plugin the calling thread works for, nothing is done when not recording
+    """
+    recorder = getattr(_current, "recorder", None)
+    if recorder is not None and isinstance(path, str):
+        recorder.add_input(kind, path)
+
+
+def track_output(output_path, data):
+    """
+    Record data appended to an output file by the plugin the calling thread works for
+    """
+    recorder = getattr(_current, "recorder", None)
+    if recorder is not None:
+        recorder.add_output(output_path, data)
+
+
+def bind(function):
+    """
+    Return function wrapped so the thread calling it records for the calling thread's plugin, used to
+    hand work to a worker pool
+    """
+    recorder = getattr(_current, "recorder", None)
+    if recorder is None:
+        return function
+
+    def bound(*args, **kwargs):
+        with recorder.attach():
+            return function(*args, **kwargs)
+    return bound
+
+
+def _is_below(path, directory):
+    """
+    Return True if the normalised path is directory or below it
+    """
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def _sample_hash(path, size):
+    """
+    Return a hash of the size and the first and last HASH_BLOCK bytes of a file, a full hash of large
+    databases would cost most of the time a re-run saves
+    """
+    digest = hashlib.sha1(str(size).encode("ascii"))
+    with open(path, "rb") as source_file:
+        digest.update(source_file.read(HASH_BLOCK))
+        if size > HASH_BLOCK:
+            source_file.seek(max(HASH_BLOCK, size - HASH_BLOCK))
+            digest.update(source_file.read(HASH_BLOCK))
+    return digest.hexdigest()
+
+
+def _fingerprint(kind, path):
+    """
+    Return the fingerprint of a source as stored in the cache, None if it does not exist
+    """
+    try:
+        if kind == KIND_DIRECTORY:
+            with os.scandir(path) as iterator:
+                names = sorted("{0}/{1}".format(dir_entry.name, "d" if dir_entry.is_dir() else "f")
+                               for dir_entry in iterator)
+            return hashlib.sha1("\n".join(names).encode("utf-8", "surrogateescape")).hexdigest()
+        source_stat = os.stat(path)
+        if stat.S_ISDIR(source_stat.st_mode):
+            return [source_stat.st_mtime_ns]
+        fingerprint = [source_stat.st_size, source_stat.st_mtime_ns]
+        if kind == KIND_FILE:
+            fingerprint.append(_sample_hash(path, source_stat.st_size))
+            for suffix in JOURNAL_SUFFIXES:
+                try:
+                    journal_stat = os.stat(path + suffix)
+                    fingerprint.extend([suffix, journal_stat.st_size, journal_stat.st_mtime_ns])
+                except OSError:
+                    pass
+        return fingerprint
+    except OSError:
+        return None
+
+
+def _source_fingerprint(plugin):
+    """
+    Return the size and modification time of the plugin's module
+    """
+    module = sys.modules.get(plugin.__class__.__module__)
+    try:
+        source_stat = os.stat(module.__file__)
+    except (AttributeError, TypeError, OSError):
+        return None
+    return [os.path.basename(module.__file__), source_stat.st_size, source_stat.st_mtime_ns]
+
+
+def _library_fingerprint():
+    """
+    Return a hash of the sizes and modification times of the riplib modules, a change to shared code
+    runs every plugin again
+    """
+    library_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for module_name in sorted(os.listdir(library_dir)):
+        if module_name.endswith(".py"):
+            module_stat = os.stat(os.path.join(library_dir, module_name))
+            digest.update("{0}:{1}:{2}\n".format(module_name, module_stat.st_size, module_stat.st_mtime_ns).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _audit(event, args):
+    """
+    Record the files read and created and the directories listed by the plugin the calling thread works for
+    """
+    recorder = getattr(_current, "recorder", None)
+    if recorder is None:
+        return
+    if event == "open":
+        path, mode, flags = args
+        if not isinstance(path, str):
+            return
+        if mode is None:
+            reading = flags is not None and flags & (os.O_WRONLY | os.O_RDWR) == 0
+            creating = flags is not None and flags & os.O_CREAT != 0
+        else:
+            reading = "r" in mode and "+" not in mode
+            creating = "w" in mode or "x" in mode
+        if reading:
+            recorder.add_input(KIND_FILE, path)
+        elif creating:
+            # Appends go through riplib.osxripper_output and are recorded as they are written
+            recorder.add_produced(path)
+    elif event in ("os.listdir", "os.scandir") and isinstance(args[0], str):
+        recorder.add_input(KIND_DIRECTORY, args[0])
+
+
+def _install_hook():
+    """
+    Install the audit hook on first use, audit hooks cannot be removed
+    """
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed and hasattr(sys, "addaudithook"):
+            sys.addaudithook(_audit)
+        _hook_installed = True
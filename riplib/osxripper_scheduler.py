@@ -0,0 +1,275 @@
+""" Module to schedule plugins over a worker pool and track their completion """
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from riplib import osxripper_inventory
+from riplib import osxripper_output
+from riplib import osxripper_profile
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+# Relative cost of a plugin by type, heavier plugins are started first and
+# occupy more of the worker budget while they run
+TYPE_WEIGHTS = {
+    "sqlite": 3,
+    "dir_list": 3,
+    "bplist": 2,
+    "mixed": 2,
+    "multi": 2,
+    "multiple": 2,
+    "plist": 1,
+    "file": 1,
+    "text": 1
+}
+
+# Maximum number of plugins of a type allowed to run at the same time,
+# types not listed are only limited by the worker budget
+TYPE_LIMITS = {
+    "sqlite": 4,
+    "dir_list": 2,
+    "bplist": 4
+}
+
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+MODE_THREAD = "thread"
+MODE_PROCESS = "process"
+MODES = [MODE_THREAD, MODE_PROCESS]
+
+
+def default_workers():
+    """
+    Return the default number of workers, one less than the CPU count but never less than one
+    """
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+class PluginResult():
+    """
+    Class to hold the outcome of a single plugin run
+    """
+    def __init__(self, plugin):
+        """
+        Initialise the class.
+        """
+        self.plugin = plugin
+        self.class_name = plugin.__class__.__name__
+        self.name = plugin.get_name
+        self.type = plugin.get_type
+        self.status = STATUS_PENDING
+        self.wall_time = 0.0
+        self.error = None
+        self.profile = None
+
+    def __repr__(self):
+        """
+        Return a string representation of the result
+        """
+        return "PluginResult(%s, %s, %.3f)" % (self.class_name, self.status, self.wall_time)
+
+
+class PluginScheduler():
+    """
+    Run plugins over a bounded thread or process pool, heaviest first, honouring
+    per type concurrency limits
+    """
+    def __init__(self, max_workers=None, type_weights=None, type_limits=None, mode=MODE_THREAD, profile=False,
+                 executor=None, task=None):
+        """
+        Initialise the class. executor is an already started pool to run the plugins on instead of one
+        owned by the scheduler, task replaces run_plugin as the function the pool calls.
+        """
+        if mode not in MODES:
+            raise ValueError("Unknown scheduler mode: {0}".format(mode))
+        self._mode = mode
+        self._profile = profile
+        self._executor = executor
+        self._shared_executor = executor is not None
+        self._task = task or run_plugin
+        self._log_queue = None
+        self._log_listener = None
+        self._max_workers = max(1, max_workers or default_workers())
+        self._type_weights = dict(TYPE_WEIGHTS)
+        if type_weights:
+            self._type_weights.update(type_weights)
+        self._type_limits = dict(TYPE_LIMITS)
+        if type_limits:
+            self._type_limits.update(type_limits)
+
+    @property
+    def get_max_workers(self):
+        """
+        Return the size of the worker pool
+        """
+        return self._max_workers
+
+    @property
+    def get_mode(self):
+        """
+        Return the execution mode, thread or process
+        """
+        return self._mode
+
+    def get_weight(self, plugin):
+        """
+        Return the scheduling weight of a plugin, capped to the worker budget
+        """
+        return min(self._type_weights.get(plugin.get_type, 1), self._max_workers)
+
+    def order(self, plugins):
+        """
+        Return the plugins ordered heaviest first, ties broken by class name
+        """
+        return sorted(plugins, key=lambda plugin: (-self.get_weight(plugin), plugin.__class__.__name__))
+
+    def run(self, plugins):
+        """
+        Run the plugins and return a list of PluginResult in completion order
+        """
+        pending = [PluginResult(plugin) for plugin in self.order(plugins)]
+        running = {}
+        running_types = {}
+        used_weight = 0
+        results = []
+
+        while pending or running:
+            for result in list(pending):
+                weight = self.get_weight(result.plugin)
+                limit = self._type_limits.get(result.type)
+                if limit is not None and running_types.get(result.type, 0) >= limit:
+                    continue
+                if running and used_weight + weight > self._max_workers:
+                    continue
+                pending.remove(result)
+                used_weight += weight
+                running_types[result.type] = running_types.get(result.type, 0) + 1
+                running[self._executor.submit(self._task, result.plugin, self._profile)] = (result, weight)
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, weight = running.pop(future)
+                try:
+                    result.status, result.wall_time, result.error, result.profile = future.result()
+                except Exception as error:
+                    # The worker itself died, e.g. a crashed or killed process
+                    result.status = STATUS_ERROR
+                    result.error = "{0}: {1}".format(error.__class__.__name__, error)
+                    logging.error("Plugin %s failed: %s", result.name, result.error)
+                    print("[ERROR] Plugin {0} failed: {1}".format(result.name, result.error))
+                used_weight -= weight
+                running_types[result.type] -= 1
+                results.append(result)
+        return results
+
+    def __enter__(self):
+        """
+        Start the worker pool, in process mode worker log records are merged back
+        into the handlers of the root logger
+        """
+        if self._shared_executor:
+            return self
+        if self._mode == MODE_PROCESS:
+            self._log_queue = multiprocessing.Queue()
+            self._log_listener = logging.handlers.QueueListener(
+                self._log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+            self._log_listener.start()
+            self._executor = ProcessPoolExecutor(max_workers=self._max_workers,
+                                                 initializer=_init_worker_process,
+                                                 initargs=(self._log_queue, logging.getLogger().level))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Shut down the worker pool
+        """
+        if self._shared_executor:
+            return
+        self._executor.shutdown(wait=True)
+        if self._log_listener:
+            self._log_listener.stop()
+            self._log_listener = None
+
+
+def _init_worker_process(log_queue, log_level):
+    """
+    Route the logging of a worker process to the parent through log_queue
+    """
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(log_level)
+
+
+def run_plugin(plugin, profile=False):
+    """
+    Run a single plugin and return a tuple of its status, wall time, error and PluginProfile,
+    the profile is None unless profile is True
+    """
+    print("[INFO] Running: {0}".format(plugin.get_name))
+    logging.info("Running: %s", plugin.get_name)
+    start = time.perf_counter()
+    plugin_profile = None
+    try:
+        if plugin.get_input_dir is not None:
+            # Plugins unpickled in a worker process register with that process's inventory
+            osxripper_inventory.get_inventory(plugin.get_input_dir)
+        if profile:
+            with osxripper_profile.profile_plugin(plugin) as plugin_profile:
+                plugin.parse()
+        else:
+            plugin.parse()
+        return STATUS_OK, time.perf_counter() - start, None, plugin_profile
+    except Exception as error:
+        logging.exception("Plugin %s failed", plugin.get_name)
+        print("[ERROR] Plugin {0} failed: {1}: {2}".format(plugin.get_name, error.__class__.__name__, error))
+        return STATUS_ERROR, time.perf_counter() - start, "{0}: {1}".format(error.__class__.__name__, error), \
+            plugin_profile
+
+
+def run_cached_plugin(run_cache, plugin, profile=False):
+    """
+    Run a single plugin as run_plugin does, recording its sources and output in run_cache. When the
+    cache holds the output of an earlier run over unchanged sources that output is written instead.
+    """
+    start = time.perf_counter()
+    entry = run_cache.find(plugin)
+    if entry is not None:
+        try:
+            written = run_cache.restore(entry, osxripper_output.append)
+            print("[INFO] Reused: {0}".format(plugin.get_name))
+            logging.info("Reused: %s, %d bytes of cached output", plugin.get_name, written)
+            return STATUS_OK, time.perf_counter() - start, None, None
+        except OSError as error:
+            logging.warning("Unable to reuse the output of %s, running it: %s", plugin.get_name, error)
+    with run_cache.record(plugin) as recorder:
+        result = run_plugin(plugin, profile)
+    run_cache.store(recorder, result[0])
+    return result
+
+
+def report(results):
+    """
+    Print and log the status and wall time of each plugin, slowest first
+    """
+    failed = [result for result in results if result.status != STATUS_OK]
+    for result in sorted(results, key=lambda item: item.wall_time, reverse=True):
+        logging.info("Plugin %s: %s in %.3fs", result.class_name, result.status, result.wall_time)
+    print("[INFO] Completed {0} plugins, {1} failed."
+          .format(len(results) - len(failed), len(failed)))
+    logging.info("Completed %d plugins, %d failed.", len(results) - len(failed), len(failed))
+    for result in failed:
+        print("[ERROR] {0}: {1} ({2})".format(result.class_name, result.status, result.error))
+        logging.error("%s: %s (%s)", result.class_name, result.status, result.error)
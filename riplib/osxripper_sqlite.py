@@ -0,0 +1,484 @@
+""" Module to read artifact SQLite databases """
+import collections
+import functools
+import logging
+import multiprocessing.util
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import urllib.parse
+from riplib import osxripper_profile
+from riplib import osxripper_runcache
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+FETCH_SIZE = 1000  # rows fetched from a cursor at a time
+CACHE_SIZE = -65536  # page cache per connection, negative values are KiB
+MMAP_SIZE = 268435456  # bytes of the database file read through a memory map
+IDLE_CONNECTIONS = 8  # released connections kept open for plugins reading the same database later
+
+# Files beside a database holding changes not yet in it, a database with either is read from a staged copy
+JOURNAL_SUFFIXES = ["-wal", "-journal"]
+STAGING_DIRECTORIES = ["/dev/shm"]  # RAM backed scratch tried before the temporary directory
+STAGING_HEADROOM = 2  # free space a scratch directory needs, as a multiple of the size of the copy
+STAGE_ATTEMPTS = 3  # copies made of a database that changes while it is copied, e.g. on a live system
+
+# Connections can only be shared between threads when SQLite runs serialized,
+# Python reports that reliably from 3.11, earlier versions pool per thread
+SHARE_BETWEEN_THREADS = sqlite3.threadsafety == 3
+
+_pool = {}  # key -> [connection, reference count]
+_idle = collections.OrderedDict()  # keys of connections with no references, oldest first
+_keys = {}  # id(connection) -> key
+_statement_locks = {}  # id(connection) -> lock starting the statements of a pooled connection one at a time
+_pool_lock = threading.Lock()
+
+_snapshots = {}  # normalised database path -> _Snapshot
+_staged = {}  # id(connection) -> normalised paths of the snapshots it reads
+_scratch = {}  # scratch directory -> staging directory of this process in it
+_snapshots_lock = threading.Lock()
+
+
+class RowIterator():
+    """
+    Iterate the rows of an executed cursor with fetchmany so only one batch is held in memory.
+    The first batch is fetched on creation, so the iterator is False when the query returned no rows.
+    """
+    def __init__(self, cursor, batch_size=None):
+        """
+        Initialise the class.
+        """
+        self._cursor = cursor
+        self._batch_size = batch_size or FETCH_SIZE
+        self._batch = cursor.fetchmany(self._batch_size)
+
+    def batches(self):
+        """
+        Generate the rows a batch at a time, e.g. for the batch conversions of riplib.osxripper_time
+        """
+        while self._batch:
+            batch, self._batch = self._batch, []
+            osxripper_profile.count("rows", len(batch))
+            yield batch
+            self._batch = self._cursor.fetchmany(self._batch_size)
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    def __bool__(self):
+        """
+        Return True if rows remain to be read
+        """
+        return bool(self._batch)
+
+
+def iterate_rows(cursor, batch_size=None):
+    """
+    Return a RowIterator over the rows of an executed cursor, a drop-in replacement for cursor.fetchall()
+    when the rows are only looped over
+    """
+    return RowIterator(cursor, batch_size)
+
+
+def get_readonly_uri(database_path):
+    """
+    Return a URI opening database_path read only and immutable, SQLite then takes no locks and never
+    creates journal or -wal/-shm files beside the evidence
+    """
+    path = os.path.abspath(database_path).replace(os.sep, "/")
+    if not path.startswith("/"):
+        path = "/" + path  # Windows drive letters
+    return "file:{0}?mode=ro&immutable=1".format(urllib.parse.quote(path, safe="/:"))
+
+
+def _open_readonly(database_path):
+    """
+    Open a new read only connection with tuned pragmas, to a staged copy when the database has a
+    write ahead log or a hot journal
+    """
+    snapshot = _stage(database_path)
+    try:
+        open_path = database_path if snapshot is None else snapshot.get_path
+        connection = sqlite3.connect(get_readonly_uri(open_path), uri=True, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA query_only=1")
+        connection.execute("PRAGMA cache_size={0}".format(CACHE_SIZE))
+        connection.execute("PRAGMA mmap_size={0}".format(MMAP_SIZE))
+    except sqlite3.Error:
+        if snapshot is not None:
+            _unstage(snapshot.get_key)
+        raise
+    if snapshot is not None:
+        with _snapshots_lock:
+            _staged.setdefault(id(connection), []).append(snapshot.get_key)
+    return connection
+
+
+def _close(connection):
+    """
+    Close a connection of the pool and let go of the staged copies it reads, if any
+    """
+    connection.close()
+    with _pool_lock:
+        _statement_locks.pop(id(connection), None)
+    with _snapshots_lock:
+        keys = _staged.pop(id(connection), [])
+    for key in keys:
+        _unstage(key)
+
+
+def _count_source(database_path):
+    """
+    Count a database opened against the calling thread's plugin and record it as a source
+    """
+    osxripper_profile.count("files_opened")
+    osxripper_runcache.track(osxripper_runcache.KIND_FILE, database_path)
+    if os.path.isfile(database_path):
+        osxripper_profile.count("input_bytes", os.path.getsize(database_path))
+
+
+def connect_readonly(database_path, shared=True):
+    """
+    Return a read only connection to database_path, rows are returned as sqlite3.Row. Plugins opening
+    the same database share the connection, hand it back with release() rather than closing it.
+    shared False opens a connection of the caller's own, e.g. to read tables of a database in parallel,
+    release() closes it.
+    """
+    _count_source(database_path)
+    if not shared:
+        return _open_readonly(database_path)
+    key = os.path.normcase(os.path.abspath(database_path))
+    return _connect_pooled(key, functools.partial(_open_readonly, database_path))
+
+
+def connect_attached(attachments, shared=True):
+    """
+    Return a read only connection with the databases of attachments, a dict of schema name to path,
+    attached under those names to an empty in-memory main database, so one query can join them, e.g.
+    history.urls to favicons.icon_mapping. Each database is read from a staged copy when it has a write
+    ahead log or a hot journal, as with connect_readonly. Plugins attaching the same databases share the
+    connection, shared False opens one of the caller's own. Hand the connection back with release().
+    """
+    for attachment_path in attachments.values():
+        _count_source(attachment_path)
+    if not shared:
+        return _open_attached(attachments)
+    key = tuple(sorted((schema, os.path.normcase(os.path.abspath(attachment_path)))
+                       for schema, attachment_path in attachments.items()))
+    return _connect_pooled(key, functools.partial(_open_attached, dict(attachments)))
+
+
+def _connect_pooled(key, opener):
+    """
+    Return the pooled connection of key, opened with opener() when the pool has none
+    """
+    if not SHARE_BETWEEN_THREADS:
+        key = (key, threading.get_ident())
+    with _pool_lock:
+        entry = _pool.get(key)
+        if entry is not None:
+            entry[1] += 1
+            _idle.pop(key, None)
+            return entry[0]
+    connection = opener()
+    with _pool_lock:
+        entry = _pool.get(key)
+        if entry is not None:
+            # Another thread opened the database meanwhile, use its connection
+            entry[1] += 1
+            _idle.pop(key, None)
+            surplus, connection = connection, entry[0]
+        else:
+            _pool[key] = [connection, 1]
+            _keys[id(connection)] = key
+            _statement_locks[id(connection)] = threading.Lock()
+            surplus = None
+    if surplus is not None:
+        _close(surplus)
+    return connection
+
+
+def _open_attached(attachments):
+    """
+    Open a new connection to an in-memory database and attach the databases of attachments read only,
+    staged copies are read in place of databases with a write ahead log or a hot journal
+    """
+    connection = sqlite3.connect("file::memory:", uri=True, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    try:
+        connection.execute("PRAGMA query_only=1")
+        for schema, attachment_path in attachments.items():
+            snapshot = _stage(attachment_path)
+            if snapshot is not None:
+                with _snapshots_lock:
+                    _staged.setdefault(id(connection), []).append(snapshot.get_key)
+            open_path = attachment_path if snapshot is None else snapshot.get_path
+            connection.execute("ATTACH DATABASE ? AS {0}".format(_quote(schema)), (get_readonly_uri(open_path),))
+            connection.execute("PRAGMA {0}.cache_size={1}".format(_quote(schema), CACHE_SIZE))
+            connection.execute("PRAGMA {0}.mmap_size={1}".format(_quote(schema), MMAP_SIZE))
+    except sqlite3.Error:
+        _close(connection)
+        raise
+    return connection
+
+
+def execute(cursor, query, parameters=()):
+    """
+    Execute a query on a cursor and return the cursor. Statements on a pooled connection, which threads
+    share, are started one at a time: SQLite keeps one error message per connection, so a statement
+    failing at the same time as another on the connection could otherwise report the other's error.
+    """
+    lock = _statement_locks.get(id(cursor.connection))
+    if lock is None:
+        return cursor.execute(query, parameters)
+    with lock:
+        return cursor.execute(query, parameters)
+
+
+def get_columns(connection, table, schema="main"):
+    """
+    Return the column names of a table of a connection, empty if the table does not exist
+    """
+    return [row[1] for row in connection.execute("PRAGMA {0}.table_info({1})".format(_quote(schema), _quote(table)))]
+
+
+def _quote(identifier):
+    """
+    Return a quoted SQLite identifier
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def release(connection):
+    """
+    Hand back a connection from connect_readonly, the least recently used idle connections are
+    closed once more than IDLE_CONNECTIONS are unused
+    """
+    to_close = []
+    with _pool_lock:
+        key = _keys.get(id(connection))
+        if key is None:
+            to_close.append(connection)
+        else:
+            entry = _pool[key]
+            entry[1] -= 1
+            if entry[1] <= 0:
+                _idle[key] = True
+                while len(_idle) > IDLE_CONNECTIONS:
+                    idle_key, _ = _idle.popitem(last=False)
+                    to_close.append(_pool.pop(idle_key)[0])
+                    del _keys[id(to_close[-1])]
+    for idle_connection in to_close:
+        _close(idle_connection)
+
+
+def close_all():
+    """
+    Close every pooled connection and remove the staged copies, called by the drivers at the end of a run
+    """
+    with _pool_lock:
+        connections = [entry[0] for entry in _pool.values()]
+        _pool.clear()
+        _idle.clear()
+        _keys.clear()
+    for connection in connections:
+        _close(connection)
+    remove_staging()
+
+
+class _Snapshot():
+    """
+    Class to hold a copy of a database with its -wal or hot journal, staged in a scratch directory and
+    brought to a consistent state there. Shared by the connections to the database, the copy is
+    removed when the last one is closed.
+    """
+    def __init__(self, key, database_path):
+        """
+        Initialise the class.
+        """
+        self._key = key
+        self._database_path = database_path
+        self._directory = None
+        self._path = None
+        self.references = 0
+        self.lock = threading.Lock()
+
+    @property
+    def get_key(self):
+        """
+        Return the normalised path of the database
+        """
+        return self._key
+
+    @property
+    def get_path(self):
+        """
+        Return the path of the staged copy
+        """
+        return self._path
+
+    def build(self):
+        """
+        Copy the database and the files holding its pending changes, then apply the changes to the copy
+        with a writable connection, a write ahead log is checkpointed and a hot journal rolled back.
+        Nothing is done if the copy exists.
+        """
+        if self._path is not None:
+            return
+        paths = [self._database_path] + [self._database_path + suffix for suffix in JOURNAL_SUFFIXES]
+        for attempt in range(1, STAGE_ATTEMPTS + 1):
+            fingerprint = _fingerprint(paths)
+            size = sum(item[0] for item in fingerprint if item is not None)
+            directory = tempfile.mkdtemp(prefix="snapshot_", dir=_get_scratch(size))
+            staged_path = os.path.join(directory, os.path.basename(self._database_path))
+            try:
+                for path, item in zip(paths, fingerprint):
+                    if item is not None:
+                        _copy_file(path, staged_path + path[len(self._database_path):])
+            except OSError:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise
+            if _fingerprint(paths) == fingerprint or attempt == STAGE_ATTEMPTS:
+                break
+            # Changed while it was copied, the copy may mix old and new pages
+            shutil.rmtree(directory, ignore_errors=True)
+        try:
+            connection = sqlite3.connect(staged_path, isolation_level=None)
+            try:
+                connection.execute("SELECT count(*) FROM sqlite_master").fetchone()
+                if connection.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+                    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+                    connection.execute("PRAGMA journal_mode=DELETE").fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        self._directory = directory
+        self._path = staged_path
+
+    def remove(self):
+        """
+        Delete the staged copy
+        """
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+            self._path = None
+
+
+def _fingerprint(paths):
+    """
+    Return the (size, modification time) of each path, None for files that are missing or empty
+    """
+    fingerprint = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            fingerprint.append(None)
+            continue
+        fingerprint.append((stat.st_size, stat.st_mtime_ns) if stat.st_size > 0 else None)
+    return fingerprint
+
+
+def _stage(database_path):
+    """
+    Return the _Snapshot to read in place of database_path, None when the database has no pending
+    changes beside it or the copy fails. Every snapshot returned is let go of with _unstage.
+    """
+    if all(item is None for item in _fingerprint([database_path + suffix for suffix in JOURNAL_SUFFIXES])):
+        return None
+    if not os.path.isfile(database_path):
+        return None
+    key = os.path.normcase(os.path.abspath(database_path))
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            snapshot = _snapshots[key] = _Snapshot(key, database_path)
+        snapshot.references += 1
+    try:
+        # Plugins opening the database at the same time wait for one copy
+        with snapshot.lock:
+            snapshot.build()
+    except (OSError, sqlite3.Error) as error:
+        _unstage(key)
+        logging.warning("Unable to stage a copy of %s, changes in its write ahead log or journal are not read: %s",
+                        database_path, error)
+        print("[WARNING] Unable to stage a copy of {0}, changes in its write ahead log or journal are not read: {1}"
+              .format(database_path, error))
+        return None
+    return snapshot
+
+
+def _unstage(key):
+    """
+    Let go of a snapshot returned by _stage, it is removed once no connection reads it
+    """
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            return
+        snapshot.references -= 1
+        if snapshot.references > 0:
+            return
+        del _snapshots[key]
+    with snapshot.lock:
+        snapshot.remove()
+
+
+def _get_scratch(size):
+    """
+    Return the staging directory of this process in the first scratch directory with room for size
+    bytes, the temporary directory when none has
+    """
+    temporary_directory = tempfile.gettempdir()
+    for scratch in STAGING_DIRECTORIES + [temporary_directory]:
+        if scratch != temporary_directory:
+            try:
+                if not os.access(scratch, os.W_OK) or shutil.disk_usage(scratch).free < size * STAGING_HEADROOM:
+                    continue
+            except OSError:
+                continue
+        with _snapshots_lock:
+            staging_dir = _scratch.get(scratch)
+            if staging_dir is None or not os.path.isdir(staging_dir):
+                staging_dir = _scratch[scratch] = tempfile.mkdtemp(prefix="osxripper_staging_", dir=scratch)
+                # Removed at exit of the driver or of the worker process, which atexit does not cover
+                multiprocessing.util.Finalize(None, shutil.rmtree, args=(staging_dir,), kwargs={"ignore_errors": True},
+                                              exitpriority=0)
+            return staging_dir
+
+
+def _copy_file(source, destination):
+    """
+    Copy a file, with os.copy_file_range where available so file systems able to share the blocks
+    copy on write do so, with shutil.copyfile otherwise
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+                while os.copy_file_range(source_file.fileno(), destination_file.fileno(), 1073741824):
+                    pass
+            return
+        except OSError:
+            pass  # e.g. across file systems on older kernels, copied below
+    shutil.copyfile(source, destination)
+
+
+def remove_staging():
+    """
+    Remove the staging directories of this process, staged copies still open are removed with them
+    """
+    with _snapshots_lock:
+        staging_dirs = list(_scratch.values())
+        _scratch.clear()
+        _snapshots.clear()
+        _staged.clear()
+    for staging_dir in staging_dirs:
+        shutil.rmtree(staging_dir, ignore_errors=True)
@@ -1,11 +1,18 @@
 """ Module for converting time formats """
 import datetime
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 COCOA_EPOCH = datetime.datetime(2001, 1, 1)
 UNIX_EPOCH = datetime.datetime(1970, 1, 1)
 GREGORIAN_1601 = datetime.datetime(1601, 1, 1)
 
+NUMPY_MIN_BATCH = 512  # batches smaller than this are converted without NumPy
+_MICROS_PER_UNIT = {"seconds": 1000000, "milliseconds": 1000, "microseconds": 1}
+
 
 def get_gregorian_seconds(delta_date):
     """
@@ -14,8 +21,8 @@ def get_gregorian_seconds(delta_date):
     if delta_date is not None:
         try:
             return GREGORIAN_1601 + datetime.timedelta(seconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -27,12 +34,19 @@ def get_gregorian_micros(delta_date):
     if delta_date is not None:
         try:
             return GREGORIAN_1601 + datetime.timedelta(microseconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
 
+def get_gregorian_micros_delta(date_time):
+    """
+    Get the microsecond delta of a date time, the inverse of get_gregorian_micros
+    """
+    return (date_time - GREGORIAN_1601) // datetime.timedelta(microseconds=1)
+
+
 def get_gregorian_millis(delta_date):
     """
     Get the date time with a millisecond delta
@@ -40,8 +54,8 @@ def get_gregorian_millis(delta_date):
     if delta_date is not None:
         try:
             return GREGORIAN_1601 + datetime.timedelta(milliseconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -53,8 +67,8 @@ def get_unix_seconds(delta_date):
     if delta_date is not None:
         try:
             return UNIX_EPOCH + datetime.timedelta(seconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -66,8 +80,8 @@ def get_unix_micros(delta_date):
     if delta_date is not None:
         try:
             return UNIX_EPOCH + datetime.timedelta(microseconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -79,8 +93,8 @@ def get_unix_millis(delta_date):
     if delta_date is not None:
         try:
             return UNIX_EPOCH + datetime.timedelta(milliseconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -92,8 +106,8 @@ def get_cocoa_millis(delta_date):
     if delta_date is not None:
         try:
             return COCOA_EPOCH + datetime.timedelta(milliseconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
 
@@ -105,7 +119,162 @@ def get_cocoa_seconds(delta_date):
     if delta_date is not None:
         try:
             return COCOA_EPOCH + datetime.timedelta(seconds=delta_date)
-        except OverflowError:
-            "[ERROR] unknown date value: {0}".format(delta_date)
+        except (OverflowError, TypeError, ValueError):
+            return "[ERROR] unknown date value: {0}".format(delta_date)
     else:
         return "[ERROR] Not a date value: None"
+
+
+def _format_values(values, epoch, unit):
+    """
+    Convert a sequence of deltas from epoch without NumPy and return str() of each date time.
+    Integer deltas are split into days and time of day so each day is only converted once.
+    """
+    micros_per_unit = _MICROS_PER_UNIT[unit]
+    min_day = (datetime.datetime.min - epoch).days
+    max_day = (datetime.datetime.max - epoch).days
+    days_cache = {}
+    results = []
+    append = results.append
+    for delta_date in values:
+        if delta_date is None:
+            append("[ERROR] Not a date value: None")
+        elif type(delta_date) is int:
+            day, micros = divmod(delta_date * micros_per_unit, 86400000000)
+            if not min_day <= day <= max_day:
+                append("[ERROR] unknown date value: {0}".format(delta_date))
+                continue
+            day_string = days_cache.get(day)
+            if day_string is None:
+                day_string = days_cache[day] = str((epoch + datetime.timedelta(days=day)).date())
+            seconds, micros = divmod(micros, 1000000)
+            minutes, seconds = divmod(seconds, 60)
+            hours, minutes = divmod(minutes, 60)
+            if micros:
+                append("%s %02d:%02d:%02d.%06d" % (day_string, hours, minutes, seconds, micros))
+            else:
+                append("%s %02d:%02d:%02d" % (day_string, hours, minutes, seconds))
+        else:
+            try:
+                append(str(epoch + datetime.timedelta(**{unit: delta_date})))
+            except (OverflowError, TypeError, ValueError):
+                append("[ERROR] unknown date value: {0}".format(delta_date))
+    return results
+
+
+def _format_values_numpy(values, epoch, unit):
+    """
+    Convert a sequence of deltas from epoch as one NumPy datetime64 array and return the same
+    strings as _format_values
+    """
+    micros_per_unit = _MICROS_PER_UNIT[unit]
+    limit = 2 ** 62 // micros_per_unit
+    is_int = numpy.array([type(delta_date) is int and -limit < delta_date < limit for delta_date in values],
+                         dtype=bool)
+    is_float = numpy.array([type(delta_date) is float for delta_date in values], dtype=bool)
+    if is_int.all():
+        int_deltas = numpy.array(values, dtype=numpy.int64)
+    else:
+        int_deltas = numpy.array([delta_date if valid else 0 for delta_date, valid in zip(values, is_int)],
+                                 dtype=numpy.int64)
+    if is_float.all():
+        float_deltas = numpy.array(values, dtype=numpy.float64)
+    else:
+        float_deltas = numpy.array([delta_date if valid else 0.0 for delta_date, valid in zip(values, is_float)],
+                                   dtype=numpy.float64)
+    # Scale the whole and fractional parts apart and round what is left of a microsecond half to even
+    # on the total, the steps datetime.timedelta takes
+    fraction, whole = numpy.modf(float_deltas)
+    is_float &= numpy.isfinite(float_deltas) & (numpy.abs(whole) < limit)
+    whole = numpy.where(is_float, whole, 0).astype(numpy.int64)
+    leftover, fraction = numpy.modf(numpy.where(is_float, fraction, 0) * micros_per_unit)
+    float_micros = whole * micros_per_unit + fraction.astype(numpy.int64)
+    round_away = (numpy.abs(leftover) > 0.5) | ((numpy.abs(leftover) == 0.5) & (float_micros % 2 == 1))
+    float_micros += numpy.where(round_away, numpy.sign(leftover), 0).astype(numpy.int64)
+    micros = numpy.where(is_float, float_micros, int_deltas * micros_per_unit)
+
+    unix_epoch = datetime.datetime(1970, 1, 1)
+    one_micro = datetime.timedelta(microseconds=1)
+    micros += (epoch - unix_epoch) // one_micro
+    in_range = (is_int | is_float) & (micros >= (datetime.datetime.min - unix_epoch) // one_micro) & \
+        (micros <= (datetime.datetime.max - unix_epoch) // one_micro)
+    micros = numpy.where(in_range, micros, 0)
+    strings = numpy.datetime_as_string(micros.astype("datetime64[us]"), unit="us")
+    # Swap the ISO "T" separator for a space in place and, like str(datetime), leave out zero microseconds
+    strings.view(numpy.uint32).reshape(len(strings), -1)[:, 10] = ord(" ")
+    results = numpy.where(micros % 1000000 == 0, strings.astype("U19"), strings).tolist()
+    for index in numpy.flatnonzero(~in_range).tolist():
+        results[index] = _format_values([values[index]], epoch, unit)[0]
+    return results
+
+
+def format_batch(values, epoch, unit, use_numpy=None):
+    """
+    Convert a sequence of deltas from epoch, unit is seconds, milliseconds or microseconds, and return
+    a list of strings formatted like str() of the date time. Values that cannot be converted give an
+    [ERROR] string. NumPy is used for large batches when it is installed, use_numpy forces the choice.
+    """
+    values = list(values)
+    if not values:
+        return []
+    if use_numpy is None:
+        use_numpy = numpy is not None and len(values) >= NUMPY_MIN_BATCH
+    if use_numpy and numpy is not None:
+        return _format_values_numpy(values, epoch, unit)
+    return _format_values(values, epoch, unit)
+
+
+def get_gregorian_seconds_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of second deltas
+    """
+    return format_batch(delta_dates, GREGORIAN_1601, "seconds", use_numpy)
+
+
+def get_gregorian_micros_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of microsecond deltas
+    """
+    return format_batch(delta_dates, GREGORIAN_1601, "microseconds", use_numpy)
+
+
+def get_gregorian_millis_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of millisecond deltas
+    """
+    return format_batch(delta_dates, GREGORIAN_1601, "milliseconds", use_numpy)
+
+
+def get_unix_seconds_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of second deltas
+    """
+    return format_batch(delta_dates, UNIX_EPOCH, "seconds", use_numpy)
+
+
+def get_unix_micros_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of microsecond deltas
+    """
+    return format_batch(delta_dates, UNIX_EPOCH, "microseconds", use_numpy)
+
+
+def get_unix_millis_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of millisecond deltas
+    """
+    return format_batch(delta_dates, UNIX_EPOCH, "milliseconds", use_numpy)
+
+
+def get_cocoa_millis_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of millisecond deltas
+    """
+    return format_batch(delta_dates, COCOA_EPOCH, "milliseconds", use_numpy)
+
+
+def get_cocoa_seconds_batch(delta_dates, use_numpy=None):
+    """
+    Get the date time strings of a sequence of second deltas
+    """
+    return format_batch(delta_dates, COCOA_EPOCH, "seconds", use_numpy)
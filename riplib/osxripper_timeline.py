@@ -0,0 +1,181 @@
+""" Module to collect timestamped events from plugins and merge them into a single sorted timeline """
+import csv
+import datetime
+import heapq
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+TIMELINE_FILE = "Timeline.csv"
+CHUNK_DIRECTORY = "_osxripper_timeline"
+CHUNK_SIZE = 100000  # events held in memory by a writer before a sorted chunk is spilled to disk
+MERGE_FAN_IN = 64  # chunk files opened at once while merging
+HEADERS = ["Timestamp (UTC)", "Plugin", "User", "Event Type", "Description"]
+# Date time strings as returned by the batch conversions of riplib.osxripper_time
+TIMESTAMP_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}(\.\d{6})?$")
+
+
+class TimelineWriter():
+    """
+    Collect the events of a plugin and spill them to disk as sorted chunk files, the chunks of all
+    plugins are merged by write_timeline. Events are only kept when the writer has a chunk directory.
+    Timestamps are sorted as UTC, so times in an unknown local time zone, e.g. those of log entries,
+    must not be added.
+    """
+    def __init__(self, chunk_dir, plugin_name, chunk_size=CHUNK_SIZE):
+        """
+        Initialise the class.
+        """
+        self._chunk_dir = chunk_dir
+        self._plugin_name = plugin_name
+        self._chunk_size = chunk_size
+        self._events = []
+        self._event_count = 0
+
+    @property
+    def get_event_count(self):
+        """
+        Return the number of events collected
+        """
+        return self._event_count
+
+    @property
+    def is_enabled(self):
+        """
+        Return True if events are being collected
+        """
+        return self._chunk_dir is not None
+
+    def add_event(self, timestamp, user, event_type, description):
+        """
+        Add an event, timestamp is a UTC datetime or date time string from riplib.osxripper_time, a
+        datetime with a time zone is converted to UTC. Other values, e.g. conversion error strings,
+        are dropped.
+        """
+        if self._chunk_dir is None:
+            return
+        if isinstance(timestamp, datetime.datetime):
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(datetime.timezone.utc)
+            timestamp = format_timestamp(timestamp)
+        elif isinstance(timestamp, str) and TIMESTAMP_PATTERN.match(timestamp):
+            if len(timestamp) == 19:
+                timestamp += ".000000"
+        else:
+            return
+        self._events.append((timestamp, self._plugin_name, user or "", event_type,
+                             "" if description is None else str(description)))
+        self._event_count += 1
+        if len(self._events) >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Sort the collected events and write them to a new chunk file
+        """
+        if not self._events:
+            return
+        self._events.sort()
+        file_descriptor, chunk_path = tempfile.mkstemp(suffix=".csv", dir=self._chunk_dir)
+        with open(file_descriptor, "w", encoding="utf-8", newline="") as chunk_file:
+            csv.writer(chunk_file).writerows(self._events)
+        self._events = []
+
+    def close(self):
+        """
+        Spill any remaining events
+        """
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def format_timestamp(timestamp):
+    """
+    Return a fixed width timestamp string that sorts in time order
+    """
+    return "{0:04d}-{1:02d}-{2:02d} {3:02d}:{4:02d}:{5:02d}.{6:06d}".format(
+        timestamp.year, timestamp.month, timestamp.day,
+        timestamp.hour, timestamp.minute, timestamp.second, timestamp.microsecond)
+
+
+def get_chunk_directory(output_dir):
+    """
+    Return the directory holding the chunk files of a run's timeline
+    """
+    return os.path.join(output_dir, CHUNK_DIRECTORY)
+
+
+def start_timeline(output_dir):
+    """
+    Create an empty chunk directory for a run and return its path
+    """
+    chunk_dir = get_chunk_directory(output_dir)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    os.makedirs(chunk_dir)
+    return chunk_dir
+
+
+def _read_chunk(chunk_file):
+    """
+    Generate the events of a chunk file as tuples
+    """
+    for row in csv.reader(chunk_file):
+        yield tuple(row)
+
+
+def _merge_chunks(chunk_paths, output_file):
+    """
+    Merge sorted chunk files into output_file and return the number of events written
+    """
+    chunk_files = [open(chunk_path, "r", encoding="utf-8", newline="") for chunk_path in chunk_paths]
+    try:
+        writer = csv.writer(output_file)
+        event_count = 0
+        for event in heapq.merge(*[_read_chunk(chunk_file) for chunk_file in chunk_files]):
+            writer.writerow(event)
+            event_count += 1
+        return event_count
+    finally:
+        for chunk_file in chunk_files:
+            chunk_file.close()
+
+
+def write_timeline(output_dir):
+    """
+    Merge the chunk files of a run into Timeline.csv in the output directory, at most MERGE_FAN_IN
+    chunks are open at once so memory use does not depend on the number of events
+    """
+    chunk_dir = get_chunk_directory(output_dir)
+    if not os.path.isdir(chunk_dir):
+        return 0
+    chunk_paths = sorted(os.path.join(chunk_dir, name) for name in os.listdir(chunk_dir))
+    while len(chunk_paths) > MERGE_FAN_IN:
+        merged_paths = []
+        for index in range(0, len(chunk_paths), MERGE_FAN_IN):
+            file_descriptor, merged_path = tempfile.mkstemp(suffix=".csv", dir=chunk_dir)
+            with open(file_descriptor, "w", encoding="utf-8", newline="") as merged_file:
+                _merge_chunks(chunk_paths[index:index + MERGE_FAN_IN], merged_file)
+            for chunk_path in chunk_paths[index:index + MERGE_FAN_IN]:
+                os.remove(chunk_path)
+            merged_paths.append(merged_path)
+        chunk_paths = merged_paths
+
+    timeline_path = os.path.join(output_dir, TIMELINE_FILE)
+    with open(timeline_path, "w", encoding="utf-8", newline="") as timeline_file:
+        csv.writer(timeline_file).writerow(HEADERS)
+        event_count = _merge_chunks(chunk_paths, timeline_file)
+    shutil.rmtree(chunk_dir, ignore_errors=True)
+    print("[INFO] Timeline: {0} events written to {1}.".format(event_count, timeline_path))
+    logging.info("Timeline: %d events written to %s.", event_count, timeline_path)
+    return event_count
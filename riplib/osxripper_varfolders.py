@@ -0,0 +1,147 @@
+""" Module to index the well known cache artifacts below /private/var/folders in a single parallel scan """
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from riplib import osxripper_profile
+from riplib import osxripper_runcache
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+SCAN_WORKERS = 4  # top level buckets of var/folders scanned at the same time
+
+QUICKLOOK_THUMBNAILS = "quicklook_thumbnails"
+CACHE_ENCRYPTED = "cache_encrypted"
+
+# Artifact -> (text the directory path must contain or None, file name)
+ARTIFACTS = {
+    QUICKLOOK_THUMBNAILS: ("com.apple.QuickLook.thumbnailcache", "index.sqlite"),
+    CACHE_ENCRYPTED: (None, "cache_encryptedA.db")
+}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class VarFoldersIndex():
+    """
+    Walk <input>/private/var/folders once, each top level bucket in its own thread with os.scandir,
+    and keep the paths of the files named in ARTIFACTS in the order os.walk would give them
+    """
+    def __init__(self, input_dir):
+        """
+        Initialise the class.
+        """
+        self._start_folder = os.path.join(input_dir, "private", "var", "folders")
+        self._files = None  # file name -> [path, ...]
+        self._directories = None
+        self._lock = threading.Lock()
+
+    @property
+    def get_start_folder(self):
+        """
+        Return the var/folders directory indexed
+        """
+        return self._start_folder
+
+    def find(self, artifact):
+        """
+        Return the paths of an artifact of ARTIFACTS, building the index on first use
+        """
+        marker, file_name = ARTIFACTS[artifact]
+        self._build()
+        # The listings behind the index are sources of every plugin querying it
+        for directory in self._directories:
+            osxripper_runcache.track(osxripper_runcache.KIND_DIRECTORY, directory)
+        return [path for path in self._files.get(file_name, [])
+                if marker is None or marker in os.path.dirname(path)]
+
+    def _build(self):
+        """
+        Scan var/folders unless already done, plugins asking at the same time wait for one scan
+        """
+        with self._lock:
+            if self._files is not None:
+                return
+            file_names = set(file_name for _, file_name in ARTIFACTS.values())
+            top_files, buckets = _scan(self._start_folder, file_names)
+            directories = [self._start_folder]
+            results = []
+            if buckets:
+                scan_bucket = osxripper_profile.bind(_scan_tree)
+                with ThreadPoolExecutor(max_workers=min(SCAN_WORKERS, len(buckets))) as executor:
+                    results = list(executor.map(lambda bucket: scan_bucket(bucket, file_names), buckets))
+            files = {}
+            for path in top_files:
+                files.setdefault(os.path.basename(path), []).append(path)
+            for bucket_files, bucket_directories in results:
+                for path in bucket_files:
+                    files.setdefault(os.path.basename(path), []).append(path)
+                directories.extend(bucket_directories)
+            self._directories = directories
+            self._files = files
+
+
+def _scan(directory, file_names):
+    """
+    Return the paths of the wanted files in a directory and of its subdirectories to descend into,
+    symlinked directories are not followed. A directory that cannot be read gives neither.
+    """
+    found, subdirectories = [], []
+    try:
+        with os.scandir(directory) as iterator:
+            for dir_entry in iterator:
+                try:
+                    is_dir = dir_entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not dir_entry.is_symlink():
+                        subdirectories.append(dir_entry.path)
+                elif dir_entry.name in file_names:
+                    found.append(dir_entry.path)
+    except OSError:
+        pass
+    return found, subdirectories
+
+
+def _scan_tree(top, file_names):
+    """
+    Return the paths of the wanted files below top, top down, and the directories scanned
+    """
+    found, directories = [], []
+    pending = [top]
+    while pending:
+        directory = pending.pop()
+        directories.append(directory)
+        files, subdirectories = _scan(directory, file_names)
+        found.extend(files)
+        pending.extend(reversed(subdirectories))
+    return found, directories
+
+
+def get_index(input_dir):
+    """
+    Return the shared VarFoldersIndex of an input directory, creating it on first use
+    """
+    key = os.path.normpath(os.path.abspath(input_dir))
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = VarFoldersIndex(input_dir)
+        return _indexes[key]
+
+
+def find(input_dir, artifact):
+    """
+    Return the paths of an artifact of ARTIFACTS below <input_dir>/private/var/folders
+    """
+    return get_index(input_dir).find(artifact)
+
+
+def clear():
+    """
+    Discard all cached indexes
+    """
+    with _indexes_lock:
+        _indexes.clear()
@@ -1,10 +1,23 @@
 """ Module for base Plugin classes """
 # import pprint
+import concurrent.futures
+import logging
+import os
+from riplib import osxripper_inventory
+from riplib import osxripper_logs
+from riplib import osxripper_output
+from riplib import osxripper_profile
+from riplib import osxripper_records
+from riplib import osxripper_runcache
+from riplib import osxripper_timeline
 
 __author__ = 'osxripper'
 __version__ = '0.2'
 __license__ = 'GPLv3'
 
+USER_WORKERS = 4  # user accounts a Users* plugin parses at the same time
+SECTION_WORKERS = 4  # sections of an output, e.g. database tables, a plugin produces at the same time
+
 
 class PluginDescription():
     """
@@ -18,6 +31,7 @@ class PluginDescription():
         self._description = "Base class for plugins"
         self._type = "text"  # use [text|plist|bplist|sqlite|dir_list|mixed]
         self._os_version = "yosemite"
+        self._supported_os_versions = None  # OSX versions parsed, None for all or as read from the version checks
 
     def __call__(self):
         return self
@@ -50,6 +64,13 @@ class PluginDescription():
         """
         return self._os_version
 
+    @property
+    def get_supported_os_versions(self):
+        """
+        Return the OSX versions the plugin declares it parses data for, None if not declared
+        """
+        return self._supported_os_versions
+
     def set_name(self, plugin_name):
         """
         Set the plugin name
@@ -74,6 +95,13 @@ class PluginDescription():
         """
         self._os_version = osx_version
 
+    def set_supported_os_versions(self, osx_versions):
+        """
+        Declare the OSX versions the plugin parses data for, the drivers skip the plugin for other
+        versions without importing it. Call with a list literal in __init__ so the manifest can read it.
+        """
+        self._supported_os_versions = list(osx_versions)
+
 
 class Plugin(PluginDescription):
     """
@@ -89,6 +117,11 @@ class Plugin(PluginDescription):
         self._output_dir = None
         self._output_file = None
         self._data_file = None
+        self._output_format = osxripper_records.FORMAT_TEXT
+        self._timeline_dir = None
+        self._user_workers = USER_WORKERS
+        self._since = None
+        self._until = None
 
     # def __call__(self):
     #     return self
@@ -121,11 +154,55 @@ class Plugin(PluginDescription):
         """
         return self._data_file
 
+    @property
+    def get_output_format(self):
+        """
+        Return the output format of the plugin's records
+        """
+        return self._output_format
+
+    @property
+    def get_timeline_dir(self):
+        """
+        Return the directory timeline events are spilled to, None when no timeline is built
+        """
+        return self._timeline_dir
+
+    @property
+    def get_user_workers(self):
+        """
+        Return the number of user accounts parsed at the same time by map_users
+        """
+        return self._user_workers
+
+    @property
+    def get_since(self):
+        """
+        Return the time log entries and Chrome visits are kept from, None for no limit
+        """
+        return self._since
+
+    @property
+    def get_until(self):
+        """
+        Return the time log entries and Chrome visits are kept until, None for no limit
+        """
+        return self._until
+
+    @property
+    def get_inventory(self):
+        """
+        Return the shared file system inventory of the input directory
+        """
+        return osxripper_inventory.get_inventory(self._input_dir)
+
     def set_input_directory(self, file):
         """
-        Set the input directory for the plugin
+        Set the input directory for the plugin and register it with the shared inventory
         """
         self._input_dir = file
+        if file is not None:
+            osxripper_inventory.get_inventory(file)
 
     def set_output_directory(self, file):
         """
@@ -145,6 +222,136 @@ class Plugin(PluginDescription):
         """
         self._data_file = data_file
 
+    def set_output_format(self, output_format):
+        """
+        Set the output format of the plugin's records [text|jsonl|csv]
+        """
+        self._output_format = output_format
+
+    def set_timeline_directory(self, timeline_dir):
+        """
+        Set the directory timeline events are spilled to, None disables the timeline
+        """
+        self._timeline_dir = timeline_dir
+
+    def set_user_workers(self, user_workers):
+        """
+        Set the number of user accounts parsed at the same time by map_users, 1 parses them in turn
+        """
+        self._user_workers = max(1, int(user_workers))
+
+    def set_since(self, since):
+        """
+        Set the time log entries and Chrome visits are kept from, a datetime or None
+        """
+        self._since = since
+
+    def set_until(self, until):
+        """
+        Set the time log entries and Chrome visits are kept until, exclusive, a datetime or None
+        """
+        self._until = until
+
+    def map_users(self, function, usernames):
+        """
+        Call function(username) for each user account over a pool of at most get_user_workers threads
+        and return the results in the order of usernames. A failing user does not stop the others,
+        the first error is raised once all users are done.
+        """
+        return self._map(function, usernames, "user")
+
+    def map_profiles(self, function, profiles):
+        """
+        Call function(profile) for each riplib.osxripper_chrome.ChromeProfile as map_users does for users,
+        the profiles of all users are parsed over the same pool
+        """
+        return self._map(function, profiles, "profile")
+
+    def _map(self, function, items, item_kind):
+        """
+        Call function(item) for each item over a pool of at most get_user_workers threads, see map_users
+        """
+        items = list(items)
+        if self._user_workers <= 1 or len(items) <= 1:
+            return [function(item) for item in items]
+        results = []
+        first_error = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(self._user_workers, len(items))) as executor:
+            function = osxripper_runcache.bind(osxripper_profile.bind(function))
+            futures = [executor.submit(function, item) for item in items]
+            for item, future in zip(items, futures):
+                try:
+                    results.append(future.result())
+                except Exception as error:
+                    logging.error("%s failed for %s %s: %s: %s", self._name, item_kind, item, error.__class__.__name__, error)
+                    print("[ERROR] {0} failed for {1} {2}: {3}: {4}".format(self._name, item_kind, item, error.__class__.__name__, error))
+                    results.append(None)
+                    if first_error is None:
+                        first_error = error
+        if first_error is not None:
+            raise first_error
+        return results
+
+    def map_sections(self, writer, functions):
+        """
+        Call each function(writer) and write their output to writer in the order of functions. The first
+        function writes to writer on the calling thread while the others run over a pool of at most
+        SECTION_WORKERS threads, each writing to a RecordBuffer of its own that is written out after it.
+        The first error is raised once all functions are done.
+        """
+        functions = list(functions)
+        if SECTION_WORKERS <= 1 or len(functions) <= 1:
+            for function in functions:
+                function(writer)
+            return
+        buffers = [osxripper_records.RecordBuffer() for _ in functions[1:]]
+        first_error = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(SECTION_WORKERS, len(buffers))) as executor:
+            fill = osxripper_runcache.bind(osxripper_profile.bind(_fill_buffer))
+            futures = [executor.submit(fill, function, record_buffer) for function, record_buffer in zip(functions[1:], buffers)]
+            try:
+                functions[0](writer)
+            except Exception as error:
+                first_error = error
+            for record_buffer, future in zip(buffers, futures):
+                writer.write_buffer(record_buffer)
+                try:
+                    future.result()
+                except Exception as error:
+                    if first_error is None:
+                        first_error = error
+        if first_error is not None:
+            raise first_error
+
+    def open_output_section(self, output_file):
+        """
+        Return an OutputSection for output_file in the output directory, the text written to it is
+        appended to the file in one write when the section is closed
+        """
+        return osxripper_output.open_section(os.path.join(self._output_dir, output_file))
+
+    def open_record_writer(self, output_file, context=None, shared=False):
+        """
+        Return a RecordWriter for output_file in the output directory using the plugin's output format,
+        shared is True when other plugins write to the same file
+        """
+        return osxripper_records.open_writer(self._output_format, os.path.join(self._output_dir, output_file),
+                                             self._name, context, self.open_timeline_writer(), shared)
+
+    def open_log_reader(self, log_path):
+        """
+        Return a LogReader keeping the entries of log_path between get_since and get_until, entries are
+        only parsed into records when the output format or the limits need them
+        """
+        return osxripper_logs.LogReader(self._since, self._until, osxripper_logs.get_reference_time(log_path),
+                                        self._output_format != osxripper_records.FORMAT_TEXT)
+
+    def open_timeline_writer(self):
+        """
+        Return a TimelineWriter for the plugin's events, events are dropped when no timeline is built
+        """
+        return osxripper_timeline.TimelineWriter(self._timeline_dir, self._name)
+
     def parse(self):
         """
         Public function called to parse the data file set in __init__, override as necessary
@@ -169,3 +376,11 @@ class Plugin(PluginDescription):
         Return a string representation of the plugin
         """
         return "Plugin(%s)" % str(self)
+
+
+def _fill_buffer(function, record_buffer):
+    """
+    Call function(record_buffer) and close the buffer, run by the map_sections workers
+    """
+    with record_buffer:
+        return function(record_buffer)
@@ -0,0 +1 @@
+""" Tests of the riplib modules, run with python -m unittest or pytest from the repository root """
@@ -0,0 +1,92 @@
+""" Tests of the batch manifest, image log routing and the warm worker pool """
+import functools
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+from riplib import osxripper_batch
+from riplib import osxripper_scheduler
+from tests.test_scheduler import _FilePlugin
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class BatchManifestTest(unittest.TestCase):
+    """
+    Test read_batch_manifest
+    """
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._manifest_path = os.path.join(self._directory, "batch.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _read(self, text):
+        with open(self._manifest_path, "w", encoding="utf-8", newline="") as manifest_file:
+            manifest_file.write(text)
+        return [(image.index, image.input_dir, image.output_dir)
+                for image in osxripper_batch.read_batch_manifest(self._manifest_path)]
+
+    def test_tab_and_comma_separated(self):
+        self.assertEqual(self._read("# input\toutput\r\n"
+                                    "/images/one, with comma\t/output/one\r\n"
+                                    "\r\n"
+                                    "/images/two,/output/two\n"
+                                    '"/images/three, quoted", /output/three\n'),
+                         [(1, "/images/one, with comma", "/output/one"),
+                          (2, "/images/two", "/output/two"),
+                          (3, "/images/three, quoted", "/output/three")])
+
+    def test_missing_output_directory(self):
+        with self.assertRaises(ValueError) as context:
+            self._read("/images/one\t/output/one\n/images/two\n")
+        self.assertIn("line 2", str(context.exception))
+
+
+class ImageLogTest(unittest.TestCase):
+    """
+    Test log records are stamped with the current image and filtered per image
+    """
+    def test_filters(self):
+        records = []
+        for index in [1, 2, None]:
+            osxripper_batch.set_current_image(index)
+            record = logging.LogRecord("osxripper", logging.INFO, __file__, 1, "image %s", (index,), None)
+            osxripper_batch.ImageFilter().filter(record)
+            records.append(record)
+        osxripper_batch.set_current_image(None)
+        self.assertEqual([getattr(record, osxripper_batch.IMAGE_ATTRIBUTE) for record in records], [1, 2, None])
+        self.assertEqual([osxripper_batch.ImageLogFilter(2).filter(record) for record in records],
+                         [False, True, False])
+
+
+class WarmPoolTest(unittest.TestCase):
+    """
+    Test the plugins of several images run on one warm pool
+    """
+    def test_images_share_the_pool(self):
+        output_dirs = [tempfile.mkdtemp() for _ in range(2)]
+        try:
+            with osxripper_batch.WarmPool(2, []) as pool:
+                for index, output_dir in enumerate(output_dirs, 1):
+                    task = functools.partial(osxripper_batch.run_image_plugin, index)
+                    with osxripper_scheduler.PluginScheduler(max_workers=pool.get_max_workers,
+                                                             executor=pool.get_executor, task=task) as scheduler:
+                        results = scheduler.run([_FilePlugin(output_dir)])
+                    self.assertEqual(results[0].status, osxripper_scheduler.STATUS_OK)
+                worker_pids = set()
+                for output_dir in output_dirs:
+                    with open(os.path.join(output_dir, "File_Plugin.txt")) as output_file:
+                        worker_pids.add(int(output_file.read()))
+                self.assertNotIn(os.getpid(), worker_pids)
+        finally:
+            for output_dir in output_dirs:
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
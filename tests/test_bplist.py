@@ -0,0 +1,105 @@
+""" Tests of the memory mapped binary plist decoder against plistlib """
+import datetime
+import io
+import os
+import plistlib
+import tempfile
+import unittest
+from riplib import ccl_bplist
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+PLIST = {
+    "integers": [0, 1, 255, 256, 32767, 2 ** 31 - 1, 2 ** 40, -1, -2 ** 63, 2 ** 63 - 1],
+    "floats": [0.5, -1.25, 1e300],
+    "strings": ["", "ascii", "café", "中文" * 20],
+    "data": [b"", b"\x00\x01\x02" * 100],
+    "flags": [True, False],
+    "date": datetime.datetime(2019, 10, 7, 12, 30, 15),
+    "uid": plistlib.UID(70000),
+    "nested": {"SessionWindows": [{"TabStates": [{"TabURL": "https://example.com/{0}".format(index),
+                                                  "TabTitle": "Tab {0}".format(index)}
+                                                 for index in range(40)]}]},
+    "shared": ["same", "same", "same"]
+}
+
+
+def _normalise(value):
+    """
+    Return value with mappings, sequences and UIDs turned into plain dicts, lists and tuples
+    """
+    if isinstance(value, (ccl_bplist.BplistUID, plistlib.UID)):
+        return "UID", value.data if isinstance(value, plistlib.UID) else value.value
+    if isinstance(value, (str, bytes)):
+        return value
+    if hasattr(value, "keys"):
+        return {key: _normalise(value[key]) for key in value}
+    if hasattr(value, "__len__"):
+        return [_normalise(item) for item in value]
+    return value
+
+
+class BplistTest(unittest.TestCase):
+    """
+    Test load and load_lazy decode what plistlib wrote
+    """
+    def setUp(self):
+        self.data = plistlib.dumps(PLIST, fmt=plistlib.FMT_BINARY)
+        handle, self.path = tempfile.mkstemp(suffix=".plist")
+        with os.fdopen(handle, "wb") as plist_file:
+            plist_file.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_load_file(self):
+        with open(self.path, "rb") as plist_file:
+            self.assertEqual(_normalise(ccl_bplist.load(plist_file)), _normalise(PLIST))
+
+    def test_load_bytes_io(self):
+        self.assertEqual(_normalise(ccl_bplist.load(io.BytesIO(self.data))), _normalise(PLIST))
+
+    def test_load_lazy(self):
+        with open(self.path, "rb") as plist_file:
+            plist = ccl_bplist.load_lazy(plist_file)
+        root = plist.root
+        self.assertIsInstance(root, ccl_bplist.LazyBplistDict)
+        self.assertIsInstance(root["nested"]["SessionWindows"], ccl_bplist.LazyBplistList)
+        self.assertEqual(root["nested"]["SessionWindows"][0]["TabStates"][39]["TabURL"], "https://example.com/39")
+        self.assertIn("date", root)
+        self.assertNotIn("missing", root)
+        self.assertEqual(len(root), len(PLIST))
+        self.assertEqual(_normalise(root), _normalise(PLIST))
+        plist.close()
+
+    def test_load_lazy_closes_the_mapping(self):
+        with open(self.path, "rb") as plist_file:
+            with ccl_bplist.load_lazy(plist_file) as root:
+                self.assertEqual(root["nested"]["SessionWindows"][0]["TabStates"][0]["TabURL"], "https://example.com/0")
+        with self.assertRaises(ValueError):
+            root["date"]
+
+    def test_decoded_collections_are_copies(self):
+        shared = ["shared"]
+        # plistlib writes a collection referenced twice once
+        data = plistlib.dumps({"first": shared, "second": shared}, fmt=plistlib.FMT_BINARY)
+        decoded = ccl_bplist.load(io.BytesIO(data))
+        decoded["first"].append("changed")
+        self.assertEqual(decoded["second"], ["shared"])
+
+    def test_bad_header(self):
+        with self.assertRaises(ccl_bplist.BplistError):
+            ccl_bplist.load(io.BytesIO(b"bplist01" + self.data[8:]))
+
+    def test_bad_reference(self):
+        data = bytearray(self.data)
+        # Point the top level object past the end of the object table
+        data[-16:-8] = (2 ** 32).to_bytes(8, "big")
+        with self.assertRaises(ccl_bplist.BplistError):
+            ccl_bplist.load(io.BytesIO(bytes(data)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+""" Tests of the Chromium profile locator and the attached profile databases """
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from plugins.osx.UsersChromeHistory import UsersChromeHistory
+from riplib import osxripper_chrome
+from riplib import osxripper_output
+from riplib import osxripper_sqlite
+from riplib import osxripper_time
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class ProfileLocatorTest(unittest.TestCase):
+    """
+    Test the profiles of each browser are found from Local State and by name
+    """
+    def setUp(self):
+        self._input_dir = tempfile.mkdtemp()
+        support_path = os.path.join(self._input_dir, "Users", "alice", "Library", "Application Support")
+        chrome_path = os.path.join(support_path, "Google", "Chrome")
+        for profile_dir in ["Default", "Profile 10", "Profile 2", "Work", "System Profile", "Crashpad"]:
+            os.makedirs(os.path.join(chrome_path, profile_dir))
+        with open(os.path.join(chrome_path, "Local State"), "w", encoding="utf-8") as local_state_file:
+            json.dump({"profile": {"info_cache": {"Default": {"name": "Person 1"}, "Work": {"name": "Work"}}}},
+                      local_state_file)
+        os.makedirs(os.path.join(support_path, "BraveSoftware", "Brave-Browser", "Default"))
+        opera_path = os.path.join(support_path, "com.operasoftware.Opera")
+        os.makedirs(opera_path)
+        open(os.path.join(opera_path, "Preferences"), "w").close()
+        os.makedirs(os.path.join(self._input_dir, "Users", "bob", "Library"))
+        os.makedirs(os.path.join(self._input_dir, "Users", "Shared", "Library", "Application Support",
+                                 "Google", "Chrome", "Default"))
+        osxripper_chrome.clear()
+
+    def tearDown(self):
+        osxripper_chrome.clear()
+        shutil.rmtree(self._input_dir, ignore_errors=True)
+
+    def test_find_profiles(self):
+        profiles = osxripper_chrome.find_profiles(self._input_dir, "alice")
+        self.assertEqual([(profile.get_browser, profile.get_profile_dir, profile.get_name) for profile in profiles],
+                         [("Chrome", "Default", "Person 1"), ("Chrome", "Profile 2", None),
+                          ("Chrome", "Profile 10", None), ("Chrome", "Work", "Work"),
+                          ("Brave", "Default", None), ("Opera", "Default", None)])
+        self.assertTrue(profiles[0].is_default)
+        self.assertFalse(profiles[4].is_default)
+        self.assertEqual(profiles[5].get_path, os.path.join(self._input_dir, "Users", "alice", "Library",
+                                                            "Application Support", "com.operasoftware.Opera"))
+
+    def test_output_files(self):
+        profiles = osxripper_chrome.find_profiles(self._input_dir, "alice")
+        self.assertEqual([profile.get_output_file("History") for profile in profiles[:5]],
+                         ["Users_alice_Chrome_History.txt", "Users_alice_Chrome_Profile_2_History.txt",
+                          "Users_alice_Chrome_Profile_10_History.txt", "Users_alice_Chrome_Work_History.txt",
+                          "Users_alice_Brave_Default_History.txt"])
+        self.assertEqual(profiles[1].get_context, {"User": "alice", "Browser": "Chrome", "Profile": "Profile 2"})
+
+    def test_find_all_profiles(self):
+        profiles = osxripper_chrome.find_all_profiles(self._input_dir)
+        self.assertEqual({profile.get_username for profile in profiles}, {"alice"})
+        self.assertEqual(len(profiles), 6)
+
+    def test_profiles_are_looked_up_once(self):
+        first = osxripper_chrome.find_profiles(self._input_dir, "alice")
+        os.makedirs(os.path.join(self._input_dir, "Users", "alice", "Library", "Application Support", "Vivaldi",
+                                 "Default"))
+        self.assertEqual(len(osxripper_chrome.find_profiles(self._input_dir, "alice")), len(first))
+        osxripper_chrome.clear()
+        self.assertEqual(len(osxripper_chrome.find_profiles(self._input_dir, "alice")), len(first) + 1)
+
+    def test_unreadable_local_state(self):
+        local_state_path = os.path.join(self._input_dir, "Users", "alice", "Library", "Application Support",
+                                        "Google", "Chrome", "Local State")
+        with open(local_state_path, "w", encoding="utf-8") as local_state_file:
+            local_state_file.write("{not json")
+        profiles = osxripper_chrome.find_profiles(self._input_dir, "alice")
+        self.assertEqual([profile.get_profile_dir for profile in profiles if profile.get_browser == "Chrome"],
+                         ["Default", "Profile 2", "Profile 10"])
+
+
+class ProfileDatabaseTest(unittest.TestCase):
+    """
+    Test the databases of a profile are attached to one shared connection
+    """
+    def setUp(self):
+        self._profile_path = tempfile.mkdtemp()
+        self._profile = osxripper_chrome.ChromeProfile("alice", "Chrome", "Default", self._profile_path)
+        connection = sqlite3.connect(os.path.join(self._profile_path, "History"))
+        connection.execute("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT, title TEXT)")
+        connection.execute("INSERT INTO urls (url, title) VALUES ('https://a/', 'A')")
+        connection.commit()
+        connection.close()
+        connection = sqlite3.connect(os.path.join(self._profile_path, "Favicons"))
+        connection.execute("CREATE TABLE icon_mapping (page_url TEXT, icon_id INTEGER)")
+        connection.execute("INSERT INTO icon_mapping VALUES ('https://a/', 3)")
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        osxripper_sqlite.close_all()
+        shutil.rmtree(self._profile_path, ignore_errors=True)
+
+    def test_existing_databases_are_attached(self):
+        with osxripper_chrome.ProfileDatabase(self._profile) as database:
+            self.assertEqual(database.get_attached, ["history", "favicons"])
+            self.assertTrue(database.has_columns("history", "urls", ["url", "title"]))
+            self.assertFalse(database.has_columns("history", "urls", ["hidden"]))
+            self.assertEqual(database.get_columns("cookies", "cookies"), [])
+            rows = database.execute("SELECT u.title,im.icon_id FROM history.urls u "
+                                    "JOIN favicons.icon_mapping im ON im.page_url = u.url").fetchall()
+            self.assertEqual([tuple(row) for row in rows], [("A", 3)])
+
+    def test_plugins_share_the_connection(self):
+        with osxripper_chrome.ProfileDatabase(self._profile) as first:
+            with osxripper_chrome.ProfileDatabase(self._profile) as second:
+                self.assertIs(first.get_connection, second.get_connection)
+        self.assertIsNone(first.get_connection)
+
+    def test_get_transition(self):
+        self.assertIsNone(osxripper_chrome.get_transition(None))
+        self.assertEqual(osxripper_chrome.get_transition(0), "LINK")
+        self.assertEqual(osxripper_chrome.get_transition(0x30000001), "TYPED CHAIN_START CHAIN_END")
+        self.assertEqual(osxripper_chrome.get_transition(0x80000000 | 42), "42 SERVER_REDIRECT")
+
+
+class HistoryVisitsTest(unittest.TestCase):
+    """
+    Test the Visits section of UsersChromeHistory
+    """
+    def setUp(self):
+        self._input_dir = tempfile.mkdtemp()
+        self._output_dir = tempfile.mkdtemp()
+        self._profile_path = os.path.join(self._input_dir, "Users", "alice", "Library", "Application Support",
+                                          "Google", "Chrome", "Default")
+        os.makedirs(self._profile_path)
+        connection = sqlite3.connect(os.path.join(self._profile_path, "History"))
+        connection.executescript("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT, title TEXT, visit_count INTEGER,"
+                                 " typed_count INTEGER, last_visit_time INTEGER, hidden INTEGER);"
+                                 "CREATE TABLE keyword_search_terms (keyword_id INTEGER, url_id INTEGER, term TEXT);"
+                                 "CREATE TABLE visits (id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER,"
+                                 " from_visit INTEGER, transition INTEGER, visit_duration INTEGER);"
+                                 "CREATE INDEX visits_time_index ON visits (visit_time);")
+        connection.executemany("INSERT INTO urls (id, url, title) VALUES (?, ?, ?)",
+                               [(1, "https://a/", "A"), (2, "https://b/", "B")])
+        connection.executemany("INSERT INTO visits VALUES (?, ?, ?, ?, ?, ?)",
+                               [(2, 2, self._micros(2020, 1, 2), 1, 0x30000000, 5),
+                                (1, 1, self._micros(2020, 1, 1), 0, 0x10000001, 0),
+                                (3, 1, self._micros(2021, 1, 1), 0, 0, 0)])
+        connection.commit()
+        connection.close()
+        osxripper_chrome.clear()
+
+    def tearDown(self):
+        osxripper_chrome.clear()
+        osxripper_sqlite.close_all()
+        osxripper_output.close_all()
+        shutil.rmtree(self._input_dir, ignore_errors=True)
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+    @staticmethod
+    def _micros(*date):
+        return osxripper_time.get_gregorian_micros_delta(datetime.datetime(*date))
+
+    def _visits(self, since=None, until=None):
+        """
+        Run the plugin to JSON lines and return the records of the Visits section
+        """
+        plugin = UsersChromeHistory()
+        plugin.set_input_directory(self._input_dir)
+        plugin.set_output_directory(self._output_dir)
+        plugin.set_output_format("jsonl")
+        plugin.set_since(since)
+        plugin.set_until(until)
+        plugin.parse()
+        osxripper_output.close_all()
+        with open(os.path.join(self._output_dir, "Users_alice_Chrome_History.jsonl"), encoding="utf-8") as output:
+            records = [json.loads(line) for line in output]
+        return [(record["Visit ID"], record["URL"], record["Transition"], record["From URL"])
+                for record in records if record.get("Section") == "Visits"]
+
+    def test_visits_oldest_first(self):
+        self.assertEqual(self._visits(), [(1, "https://a/", "TYPED CHAIN_START", None),
+                                          (2, "https://b/", "LINK CHAIN_START CHAIN_END", "https://a/"),
+                                          (3, "https://a/", "LINK", None)])
+
+    def test_visits_in_range(self):
+        self.assertEqual([visit[0] for visit in self._visits(since=datetime.datetime(2020, 1, 2),
+                                                              until=datetime.datetime(2021, 1, 1))], [2])
+
+    def test_range_is_searched_in_the_index(self):
+        with mock.patch.object(osxripper_sqlite, "execute", wraps=osxripper_sqlite.execute) as execute:
+            self._visits(since=datetime.datetime(2020, 1, 2), until=datetime.datetime(2021, 1, 1))
+            queries = [call.args[1:] for call in execute.call_args_list if "history.visits" in call.args[1]]
+        connection = sqlite3.connect(":memory:")
+        try:
+            connection.execute("ATTACH DATABASE ? AS history", (os.path.join(self._profile_path, "History"),))
+            plan = [row[-1] for row in connection.execute("EXPLAIN QUERY PLAN " + queries[0][0], queries[0][1])]
+        finally:
+            connection.close()
+        self.assertIn("USING INDEX visits_time_index (visit_time>? AND visit_time<?)", plan[0])
+        self.assertFalse([step for step in plan if "TEMP B-TREE" in step])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+""" Tests of the file system inventory against os and os.path """
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from riplib import osxripper_inventory
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class InventoryTest(unittest.TestCase):
+    """
+    Test the inventory answers like os and os.path
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.library = os.path.join(self.root, "Users", "bob", "Library")
+        os.makedirs(os.path.join(self.library, "Preferences"))
+        os.makedirs(os.path.join(self.root, "private", "var"))
+        with open(os.path.join(self.library, "Preferences", "com.apple.dock.plist"), "w") as plist:
+            plist.write("dock")
+        open(os.path.join(self.root, "Users", "bob", ".bash_history"), "w").close()
+        os.symlink(os.path.join(self.root, "private", "var"), os.path.join(self.root, "var"))
+        osxripper_inventory.clear()
+        osxripper_inventory.get_inventory(self.root)
+
+    def tearDown(self):
+        osxripper_inventory.clear()
+        shutil.rmtree(self.root)
+
+    def _paths(self):
+        paths = [self.root, os.path.join(self.root, "missing"), os.path.join(self.root, "var"),
+                 os.path.join(self.root, "Users", "bob", ".bash_history", "below_a_file")]
+        for dir_path, dir_names, file_names in os.walk(self.root):
+            paths.extend(os.path.join(dir_path, name) for name in dir_names + file_names)
+        return paths
+
+    def test_path_checks_match_os_path(self):
+        for path in self._paths():
+            self.assertEqual(osxripper_inventory.isdir(path), os.path.isdir(path), path)
+            self.assertEqual(osxripper_inventory.isfile(path), os.path.isfile(path), path)
+            self.assertEqual(osxripper_inventory.exists(path), os.path.exists(path), path)
+
+    def test_listdir_matches_os(self):
+        for path in self._paths():
+            if os.path.isdir(path):
+                self.assertEqual(sorted(osxripper_inventory.listdir(path)), sorted(os.listdir(path)), path)
+            else:
+                with self.assertRaises(OSError):
+                    osxripper_inventory.listdir(path)
+
+    def test_walk_matches_os_walk(self):
+        walked = [(dir_path, sorted(dir_names), sorted(file_names))
+                  for dir_path, dir_names, file_names in osxripper_inventory.walk(self.root)]
+        expected = [(dir_path, sorted(dir_names), sorted(file_names))
+                    for dir_path, dir_names, file_names in os.walk(self.root)]
+        self.assertEqual(sorted(walked), sorted(expected))
+
+    def test_stat(self):
+        path = os.path.join(self.library, "Preferences", "com.apple.dock.plist")
+        inventory = osxripper_inventory.get_inventory(self.root)
+        self.assertEqual(inventory.stat(path).st_size, 4)
+        with self.assertRaises(FileNotFoundError):
+            inventory.stat(os.path.join(self.root, "missing"))
+
+    def test_listing_is_scanned_once(self):
+        self.assertFalse(osxripper_inventory.isfile(os.path.join(self.library, "new.plist")))
+        open(os.path.join(self.library, "new.plist"), "w").close()
+        self.assertFalse(osxripper_inventory.isfile(os.path.join(self.library, "new.plist")))
+
+    def test_case_differing_name_matches_os_path(self):
+        path = os.path.join(self.root, "users", "bob", "library", "preferences")
+        self.assertEqual(osxripper_inventory.isdir(path), os.path.isdir(path))
+        self.assertEqual(osxripper_inventory.isdir(os.path.join(self.root, "USERS")),
+                         os.path.isdir(os.path.join(self.root, "USERS")))
+
+    def test_case_insensitive_volume(self):
+        path = os.path.join(self.library, "Preferences", "COM.APPLE.DOCK.PLIST")
+        with mock.patch.object(osxripper_inventory.os.path, "lexists", return_value=True):
+            self.assertTrue(osxripper_inventory.isfile(path))
+            self.assertEqual(osxripper_inventory.get_inventory(self.root).stat(path).st_size, 4)
+
+    def test_invalidate(self):
+        new_path = os.path.join(self.library, "new.plist")
+        self.assertFalse(osxripper_inventory.isfile(new_path))
+        open(new_path, "w").close()
+        osxripper_inventory.invalidate(os.path.join(self.root, "Users"))
+        self.assertTrue(osxripper_inventory.isfile(new_path))
+        os.remove(new_path)
+        osxripper_inventory.get_inventory(self.root).invalidate()
+        self.assertFalse(osxripper_inventory.isfile(new_path))
+
+    def test_discard(self):
+        inventory = osxripper_inventory.get_inventory(self.root)
+        osxripper_inventory.discard(self.root)
+        self.assertIsNot(osxripper_inventory.get_inventory(self.root), inventory)
+
+    def test_path_outside_root_uses_os_path(self):
+        outside = tempfile.mkdtemp()
+        try:
+            self.assertTrue(osxripper_inventory.isdir(outside))
+            self.assertEqual(osxripper_inventory.listdir(outside), [])
+        finally:
+            os.rmdir(outside)
+
+
+if __name__ == "__main__":
+    unittest.main()
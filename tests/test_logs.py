@@ -0,0 +1,140 @@
+""" Tests of reading plain, gzip compressed and truncated logs and splitting them into entries """
+import datetime
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from riplib import osxripper_logs
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+SYSTEM_LOG = ("Oct 11 09:00:00 host kernel[0]: first message\n"
+              "\tcontinued on a second line\n"
+              "Oct 11 09:00:01.250 host loginwindow[95] (com.apple[1]): second message\r\n"
+              "2016-03-01 10:00:00.123 +0000 diskutil[42:1a2b]: iso message\n")
+
+
+class ReadLogsTest(unittest.TestCase):
+    """
+    Test read_logs on plain, gzip compressed and truncated logs
+    """
+    def setUp(self):
+        self._log_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._log_dir, ignore_errors=True)
+
+    def _write_log(self, name, text, compress=False, truncate=0):
+        """
+        Write a log, gzip compressed and with the last truncate bytes cut off if asked, return its path
+        """
+        data = text.encode("utf-8")
+        if compress:
+            data = gzip.compress(data)
+        log_path = os.path.join(self._log_dir, name)
+        with open(log_path, "wb") as log_file:
+            log_file.write(data[:len(data) - truncate])
+        return log_path
+
+    def _read(self, log_paths, workers, chunk_size=16):
+        """
+        Return the text and error read from each log
+        """
+        texts, errors = {}, {}
+        for log_path, chunk, error in osxripper_logs.read_logs(log_paths, workers=workers, chunk_size=chunk_size):
+            texts[log_path] = texts.get(log_path, "") + chunk
+            if error is not None:
+                errors[log_path] = error
+        return texts, errors
+
+    def test_plain_and_gz(self):
+        log_paths = [self._write_log("system.log", SYSTEM_LOG),
+                     self._write_log("system.log.0.gz", SYSTEM_LOG, compress=True),
+                     self._write_log("empty.log.1.gz", "", compress=True)]
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                texts, errors = self._read(log_paths, workers)
+                self.assertEqual(list(texts), log_paths)
+                self.assertEqual(texts[log_paths[0]], SYSTEM_LOG)
+                self.assertEqual(texts[log_paths[1]], SYSTEM_LOG)
+                self.assertEqual(texts[log_paths[2]], "")
+                self.assertEqual(errors, {})
+
+    def test_truncated_gz_reports_error_and_goes_on(self):
+        text = "".join("Oct 11 09:00:{0:02d} host process[1]: message {0}\n".format(index) for index in range(60))
+        log_paths = [self._write_log("system.log.0.gz", text, compress=True, truncate=10),
+                     self._write_log("system.log", SYSTEM_LOG)]
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                texts, errors = self._read(log_paths, workers)
+                self.assertIsInstance(errors[log_paths[0]], osxripper_logs.READ_ERRORS)
+                self.assertTrue(text.startswith(texts[log_paths[0]]))
+                self.assertEqual(texts[log_paths[1]], SYSTEM_LOG)
+                self.assertNotIn(log_paths[1], errors)
+
+
+class LogReaderTest(unittest.TestCase):
+    """
+    Test splitting logs into entries with LogReader
+    """
+    def _entries(self, text, chunk_size, **kwargs):
+        """
+        Return the entries of text fed to a LogReader chunk_size characters at a time
+        """
+        reader = osxripper_logs.LogReader(reference=datetime.datetime(2020, 10, 12), **kwargs)
+        entries = []
+        for start in range(0, len(text), chunk_size):
+            entries.extend(reader.feed(text[start:start + chunk_size]))
+        entries.extend(reader.close())
+        return entries
+
+    def test_entries_whatever_the_chunk_size(self):
+        expected = self._entries(SYSTEM_LOG, len(SYSTEM_LOG))
+        self.assertEqual("".join(text for _, text in expected), SYSTEM_LOG)
+        self.assertEqual([record["Timestamp"] for record, _ in expected],
+                         ["2020-10-11 09:00:00", "2020-10-11 09:00:01.250000", "2016-03-01 10:00:00.123000"])
+        self.assertEqual(expected[0][0]["Message"], "first message\n\tcontinued on a second line")
+        self.assertEqual((expected[1][0]["Process"], expected[1][0]["PID"]), ("loginwindow", "95"))
+        self.assertEqual((expected[2][0]["Process"], expected[2][0]["PID"]), ("diskutil", "42"))
+        for chunk_size in (1, 7, 50):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self._entries(SYSTEM_LOG, chunk_size), expected)
+
+    def test_truncated_last_line(self):
+        entries = self._entries(SYSTEM_LOG + "Oct 11 09:00:02 host kernel[0]: cut o", 10)
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[-1][1], "Oct 11 09:00:02 host kernel[0]: cut o")
+        self.assertEqual(entries[-1][0]["Message"], "cut o")
+
+    def test_since_and_until(self):
+        entries = self._entries(SYSTEM_LOG, 5, since=datetime.datetime(2020, 10, 11, 9, 0, 1),
+                                until=datetime.datetime(2020, 10, 12))
+        self.assertEqual([record["Message"] for record, _ in entries], ["second message"])
+
+    def test_syslog_year_before_reference(self):
+        record = osxripper_logs.parse_line("Dec 31 23:59:59 host kernel[0]: old", datetime.datetime(2021, 1, 2))
+        self.assertEqual(record["Timestamp"], datetime.datetime(2020, 12, 31, 23, 59, 59))
+
+    def test_syslog_leap_day(self):
+        line = "Feb 29 10:00:00 host kernel[0]: leap day"
+        self.assertEqual(osxripper_logs.parse_line(line, datetime.datetime(2020, 3, 1))["Timestamp"],
+                         datetime.datetime(2020, 2, 29, 10))
+        # Not a leap year, or a leap year whose Feb 29 is still to come: the last Feb 29 before the reference
+        self.assertEqual(osxripper_logs.parse_line(line, datetime.datetime(2021, 3, 1))["Timestamp"],
+                         datetime.datetime(2020, 2, 29, 10))
+        self.assertEqual(osxripper_logs.parse_line(line, datetime.datetime(2020, 2, 1))["Timestamp"],
+                         datetime.datetime(2016, 2, 29, 10))
+        self.assertIsNone(osxripper_logs.parse_line("Feb 30 10:00:00 host kernel[0]: no such day",
+                                                    datetime.datetime(2020, 3, 1)))
+
+    def test_pass_through_without_records(self):
+        reader = osxripper_logs.LogReader(records=False)
+        self.assertEqual(reader.feed("no timestamp\n"), [(None, "no timestamp\n")])
+        self.assertEqual(reader.close(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
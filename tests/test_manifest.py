@@ -0,0 +1,189 @@
+""" Tests of the plugin manifest read from plugin sources and the plugin selection """
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+from riplib import osxripper_manifest
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+PLUGIN_TEMPLATE = '''
+from riplib.plugin import Plugin
+
+
+class {class_name}(Plugin):
+    def __init__(self):
+        super().__init__()
+        self.set_name("{class_name} name")
+        self.set_type("plist")
+        self._output_file = "{class_name}.txt"
+{init}
+    def parse(self):
+{parse}
+'''
+
+
+class ManifestVersionTest(unittest.TestCase):
+    """
+    Test read_plugin_metadata, load_manifest and select on plugin sources written to a temporary directory
+    """
+    def setUp(self):
+        self._plugins_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._plugins_dir, ignore_errors=True)
+
+    def _write_plugin(self, class_name, parse, init=""):
+        """
+        Write a plugin module with the body of parse and extra lines of __init__, return its path
+        """
+        source_path = os.path.join(self._plugins_dir, class_name + ".py")
+        with open(source_path, "w", encoding="utf-8") as source_file:
+            source_file.write(PLUGIN_TEMPLATE.format(class_name=class_name,
+                                                     init=textwrap.indent(textwrap.dedent(init), " " * 8),
+                                                     parse=textwrap.indent(textwrap.dedent(parse), " " * 8)))
+        return source_path
+
+    def _os_versions(self, parse, init=""):
+        return osxripper_manifest.read_plugin_metadata(self._write_plugin("Example", parse, init))["os_versions"]
+
+    def test_metadata(self):
+        metadata = osxripper_manifest.read_plugin_metadata(self._write_plugin("Example", """
+            print("parsing")
+        """, init="""
+            self.set_description("Example description")
+            self.set_data_file(self.build_name())
+        """))
+        self.assertEqual(metadata, {"name": "Example name", "description": "Example description", "type": "plist",
+                                    "output_file": "Example.txt", "os_versions": None})
+
+    def test_cached_manifest_follows_changed_sources(self):
+        self._write_plugin("First", """
+            print("parsing")
+        """)
+        self._write_plugin("Second", """
+            print("parsing")
+        """)
+        manifest_entries = osxripper_manifest.load_manifest(self._plugins_dir)
+        self.assertEqual([manifest_entry.get_class_name for manifest_entry in manifest_entries], ["First", "Second"])
+        self.assertTrue(os.path.isfile(os.path.join(self._plugins_dir, osxripper_manifest.MANIFEST_FILE)))
+        source_path = self._write_plugin("Second", """
+            if self._os_version in ["mojave"]:
+                self.parse_data()
+            else:
+                print("[WARNING] This version of OSX is not supported by this plugin.")
+        """)
+        os.utime(source_path, ns=(0, 0))
+        os.remove(os.path.join(self._plugins_dir, "First.py"))
+        manifest_entries = osxripper_manifest.load_manifest(self._plugins_dir)
+        self.assertEqual([(manifest_entry.get_class_name, manifest_entry.get_os_versions)
+                          for manifest_entry in manifest_entries], [("Second", ["mojave"])])
+
+    def test_no_version_check_supports_all(self):
+        self.assertIsNone(self._os_versions("""
+            print("parsing")
+        """))
+
+    def test_in_list_with_unsupported_else(self):
+        self.assertEqual(self._os_versions("""
+            if self._os_version in ["mojave", "catalina", "big_sur"]:
+                self.parse_data()
+            else:
+                print("[WARNING] This version of OSX is not supported by this plugin.")
+        """), ["big_sur", "catalina", "mojave"])
+
+    def test_elif_chain_with_unknown_else(self):
+        self.assertEqual(self._os_versions("""
+            if self._os_version == "snow_leopard":
+                self.parse_old()
+            elif self._os_version in ["lion", "mavericks"]:
+                self.parse_new()
+            else:
+                logging.warning("Not a known OSX version.")
+                print("[WARNING] Not a known OSX version.")
+        """), ["lion", "mavericks", "snow_leopard"])
+
+    def test_unsupported_branch_is_left_out(self):
+        self.assertEqual(self._os_versions("""
+            if self._os_version == "yosemite":
+                print("[INFO] This version of OSX is not supported by this plugin.")
+            elif self._os_version in ["el_capitan", "sierra"]:
+                self.parse_data()
+            else:
+                print("[WARNING] Not a known OSX version.")
+        """), ["el_capitan", "sierra"])
+
+    def test_check_without_else_supports_all(self):
+        self.assertIsNone(self._os_versions("""
+            if self._os_version == "mojave":
+                self.parse_extra()
+            self.parse_data()
+        """))
+
+    def test_not_equal_check_supports_all(self):
+        self.assertIsNone(self._os_versions("""
+            if self._os_version != "lion":
+                self.parse_data()
+            else:
+                print("[WARNING] This version of OSX is not supported by this plugin.")
+        """))
+
+    def test_parsing_else_supports_all(self):
+        self.assertIsNone(self._os_versions("""
+            if self._os_version in ["mojave"]:
+                self.parse_new()
+            else:
+                self.parse_old()
+        """))
+
+    def test_declared_versions_win(self):
+        self.assertEqual(self._os_versions("""
+            if self._os_version == "mojave":
+                self.parse_data()
+        """, init="""
+            self.set_supported_os_versions(["sierra", "high_sierra"])
+        """), ["high_sierra", "sierra"])
+
+    def test_select_by_os_version(self):
+        self._write_plugin("Modern", """
+            if self._os_version in ["catalina", "big_sur"]:
+                self.parse_data()
+            else:
+                print("[WARNING] This version of OSX is not supported by this plugin.")
+        """)
+        self._write_plugin("Anything", """
+            self.parse_data()
+        """)
+        manifest_entries = osxripper_manifest.load_manifest(self._plugins_dir)
+        selected, unsupported = osxripper_manifest.select(manifest_entries, os_version="mojave")
+        self.assertEqual([manifest_entry.get_class_name for manifest_entry in selected], ["Anything"])
+        self.assertEqual([manifest_entry.get_class_name for manifest_entry in unsupported], ["Modern"])
+        selected, unsupported = osxripper_manifest.select(manifest_entries, os_version="catalina")
+        self.assertEqual([manifest_entry.get_class_name for manifest_entry in selected], ["Anything", "Modern"])
+        self.assertEqual(unsupported, [])
+
+    def test_select_by_name_and_type(self):
+        self._write_plugin("UsersChromeHistory", """
+            self.parse_data()
+        """)
+        self._write_plugin("UsersChromeCookies", """
+            self.parse_data()
+        """)
+        self._write_plugin("Autoruns", """
+            self.parse_data()
+        """)
+        manifest_entries = osxripper_manifest.load_manifest(self._plugins_dir)
+        patterns = osxripper_manifest.split_names("userschrome*, Autoruns name,")
+        self.assertEqual(patterns, ["userschrome*", "Autoruns name"])
+        selected, _ = osxripper_manifest.select(manifest_entries, plugins=patterns, exclude=["*Cookies"])
+        self.assertEqual([manifest_entry.get_class_name for manifest_entry in selected],
+                         ["Autoruns", "UsersChromeHistory"])
+        selected, _ = osxripper_manifest.select(manifest_entries, types=["sqlite"])
+        self.assertEqual(selected, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+""" Tests of the shared output file manager """
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from riplib import osxripper_output
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class OutputSectionTest(unittest.TestCase):
+    """
+    Test sections are appended to their output file in one write
+    """
+    def setUp(self):
+        self._output_dir = tempfile.mkdtemp()
+        self._output_path = os.path.join(self._output_dir, "Users_bob.txt")
+
+    def tearDown(self):
+        osxripper_output.close_all()
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+    def _read(self, output_path=None):
+        with open(output_path or self._output_path, "r", encoding="utf-8", newline="") as output_file:
+            return output_file.read()
+
+    def test_section_is_written_on_close(self):
+        section = osxripper_output.open_section(self._output_path)
+        section.write("========== Plugin ==========\r\n")
+        section.writelines(["é\r\n", "done\r\n"])
+        self.assertEqual(section.getvalue(), "========== Plugin ==========\r\né\r\ndone\r\n")
+        self.assertFalse(os.path.exists(self._output_path))
+        section.close()
+        section.close()
+        self.assertEqual(self._read(), "========== Plugin ==========\r\né\r\ndone\r\n")
+
+    def test_text_is_kept_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with osxripper_output.open_section(self._output_path) as section:
+                section.write("before\r\n")
+                raise RuntimeError("plugin failed")
+        self.assertEqual(self._read(), "before\r\n")
+
+    def test_sections_from_threads_do_not_interleave(self):
+        def write(index):
+            for _ in range(5):
+                with osxripper_output.open_section(self._output_path) as section:
+                    for line in range(200):
+                        section.write("{0} {1}\r\n".format(index, line))
+        threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        lines = self._read().split("\r\n")[:-1]
+        self.assertEqual(len(lines), 8 * 5 * 200)
+        for start in range(0, len(lines), 200):
+            block = lines[start:start + 200]
+            index = block[0].split()[0]
+            self.assertEqual(block, ["{0} {1}".format(index, line) for line in range(200)])
+
+    def test_least_recently_used_files_are_closed(self):
+        paths = [os.path.join(self._output_dir, "File{0}.txt".format(index)) for index in range(5)]
+        with mock.patch.object(osxripper_output, "MAX_OPEN_FILES", 2):
+            for _ in range(3):
+                for path in paths:
+                    osxripper_output.commit(path, os.path.basename(path) + "\r\n")
+                    self.assertLessEqual(len(osxripper_output._handles), 2)
+        for path in paths:
+            self.assertEqual(self._read(path), (os.path.basename(path) + "\r\n") * 3)
+
+    def test_files_in_use_stay_open(self):
+        paths = [os.path.join(self._output_dir, "File{0}.txt".format(index)) for index in range(3)]
+        with mock.patch.object(osxripper_output, "MAX_OPEN_FILES", 1):
+            entry = osxripper_output._acquire(os.path.abspath(paths[0]))
+            for path in paths[1:]:
+                osxripper_output.commit(path, "text")
+            self.assertFalse(entry[0].closed)
+            self.assertIn(os.path.abspath(paths[0]), osxripper_output._handles)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+""" Tests of the text, JSON lines, CSV and SQLite record writers """
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from riplib import osxripper_output
+from riplib import osxripper_records
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class RecordWriterTest(unittest.TestCase):
+    """
+    Test the record writers of each output format
+    """
+    def setUp(self):
+        self._output_dir = tempfile.mkdtemp()
+        self._output_path = os.path.join(self._output_dir, "Test.txt")
+
+    def tearDown(self):
+        osxripper_output.close_all()
+        osxripper_records.close_database(self._output_dir)
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+    def _write(self, output_format, records, context=None, batch_size=None):
+        """
+        Write records with a writer of output_format and return the path written
+        """
+        writer_class = osxripper_records.WRITERS[output_format]
+        with writer_class(self._output_path, "Test Plugin", context, batch_size) as writer:
+            writer.write_header()
+            writer.write_source("/input/file.db")
+            for record in records:
+                writer.write_record(record)
+            writer.write_footer()
+        return writer.get_output_path
+
+    def _read_csv(self, path):
+        with open(path, "r", encoding="utf-8", newline="") as csv_file:
+            return list(csv.reader(csv_file))
+
+    def test_text(self):
+        path = self._write(osxripper_records.FORMAT_TEXT, [{"URL": "https://a/", "Visit Count": 2}])
+        with open(path, "r", encoding="utf-8", newline="") as text_file:
+            self.assertEqual(text_file.read(),
+                             "========== Test Plugin ==========\r\n"
+                             "Source File: /input/file.db\r\n\r\n"
+                             "URL        : https://a/\r\n"
+                             "Visit Count: 2\r\n\r\n"
+                             "========================================\r\n\r\n")
+
+    def test_text_sections(self):
+        with osxripper_records.TextRecordWriter(self._output_path, "Test Plugin") as writer:
+            writer.start_section("Cookies", label_width=6, spacing=False)
+            writer.write_record({"Name": "id"})
+            writer.write_record({"Name": "sid"})
+        with open(writer.get_output_path, "r", encoding="utf-8", newline="") as text_file:
+            self.assertEqual(text_file.read(), "========== Cookies ==========\r\nName  : id\r\nName  : sid\r\n")
+
+    def test_jsonl(self):
+        path = self._write(osxripper_records.FORMAT_JSONL, [{"URL": "https://a/", "Count": 2}, {"URL": None}],
+                           context={"User": "bob"})
+        self.assertTrue(path.endswith("Test.jsonl"))
+        with open(path, "r", encoding="utf-8") as jsonl_file:
+            records = [json.loads(line) for line in jsonl_file]
+        self.assertEqual(records, [
+            {"Plugin": "Test Plugin", "User": "bob", "Source File": "/input/file.db", "URL": "https://a/", "Count": 2},
+            {"Plugin": "Test Plugin", "User": "bob", "Source File": "/input/file.db", "URL": None}])
+
+    def test_csv(self):
+        path = self._write(osxripper_records.FORMAT_CSV, [{"A": 1, "B": 2}, {"A": 4, "B": 3}])
+        self.assertEqual(self._read_csv(path), [["Plugin", "Source File", "A", "B"],
+                                                ["Test Plugin", "/input/file.db", "1", "2"],
+                                                ["Test Plugin", "/input/file.db", "4", "3"]])
+
+    def test_csv_columns_fixed_by_the_first_header(self):
+        path = self._write(osxripper_records.FORMAT_CSV, [{"A": 1, "B": 2}, {"B": 3, "A": 4}], batch_size=1)
+        self.assertEqual(self._read_csv(path), [["Plugin", "Source File", "A", "B"],
+                                                ["Test Plugin", "/input/file.db", "1", "2"],
+                                                ["Test Plugin", "/input/file.db", "4", "3"]])
+
+    def test_csv_columns_fixed_by_the_first_write(self):
+        path = self._write(osxripper_records.FORMAT_CSV, [{"A": 1}, {"A": 2, "C": 3}, {"C": 4}], batch_size=2)
+        self._write(osxripper_records.FORMAT_CSV, [{"C": 5}])
+        self.assertEqual(self._read_csv(path), [["Plugin", "Source File", "A", "C"],
+                                                ["Test Plugin", "/input/file.db", "1", ""],
+                                                ["Test Plugin", "/input/file.db", "2", "3"],
+                                                ["Test Plugin", "/input/file.db", "", "4"],
+                                                ["Test Plugin", "/input/file.db", "", "5"]])
+        with self.assertRaises(ValueError):
+            self._write(osxripper_records.FORMAT_CSV, [{"D": 6}])
+
+    def test_csv_shared_writers_have_their_own_file(self):
+        for plugin_name in ["Disk Utility Log", "FS Check Log"]:
+            with osxripper_records.open_writer(osxripper_records.FORMAT_CSV, self._output_path, plugin_name,
+                                               shared=True) as writer:
+                writer.write_record({"Plugin Key": plugin_name})
+        osxripper_output.close_all()
+        self.assertEqual(self._read_csv(os.path.join(self._output_dir, "Test_Disk_Utility_Log.csv")),
+                         [["Plugin", "Plugin Key"], ["Disk Utility Log", "Disk Utility Log"]])
+        self.assertEqual(self._read_csv(os.path.join(self._output_dir, "Test_FS_Check_Log.csv")),
+                         [["Plugin", "Plugin Key"], ["FS Check Log", "FS Check Log"]])
+
+    def test_csv_shared_file_has_one_header(self):
+        def write(index):
+            writer = osxripper_records.CsvRecordWriter(self._output_path, "Plugin {0}".format(index), batch_size=1)
+            for count in range(20):
+                writer.write_record({"Index": index, "Count": count})
+            writer.close()
+        threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        osxripper_output.close_all()
+        rows = self._read_csv(os.path.join(self._output_dir, "Test.csv"))
+        self.assertEqual(rows[0], ["Plugin", "Index", "Count"])
+        self.assertEqual(len(rows), 1 + 8 * 20)
+        self.assertNotIn(["Plugin", "Index", "Count"], rows[1:])
+
+    def test_csv_sections_have_their_own_file(self):
+        with osxripper_records.CsvRecordWriter(self._output_path, "Test Plugin") as writer:
+            writer.start_section("Top Sites")
+            writer.write_record({"URL": "https://a/"})
+            writer.start_section("Downloads")
+            writer.write_record({"Path": "/tmp/x"})
+        self.assertEqual(self._read_csv(os.path.join(self._output_dir, "Test_Top_Sites.csv")),
+                         [["Plugin", "Section", "URL"], ["Test Plugin", "Top Sites", "https://a/"]])
+        self.assertEqual(self._read_csv(os.path.join(self._output_dir, "Test_Downloads.csv")),
+                         [["Plugin", "Section", "Path"], ["Test Plugin", "Downloads", "/tmp/x"]])
+
+    def test_sqlite(self):
+        self._write(osxripper_records.FORMAT_SQLITE,
+                    [{"URL": "https://a/", "Count": 2}, {"URL": "https://b/", "Size": 2**70}], context={"User": "bob"})
+        osxripper_records.close_database(self._output_dir)
+        connection = sqlite3.connect(os.path.join(self._output_dir, osxripper_records.SQLITE_DATABASE))
+        try:
+            rows = connection.execute('SELECT "User","Source File","URL","Count","Size" FROM Test_Plugin').fetchall()
+        finally:
+            connection.close()
+        self.assertEqual(rows, [("bob", "/input/file.db", "https://a/", 2, None),
+                                ("bob", "/input/file.db", "https://b/", None, str(2**70))])
+
+    def test_sqlite_sections_have_their_own_table(self):
+        with osxripper_records.SqliteRecordWriter(self._output_path, "Test Plugin") as writer:
+            writer.start_section("Top Sites")
+            writer.write_record({"URL": "https://a/"})
+            writer.start_section("Downloads")
+            writer.write_record({"Path": "/tmp/x"})
+            writer.write_record({"Path": "/tmp/y", "Size": 3})
+        osxripper_records.close_database(self._output_dir)
+        connection = sqlite3.connect(os.path.join(self._output_dir, osxripper_records.SQLITE_DATABASE))
+        try:
+            self.assertEqual(connection.execute("SELECT * FROM Test_Plugin_Top_Sites").fetchall(), [("https://a/",)])
+            self.assertEqual(connection.execute("SELECT * FROM Test_Plugin_Downloads").fetchall(),
+                             [("/tmp/x", None), ("/tmp/y", 3)])
+        finally:
+            connection.close()
+
+    def test_record_buffer_replays_calls_in_order(self):
+        def fill(record_buffer):
+            with record_buffer:
+                record_buffer.start_section("Visits", label_width=3)
+                for index in range(osxripper_records.BATCH_SIZE + 10):
+                    record_buffer.write_record({"ID": index})
+                record_buffer.write_text("done\r\n")
+        record_buffer = osxripper_records.RecordBuffer()
+        thread = threading.Thread(target=fill, args=(record_buffer,))
+        thread.start()
+        with osxripper_records.TextRecordWriter(self._output_path, "Test Plugin") as writer:
+            writer.write_buffer(record_buffer)
+        thread.join()
+        self.assertEqual(writer.get_record_count, osxripper_records.BATCH_SIZE + 10)
+        with open(writer.get_output_path, "r", encoding="utf-8", newline="") as text_file:
+            self.assertEqual(text_file.read(),
+                             "========== Visits ==========\r\n" +
+                             "".join("ID : {0}\r\n\r\n".format(index)
+                                     for index in range(osxripper_records.BATCH_SIZE + 10)) + "done\r\n")
+
+    def test_open_writer_unknown_format(self):
+        with self.assertRaises(ValueError):
+            osxripper_records.open_writer("xml", self._output_path, "Test Plugin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+""" Tests of the incremental run cache """
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from riplib import osxripper_output
+from riplib import osxripper_runcache
+from riplib import osxripper_scheduler
+from riplib.plugin import Plugin
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class _CopyPlugin(Plugin):
+    """
+    Plugin copying a source file of the input directory to its report, counting its runs
+    """
+    runs = 0
+
+    def __init__(self, input_dir, output_dir, fail=False):
+        """
+        Initialise the class.
+        """
+        super().__init__()
+        self.set_name("Copy Plugin")
+        self.set_type("text")
+        self.set_input_directory(input_dir)
+        self.set_output_directory(output_dir)
+        self._fail = fail
+
+    def parse(self):
+        """
+        Append the source file to Report.txt
+        """
+        _CopyPlugin.runs += 1
+        with open(os.path.join(self._input_dir, "source.txt"), "r", encoding="utf-8") as source_file:
+            text = source_file.read()
+        osxripper_output.commit(os.path.join(self._output_dir, "Report.txt"), "Source: " + text + "\r\n")
+        if self._fail:
+            raise RuntimeError("failed on purpose")
+
+
+class RunCacheTest(unittest.TestCase):
+    """
+    Test plugin output is replayed only while the plugin, its sources and the run settings are unchanged
+    """
+    def setUp(self):
+        self._input_dir = tempfile.mkdtemp()
+        self._output_dir = tempfile.mkdtemp()
+        self._write_source("first")
+        _CopyPlugin.runs = 0
+
+    def tearDown(self):
+        osxripper_output.close_all()
+        shutil.rmtree(self._input_dir, ignore_errors=True)
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+    def _write_source(self, text):
+        with open(os.path.join(self._input_dir, "source.txt"), "w", encoding="utf-8") as source_file:
+            source_file.write(text)
+
+    def _run(self, os_version="mojave", fail=False):
+        """
+        Run the plugin incrementally, return its status and the report written
+        """
+        run_cache = osxripper_runcache.open_run_cache(self._output_dir, self._input_dir, os_version, "text", False)
+        status = osxripper_scheduler.run_cached_plugin(run_cache, _CopyPlugin(self._input_dir, self._output_dir,
+                                                                              fail))[0]
+        osxripper_output.close_all()
+        with open(os.path.join(self._output_dir, "Report.txt"), "r", encoding="utf-8", newline="") as report_file:
+            return status, report_file.read()
+
+    def test_unchanged_plugin_is_reused(self):
+        self.assertEqual(self._run(), (osxripper_scheduler.STATUS_OK, "Source: first\r\n"))
+        self.assertEqual(self._run(), (osxripper_scheduler.STATUS_OK, "Source: first\r\n"))
+        self.assertEqual(_CopyPlugin.runs, 1)
+
+    def test_reused_plugin_is_not_reported_running(self):
+        self._run()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self._run()
+        self.assertNotIn("Running", output.getvalue())
+        self.assertIn("Reused", output.getvalue())
+
+    def test_changed_source_runs_again(self):
+        self._run()
+        self._write_source("second")
+        self.assertEqual(self._run(), (osxripper_scheduler.STATUS_OK, "Source: second\r\n"))
+        self.assertEqual(_CopyPlugin.runs, 2)
+
+    def test_changed_settings_run_again(self):
+        self._run()
+        self._run(os_version="catalina")
+        self.assertEqual(_CopyPlugin.runs, 2)
+
+    def test_failed_run_is_not_reused(self):
+        self.assertEqual(self._run(fail=True), (osxripper_scheduler.STATUS_ERROR, "Source: first\r\n"))
+        self.assertEqual(self._run(), (osxripper_scheduler.STATUS_OK, "Source: first\r\n"))
+        self.assertEqual(_CopyPlugin.runs, 2)
+
+    def test_sources_are_recorded(self):
+        run_cache = osxripper_runcache.open_run_cache(self._output_dir, self._input_dir, "mojave", "text", False)
+        osxripper_scheduler.run_cached_plugin(run_cache, _CopyPlugin(self._input_dir, self._output_dir))
+        entry = run_cache.load_entry("_CopyPlugin")
+        self.assertEqual(list(entry["inputs"][osxripper_runcache.KIND_FILE]),
+                         [os.path.join(os.path.abspath(self._input_dir), "source.txt")])
+        self.assertEqual([output["path"] for output in entry["outputs"]], ["Report.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
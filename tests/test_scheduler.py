@@ -0,0 +1,138 @@
+""" Tests of the plugin scheduler order, limits and modes """
+import os
+import tempfile
+import threading
+import time
+import unittest
+from riplib import osxripper_scheduler
+from riplib.plugin import Plugin
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class _TestPlugin(Plugin):
+    """
+    Plugin recording when it starts and finishes in a shared list
+    """
+    def __init__(self, name, plugin_type="text", events=None, fail=False, delay=0.0):
+        """
+        Initialise the class.
+        """
+        super().__init__()
+        self.set_name(name)
+        self.set_type(plugin_type)
+        self._events = events if events is not None else []
+        self._fail = fail
+        self._delay = delay
+        self._events_lock = threading.Lock()
+
+    def parse(self):
+        """
+        Record the start and end of the run, raise if the plugin is set to fail
+        """
+        with self._events_lock:
+            self._events.append(("start", self._name))
+        time.sleep(self._delay)
+        if self._fail:
+            raise RuntimeError("failed on purpose")
+        with self._events_lock:
+            self._events.append(("end", self._name))
+
+
+class _FilePlugin(Plugin):
+    """
+    Plugin writing its name to a file in the output directory, importable by worker processes
+    """
+    def __init__(self, output_dir, fail=False):
+        """
+        Initialise the class.
+        """
+        super().__init__()
+        self.set_name("File Plugin")
+        self.set_type("text")
+        self.set_output_directory(output_dir)
+        self._fail = fail
+
+    def parse(self):
+        """
+        Write the process id to a file, raise if the plugin is set to fail
+        """
+        if self._fail:
+            raise RuntimeError("failed on purpose")
+        with open(os.path.join(self._output_dir, "File_Plugin.txt"), "w") as output_file:
+            output_file.write(str(os.getpid()))
+
+
+def _plugin_class(class_name):
+    """
+    Return a _TestPlugin subclass named class_name, the scheduler tracks plugins by class name
+    """
+    return type(class_name, (_TestPlugin,), {})
+
+
+class PluginSchedulerTest(unittest.TestCase):
+    """
+    Test PluginScheduler
+    """
+    def test_order_heaviest_first_then_class_name(self):
+        plugins = [_plugin_class("Beta")("Beta", "text"), _plugin_class("Alpha")("Alpha", "plist"),
+                   _plugin_class("Gamma")("Gamma", "sqlite"), _plugin_class("Delta")("Delta", "bplist")]
+        scheduler = osxripper_scheduler.PluginScheduler(max_workers=4)
+        self.assertEqual([plugin.__class__.__name__ for plugin in scheduler.order(plugins)],
+                         ["Gamma", "Delta", "Alpha", "Beta"])
+
+    def test_weight_capped_to_workers(self):
+        scheduler = osxripper_scheduler.PluginScheduler(max_workers=2)
+        self.assertEqual(scheduler.get_weight(_plugin_class("Heavy")("Heavy", "sqlite")), 2)
+
+    def test_failure_does_not_stop_the_others(self):
+        events = []
+        broken = _plugin_class("Broken")("Broken", events=events, fail=True)
+        others = [_plugin_class("Other{0}".format(index))("Other{0}".format(index), events=events)
+                  for index in range(3)]
+        with osxripper_scheduler.PluginScheduler(max_workers=1) as scheduler:
+            results = {result.class_name: result for result in scheduler.run([broken] + others)}
+        self.assertEqual(results["Broken"].status, osxripper_scheduler.STATUS_ERROR)
+        self.assertIn("RuntimeError", results["Broken"].error)
+        self.assertEqual([results[plugin.__class__.__name__].status for plugin in others],
+                         [osxripper_scheduler.STATUS_OK] * 3)
+        self.assertEqual(len([event for event in events if event[0] == "end"]), 3)
+
+    def test_type_limit(self):
+        events = []
+        plugins = [_plugin_class("Db{0}".format(index))("Db{0}".format(index), "sqlite", events=events, delay=0.02)
+                   for index in range(4)]
+        with osxripper_scheduler.PluginScheduler(max_workers=8, type_weights={"sqlite": 1},
+                                                 type_limits={"sqlite": 1}) as scheduler:
+            scheduler.run(plugins)
+        running = 0
+        for event, _ in events:
+            running += 1 if event == "start" else -1
+            self.assertLessEqual(running, 1)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            osxripper_scheduler.PluginScheduler(mode="fibre")
+
+    def test_process_mode(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with osxripper_scheduler.PluginScheduler(max_workers=2,
+                                                     mode=osxripper_scheduler.MODE_PROCESS) as scheduler:
+                results = scheduler.run([_FilePlugin(output_dir)])
+            self.assertEqual(results[0].status, osxripper_scheduler.STATUS_OK)
+            with open(os.path.join(output_dir, "File_Plugin.txt")) as output_file:
+                self.assertNotEqual(output_file.read(), str(os.getpid()))
+
+    def test_process_mode_failure(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            with osxripper_scheduler.PluginScheduler(max_workers=1,
+                                                     mode=osxripper_scheduler.MODE_PROCESS) as scheduler:
+                results = scheduler.run([_FilePlugin(output_dir, fail=True)])
+        self.assertEqual(results[0].status, osxripper_scheduler.STATUS_ERROR)
+        self.assertIn("failed on purpose", results[0].error)
+
+
+if __name__ == "__main__":
+    unittest.main()
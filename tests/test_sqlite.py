@@ -0,0 +1,230 @@
+""" Tests of the SQLite row streaming, the read only connection pool and the staged copies """
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from riplib import osxripper_sqlite
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class IterateRowsTest(unittest.TestCase):
+    """
+    Test iterate_rows gives the rows of fetchall a batch at a time
+    """
+    def setUp(self):
+        self._connection = sqlite3.connect(":memory:")
+        self._connection.execute("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT)")
+        self._connection.executemany("INSERT INTO urls (url) VALUES (?)",
+                                     [("https://example.com/{0}".format(index),) for index in range(25)])
+
+    def tearDown(self):
+        self._connection.close()
+
+    def test_rows_match_fetchall(self):
+        expected = self._connection.execute("SELECT * FROM urls ORDER BY id").fetchall()
+        for batch_size in [1, 2, 7, 25, 1000]:
+            rows = osxripper_sqlite.iterate_rows(self._connection.execute("SELECT * FROM urls ORDER BY id"),
+                                                 batch_size)
+            self.assertTrue(rows)
+            self.assertEqual(list(rows), expected)
+
+    def test_batches(self):
+        rows = osxripper_sqlite.iterate_rows(self._connection.execute("SELECT id FROM urls ORDER BY id"), 10)
+        self.assertEqual([len(batch) for batch in rows.batches()], [10, 10, 5])
+        self.assertFalse(rows)
+
+    def test_no_rows(self):
+        rows = osxripper_sqlite.iterate_rows(self._connection.execute("SELECT * FROM urls WHERE id < 0"))
+        self.assertFalse(rows)
+        self.assertEqual(list(rows), [])
+
+
+class ReadonlyPoolTest(unittest.TestCase):
+    """
+    Test connect_readonly shares read only connections by path
+    """
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._paths = [self._create(name) for name in ["History", "Cookies", "Web Data #1?"]]
+
+    def tearDown(self):
+        osxripper_sqlite.close_all()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _create(self, name):
+        """
+        Create a database with one row and return its path
+        """
+        path = os.path.join(self._directory, name)
+        connection = sqlite3.connect(path)
+        connection.execute("CREATE TABLE meta (key TEXT, value TEXT)")
+        connection.execute("INSERT INTO meta VALUES ('name', ?)", (name,))
+        connection.commit()
+        connection.close()
+        return path
+
+    def test_read(self):
+        for path in self._paths:
+            connection = osxripper_sqlite.connect_readonly(path)
+            row = connection.execute("SELECT * FROM meta").fetchone()
+            self.assertEqual(row["value"], os.path.basename(path))
+            osxripper_sqlite.release(connection)
+
+    def test_connections_are_shared_by_path(self):
+        first = osxripper_sqlite.connect_readonly(self._paths[0])
+        second = osxripper_sqlite.connect_readonly(os.path.join(self._directory, ".", "History"))
+        self.assertIs(first, second)
+        self.assertIsNot(first, osxripper_sqlite.connect_readonly(self._paths[1]))
+
+    def test_writes_are_refused_and_nothing_is_created(self):
+        before = sorted(os.listdir(self._directory))
+        connection = osxripper_sqlite.connect_readonly(self._paths[0])
+        with self.assertRaises(sqlite3.DatabaseError):
+            connection.execute("INSERT INTO meta VALUES ('key', 'value')")
+        connection.execute("SELECT * FROM meta").fetchall()
+        osxripper_sqlite.release(connection)
+        self.assertEqual(sorted(os.listdir(self._directory)), before)
+
+    def test_idle_connections_are_closed_oldest_first(self):
+        with mock.patch.object(osxripper_sqlite, "IDLE_CONNECTIONS", 1):
+            connections = [osxripper_sqlite.connect_readonly(path) for path in self._paths]
+            for connection in connections:
+                osxripper_sqlite.release(connection)
+            for connection in connections[:2]:
+                with self.assertRaises(sqlite3.ProgrammingError):
+                    connection.execute("SELECT 1")
+            connections[2].execute("SELECT 1")
+            self.assertIs(osxripper_sqlite.connect_readonly(self._paths[2]), connections[2])
+
+    def test_close_all(self):
+        connection = osxripper_sqlite.connect_readonly(self._paths[0])
+        osxripper_sqlite.close_all()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+        self.assertIsNot(osxripper_sqlite.connect_readonly(self._paths[0]), connection)
+
+
+class AttachedTest(unittest.TestCase):
+    """
+    Test connect_attached opens several databases as the schemas of one read only connection
+    """
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._attachments = {"history": os.path.join(self._directory, "History"),
+                             "favicons": os.path.join(self._directory, "Favicons")}
+        connection = sqlite3.connect(self._attachments["history"])
+        connection.execute("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT)")
+        connection.executemany("INSERT INTO urls (url) VALUES (?)", [("https://a/",), ("https://b/",)])
+        connection.commit()
+        connection.close()
+        connection = sqlite3.connect(self._attachments["favicons"])
+        connection.execute("CREATE TABLE icon_mapping (page_url TEXT, icon_id INTEGER)")
+        connection.execute("INSERT INTO icon_mapping VALUES ('https://b/', 7)")
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        osxripper_sqlite.close_all()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def test_join_across_databases(self):
+        connection = osxripper_sqlite.connect_attached(self._attachments)
+        cursor = osxripper_sqlite.execute(connection.cursor(),
+                                          "SELECT u.url,im.icon_id FROM history.urls u LEFT JOIN "
+                                          "favicons.icon_mapping im ON im.page_url = u.url ORDER BY u.id")
+        self.assertEqual([tuple(row) for row in cursor], [("https://a/", None), ("https://b/", 7)])
+        self.assertEqual(osxripper_sqlite.get_columns(connection, "icon_mapping", "favicons"),
+                         ["page_url", "icon_id"])
+        self.assertEqual(osxripper_sqlite.get_columns(connection, "missing", "history"), [])
+        with self.assertRaises(sqlite3.DatabaseError):
+            connection.execute("DELETE FROM history.urls")
+
+    def test_connections_are_shared_by_attachments(self):
+        connection = osxripper_sqlite.connect_attached(self._attachments)
+        self.assertIs(osxripper_sqlite.connect_attached(dict(reversed(list(self._attachments.items())))), connection)
+        self.assertIsNot(osxripper_sqlite.connect_attached({"history": self._attachments["history"]}), connection)
+        own = osxripper_sqlite.connect_attached(self._attachments, shared=False)
+        self.assertIsNot(own, connection)
+        osxripper_sqlite.release(own)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            own.execute("SELECT 1")
+
+    def test_attached_log_is_read(self):
+        writer = sqlite3.connect(self._attachments["favicons"], isolation_level=None)
+        try:
+            writer.execute("PRAGMA journal_mode=WAL")
+            writer.execute("PRAGMA wal_autocheckpoint=0")
+            writer.execute("INSERT INTO icon_mapping VALUES ('https://a/', 8)")
+            connection = osxripper_sqlite.connect_attached(self._attachments)
+            self.assertEqual(connection.execute("SELECT count(*) FROM favicons.icon_mapping").fetchone()[0], 2)
+        finally:
+            osxripper_sqlite.close_all()
+            writer.close()
+
+
+class StagingTest(unittest.TestCase):
+    """
+    Test a database with a write ahead log is read from a staged copy holding the logged changes
+    """
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._scratch = tempfile.mkdtemp()
+        self._path = os.path.join(self._directory, "KnowledgeC.db")
+        # Keep the writer open with checkpoints off so the rows stay in the -wal file
+        self._writer = sqlite3.connect(self._path, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA wal_autocheckpoint=0")
+        self._writer.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT)")
+        self._writer.executemany("INSERT INTO events (name) VALUES (?)", [("event{0}".format(index),)
+                                                                         for index in range(100)])
+
+    def tearDown(self):
+        osxripper_sqlite.close_all()
+        self._writer.close()
+        shutil.rmtree(self._directory, ignore_errors=True)
+        shutil.rmtree(self._scratch, ignore_errors=True)
+
+    def _state(self):
+        """
+        Return the names, sizes and modification times of the files beside the database
+        """
+        return sorted((name, os.stat(os.path.join(self._directory, name)).st_size,
+                       os.stat(os.path.join(self._directory, name)).st_mtime_ns)
+                      for name in os.listdir(self._directory))
+
+    def test_rows_in_the_log_are_read(self):
+        self.assertGreater(os.path.getsize(self._path + "-wal"), 0)
+        before = self._state()
+        with mock.patch.object(osxripper_sqlite, "STAGING_DIRECTORIES", [self._scratch]):
+            connection = osxripper_sqlite.connect_readonly(self._path)
+            self.assertEqual(connection.execute("SELECT count(*) FROM events").fetchone()[0], 100)
+            self.assertIs(osxripper_sqlite.connect_readonly(self._path), connection)
+            self.assertTrue(os.listdir(self._scratch))
+            osxripper_sqlite.close_all()
+        self.assertEqual(self._state(), before)
+        self.assertEqual(os.listdir(self._scratch), [])
+
+    def test_staged_copy_is_removed_with_the_last_connection(self):
+        with mock.patch.object(osxripper_sqlite, "STAGING_DIRECTORIES", [self._scratch]), \
+                mock.patch.object(osxripper_sqlite, "IDLE_CONNECTIONS", 0):
+            connection = osxripper_sqlite.connect_readonly(self._path)
+            staging_dir = os.path.join(self._scratch, os.listdir(self._scratch)[0])
+            self.assertEqual(len(os.listdir(staging_dir)), 1)
+            osxripper_sqlite.release(connection)
+            self.assertEqual(os.listdir(staging_dir), [])
+
+    def test_database_without_log_is_read_in_place(self):
+        self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        with mock.patch.object(osxripper_sqlite, "STAGING_DIRECTORIES", [self._scratch]):
+            connection = osxripper_sqlite.connect_readonly(self._path)
+            self.assertEqual(connection.execute("SELECT count(*) FROM events").fetchone()[0], 100)
+        self.assertEqual(os.listdir(self._scratch), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
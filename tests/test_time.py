@@ -0,0 +1,89 @@
+""" Tests of the batch time conversions against the single value conversions """
+import datetime
+import random
+import unittest
+from riplib import osxripper_time
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+# Batch conversion -> single value conversion and a plausible delta for the epoch and unit
+CONVERSIONS = [
+    (osxripper_time.get_gregorian_seconds_batch, osxripper_time.get_gregorian_seconds, 13100000000),
+    (osxripper_time.get_gregorian_millis_batch, osxripper_time.get_gregorian_millis, 13100000000000),
+    (osxripper_time.get_gregorian_micros_batch, osxripper_time.get_gregorian_micros, 13100000000000000),
+    (osxripper_time.get_unix_seconds_batch, osxripper_time.get_unix_seconds, 1600000000),
+    (osxripper_time.get_unix_millis_batch, osxripper_time.get_unix_millis, 1600000000000),
+    (osxripper_time.get_unix_micros_batch, osxripper_time.get_unix_micros, 1600000000000000),
+    (osxripper_time.get_cocoa_seconds_batch, osxripper_time.get_cocoa_seconds, 600000000),
+    (osxripper_time.get_cocoa_millis_batch, osxripper_time.get_cocoa_millis, 600000000000)
+]
+
+
+def _deltas(typical):
+    """
+    Return integer, float and None deltas around a typical value, including halves of a microsecond
+    """
+    generator = random.Random(typical)
+    deltas = [None, 0, 1, -1, typical, -typical, 0.5, 1.5, 2.5, -1.5, 0.0000015, 0.0000025, 1.0000005]
+    for _ in range(600):
+        deltas.append(generator.randint(-typical, typical))
+        fraction = generator.choice([0.5, 0.25, generator.random()])
+        deltas.append(generator.randint(-typical // 1000, typical // 1000) + fraction)
+        deltas.append(generator.randint(0, 2**30) / 2.0)
+    return deltas
+
+
+class BatchTimeTest(unittest.TestCase):
+    """
+    Test that each batch conversion gives str() of its single value conversion
+    """
+    def _check(self, use_numpy):
+        for batch_conversion, conversion, typical in CONVERSIONS:
+            deltas = _deltas(typical)
+            expected = [str(conversion(delta)) for delta in deltas]
+            with self.subTest(conversion=conversion.__name__):
+                self.assertEqual(batch_conversion(deltas, use_numpy=use_numpy), expected)
+
+    def test_without_numpy(self):
+        self._check(False)
+
+    @unittest.skipIf(osxripper_time.numpy is None, "NumPy is not installed")
+    def test_with_numpy(self):
+        self._check(True)
+
+    def test_default_matches_without_numpy(self):
+        deltas = _deltas(13100000000000000) * 2
+        self.assertEqual(osxripper_time.get_gregorian_micros_batch(deltas),
+                         osxripper_time.get_gregorian_micros_batch(deltas, use_numpy=False))
+
+    def test_values_out_of_range(self):
+        deltas = [10**20, float("nan"), float("inf"), "text"]
+        expected = ["[ERROR] unknown date value: {0}".format(delta) for delta in deltas]
+        self.assertEqual(osxripper_time.get_unix_seconds_batch(deltas, use_numpy=False), expected)
+        if osxripper_time.numpy is not None:
+            self.assertEqual(osxripper_time.get_unix_seconds_batch(deltas, use_numpy=True), expected)
+
+    def test_single_values_out_of_range(self):
+        deltas = [10**20, -10**20, float("nan"), float("inf"), "text"]
+        for batch_conversion, conversion, _ in CONVERSIONS:
+            with self.subTest(conversion=conversion.__name__):
+                self.assertEqual([conversion(delta) for delta in deltas],
+                                 ["[ERROR] unknown date value: {0}".format(delta) for delta in deltas])
+                self.assertEqual(batch_conversion(deltas, use_numpy=False), [conversion(delta) for delta in deltas])
+
+
+class MicrosDeltaTest(unittest.TestCase):
+    """
+    Test get_gregorian_micros_delta is the inverse of get_gregorian_micros
+    """
+    def test_round_trip(self):
+        for delta in [0, 1, 13100000000000000, 13100000000123456]:
+            date_time = osxripper_time.GREGORIAN_1601 + datetime.timedelta(microseconds=delta)
+            self.assertEqual(osxripper_time.get_gregorian_micros_delta(date_time), delta)
+            self.assertEqual(osxripper_time.get_gregorian_micros(delta), date_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+""" Tests of the timeline chunk sort and merge """
+import csv
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from riplib import osxripper_records
+from riplib import osxripper_timeline
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class TimelineTest(unittest.TestCase):
+    """
+    Test events spilled to sorted chunks are merged into one sorted Timeline.csv
+    """
+    def setUp(self):
+        self._output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._output_dir, ignore_errors=True)
+
+    def _read_timeline(self):
+        with open(os.path.join(self._output_dir, osxripper_timeline.TIMELINE_FILE), "r", encoding="utf-8",
+                  newline="") as timeline_file:
+            return list(csv.reader(timeline_file))
+
+    def _write_events(self, plugin_count, event_count, chunk_size):
+        """
+        Add random events from several writers and return the expected timeline rows
+        """
+        chunk_dir = osxripper_timeline.start_timeline(self._output_dir)
+        generator = random.Random(7)
+        start = datetime.datetime(2019, 1, 1)
+        expected = []
+        for plugin_index in range(plugin_count):
+            plugin_name = "Plugin {0}".format(plugin_index)
+            with osxripper_timeline.TimelineWriter(chunk_dir, plugin_name, chunk_size) as writer:
+                for event_index in range(event_count):
+                    timestamp = start + datetime.timedelta(seconds=generator.randrange(10 ** 8),
+                                                           microseconds=generator.randrange(10 ** 6))
+                    writer.add_event(timestamp, "bob", "Visited", "event {0}".format(event_index))
+                    expected.append([osxripper_timeline.format_timestamp(timestamp), plugin_name, "bob", "Visited",
+                                     "event {0}".format(event_index)])
+            self.assertEqual(writer.get_event_count, event_count)
+        return sorted(expected)
+
+    def test_merge(self):
+        expected = self._write_events(plugin_count=3, event_count=250, chunk_size=40)
+        self.assertEqual(osxripper_timeline.write_timeline(self._output_dir), len(expected))
+        self.assertEqual(self._read_timeline(), [osxripper_timeline.HEADERS] + expected)
+        self.assertFalse(os.path.exists(osxripper_timeline.get_chunk_directory(self._output_dir)))
+
+    def test_merge_in_several_passes(self):
+        expected = self._write_events(plugin_count=4, event_count=100, chunk_size=7)
+        with mock.patch.object(osxripper_timeline, "MERGE_FAN_IN", 3):
+            self.assertEqual(osxripper_timeline.write_timeline(self._output_dir), len(expected))
+        self.assertEqual(self._read_timeline(), [osxripper_timeline.HEADERS] + expected)
+
+    def test_invalid_timestamps_are_dropped(self):
+        chunk_dir = osxripper_timeline.start_timeline(self._output_dir)
+        with osxripper_timeline.TimelineWriter(chunk_dir, "Plugin") as writer:
+            writer.add_event("[ERROR] unknown date value: 1", "bob", "Visited", "dropped")
+            writer.add_event(None, "bob", "Visited", "dropped")
+            writer.add_event(datetime.datetime(2019, 1, 1), None, "Visited", None)
+        osxripper_timeline.write_timeline(self._output_dir)
+        self.assertEqual(self._read_timeline(), [osxripper_timeline.HEADERS,
+                                                 ["2019-01-01 00:00:00.000000", "Plugin", "", "Visited", ""]])
+
+    def test_times_with_a_time_zone_are_converted_to_utc(self):
+        chunk_dir = osxripper_timeline.start_timeline(self._output_dir)
+        pacific = datetime.timezone(datetime.timedelta(hours=-8))
+        with osxripper_timeline.TimelineWriter(chunk_dir, "Plugin") as writer:
+            writer.add_event(datetime.datetime(2019, 1, 1, 20, tzinfo=pacific), "bob", "Visited", "later")
+            writer.add_event(datetime.datetime(2019, 1, 2, 1), "bob", "Visited", "earlier")
+        osxripper_timeline.write_timeline(self._output_dir)
+        self.assertEqual(self._read_timeline()[1:],
+                         [["2019-01-02 01:00:00.000000", "Plugin", "bob", "Visited", "earlier"],
+                          ["2019-01-02 04:00:00.000000", "Plugin", "bob", "Visited", "later"]])
+
+    def test_log_entries_are_not_events(self):
+        chunk_dir = osxripper_timeline.start_timeline(self._output_dir)
+        timeline = osxripper_timeline.TimelineWriter(chunk_dir, "Test Plugin")
+        output_path = os.path.join(self._output_dir, "Test.txt")
+        with osxripper_records.open_writer(osxripper_records.FORMAT_TEXT, output_path, "Test Plugin", None,
+                                           timeline) as writer:
+            writer.write_log({"Timestamp": datetime.datetime(2019, 1, 1), "Message": "local"},
+                             "Jan  1 00:00:00 local\r\n")
+        self.assertEqual(timeline.get_event_count, 0)
+
+    def test_disabled_writer(self):
+        writer = osxripper_timeline.TimelineWriter(None, "Plugin")
+        writer.add_event(datetime.datetime(2019, 1, 1), "bob", "Visited", "kept nowhere")
+        writer.close()
+        self.assertFalse(writer.is_enabled)
+        self.assertEqual(writer.get_event_count, 0)
+        self.assertEqual(osxripper_timeline.write_timeline(self._output_dir), 0)
+
+    def test_record_writer_forwards_events(self):
+        chunk_dir = osxripper_timeline.start_timeline(self._output_dir)
+        timeline = osxripper_timeline.TimelineWriter(chunk_dir, "Test Plugin")
+        with osxripper_records.open_writer(osxripper_records.FORMAT_JSONL, os.path.join(self._output_dir, "Test.txt"),
+                                           "Test Plugin", {"User": "bob"}, timeline) as writer:
+            writer.write_event(datetime.datetime(2019, 1, 1), "Visited", "https://a/")
+        osxripper_timeline.write_timeline(self._output_dir)
+        self.assertEqual(self._read_timeline()[1:],
+                         [["2019-01-01 00:00:00.000000", "Test Plugin", "bob", "Visited", "https://a/"]])
+
+    def test_format_timestamp_sorts_in_time_order(self):
+        timestamps = [datetime.datetime(999, 12, 31, 23, 59, 59, 999999), datetime.datetime(2019, 1, 2),
+                      datetime.datetime(2019, 1, 1, 23, 59, 59, 1), datetime.datetime(2019, 1, 1, 23, 59, 59)]
+        self.assertEqual(sorted(timestamps, key=osxripper_timeline.format_timestamp), sorted(timestamps))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+""" Tests of the /private/var/folders artifact index against os.walk """
+import os
+import shutil
+import tempfile
+import unittest
+from riplib import osxripper_varfolders
+
+__author__ = 'osxripper'
+__version__ = '0.1'
+__license__ = 'GPLv3'
+
+
+class VarFoldersIndexTest(unittest.TestCase):
+    """
+    Test the index finds the artifacts os.walk finds, in the same order
+    """
+    def setUp(self):
+        self._input_dir = tempfile.mkdtemp()
+        self._folders = os.path.join(self._input_dir, "private", "var", "folders")
+        for bucket, user_dir in [("zz", "zyxvpxvq6csfxvn_n0000000000000"), ("k1", "abc_n0000000000000"),
+                                 ("k1", "def_n0000000000000")]:
+            for leaf in [os.path.join("C", "com.apple.QuickLook.thumbnailcache"), "0", os.path.join("T", "cache")]:
+                os.makedirs(os.path.join(self._folders, bucket, user_dir, leaf))
+            self._touch(bucket, user_dir, "C", "com.apple.QuickLook.thumbnailcache", "index.sqlite")
+            self._touch(bucket, user_dir, "0", "cache_encryptedA.db")
+            # Same file name outside the QuickLook directory
+            self._touch(bucket, user_dir, "T", "cache", "index.sqlite")
+        os.symlink(os.path.join(self._folders, "k1"), os.path.join(self._folders, "zz", "link"))
+        osxripper_varfolders.clear()
+
+    def tearDown(self):
+        osxripper_varfolders.clear()
+        shutil.rmtree(self._input_dir, ignore_errors=True)
+
+    def _touch(self, *parts):
+        open(os.path.join(self._folders, *parts), "w").close()
+
+    def _walk(self, marker, file_name):
+        """
+        Return the paths the plugins found with os.walk before the index
+        """
+        return [os.path.join(root, file_name) for root, _, files in os.walk(self._folders)
+                if file_name in files and (marker is None or marker in root)]
+
+    def test_quicklook_thumbnails(self):
+        found = osxripper_varfolders.find(self._input_dir, osxripper_varfolders.QUICKLOOK_THUMBNAILS)
+        self.assertEqual(len(found), 3)
+        self.assertEqual(found, self._walk("com.apple.QuickLook.thumbnailcache", "index.sqlite"))
+
+    def test_cache_encrypted(self):
+        found = osxripper_varfolders.find(self._input_dir, osxripper_varfolders.CACHE_ENCRYPTED)
+        self.assertEqual(len(found), 3)
+        self.assertEqual(found, self._walk(None, "cache_encryptedA.db"))
+
+    def test_index_is_shared(self):
+        self.assertIs(osxripper_varfolders.get_index(self._input_dir),
+                      osxripper_varfolders.get_index(os.path.join(self._input_dir, ".")))
+
+    def test_missing_var_folders(self):
+        shutil.rmtree(self._folders)
+        self.assertEqual(osxripper_varfolders.find(self._input_dir, osxripper_varfolders.CACHE_ENCRYPTED), [])
+
+
+if __name__ == "__main__":
+    unittest.main()